@@ -0,0 +1,115 @@
+"""Load test for POST /api/v1/audit/check.
+
+Run the backend against the local Upstage stub (see ``server/stubs/upstage.py``)
+and fire concurrent audit requests at it::
+
+    python -m benchmarks.audit_load --url http://localhost:8000 --requests 500 --concurrency 16
+
+Reports throughput, latency percentiles and which decision path produced
+each verdict, so silent fallbacks to the rule tier are visible.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+ITEM_POOL = [
+    ("A4 용지 500매", 5500),
+    ("볼펜 검정", 1200),
+    ("삼각김밥", 1200),
+    ("생수 500ml", 900),
+    ("도시락", 4800),
+    ("참이슬", 1800),
+    ("카스 500ml", 2500),
+    ("커피", 4500),
+    ("포스트잇", 2000),
+    ("담배", 4500),
+]
+
+
+def make_receipt(idx: int, rng: random.Random) -> dict:
+    items = []
+    for item_id, (name, unit_price) in enumerate(rng.sample(ITEM_POOL, rng.randint(1, 4)), 1):
+        count = rng.randint(1, 3)
+        items.append({"id": item_id, "name": name, "unit_price": unit_price, "count": count, "price": unit_price * count})
+    return {
+        "receipt_id": f"load-{idx:06d}",
+        "store_name": rng.choice(["GS25 연세점", "알파문구", "스타벅스 신촌점", "이마트24"]),
+        "date": f"2026-02-{rng.randint(1, 28):02d} {rng.choice([9, 12, 15, 19, 23]):02d}:{rng.randint(0, 59):02d}",
+        "items": items,
+        "total_price": sum(x["price"] for x in items),
+    }
+
+
+def percentile(samples: list[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+
+def run(url: str, total: int, concurrency: int, timeout: float, seed: int) -> dict:
+    rng = random.Random(seed)
+    receipts = [make_receipt(i, rng) for i in range(total)]
+    endpoint = f"{url.rstrip('/')}/api/v1/audit/check"
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    def one(receipt: dict) -> tuple[float, str]:
+        started = time.perf_counter()
+        try:
+            response = session.post(endpoint, json=receipt, timeout=timeout)
+            response.raise_for_status()
+            body = response.json()
+            path = body.get("decision_path", "llm")
+            if body.get("fallback_reason"):
+                path = f"{path}:{body['fallback_reason']}"
+        except Exception as exc:
+            path = f"error:{type(exc).__name__}"
+        return time.perf_counter() - started, path
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, receipts))
+    elapsed = time.perf_counter() - started
+
+    latencies = [lat for lat, path in results if not path.startswith("error")]
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p90": round(percentile(latencies, 90) * 1000, 1),
+            "p99": round(percentile(latencies, 99) * 1000, 1),
+            "max": round(max(latencies, default=0.0) * 1000, 1),
+        },
+        "decision_paths": dict(Counter(path for _, path in results)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the audit endpoint")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = run(args.url, args.requests, args.concurrency, args.timeout, args.seed)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
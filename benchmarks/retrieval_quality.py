@@ -0,0 +1,172 @@
+"""Retrieval quality and latency for different chunking / index / retrieval settings.
+
+Runs fully offline: the policy (``SAMPLE_POLICY`` in ``web/config.py`` by
+default) is split and embedded with the hashing embedding backend
+(``EMBEDDING_BACKEND=hashing``), so no Upstage quota is used. Every
+combination of the given settings is indexed into a temporary Chroma store and queried with the labeled receipts in
+``benchmarks/retrieval_labels.json`` (receipt -> expected article ids)::
+
+    python -m benchmarks.retrieval_quality --chunk-sizes 300,600 --overlaps 0,100 \\
+        --spaces cosine,l2,ip --k 1,3,5 --splitters article,recursive --modes vector,hybrid
+
+``--backends chroma,numpy --dtypes float32,int8`` also exports each store to the
+NumPy exact-search index (cosine only) in every given dtype, so the quantized
+index and its rerank are measured on the real policy text.
+
+Reports recall@k, MRR, p50/p99 retrieval latency and the average size of the
+rules context sent to the LLM for each configuration. The hashing embedding
+only captures character overlap, so compare configurations against each
+other rather than reading the absolute numbers as production quality.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import re
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from core.config import RULES_TOKEN_BUDGET
+from core.rag_engine.article_splitter import ArticleTextSplitter
+from core.rag_engine.context_builder import ARTICLE_PATTERN, RuleContextBuilder
+from core.rag_engine.embedder import RegulationEmbedder
+from core.rag_engine.local_embeddings import HashingEmbeddings
+from core.rag_engine.retriever import ItemRuleRetriever
+from core.rag_engine.vector_db import VectorDBManager
+
+LABELS_PATH = Path(__file__).with_name("retrieval_labels.json")
+
+
+def make_splitter(name: str, chunk_size: int, overlap: int):
+    if name == "article":
+        return ArticleTextSplitter(chunk_size=chunk_size, chunk_overlap=overlap)
+    # The splitter used before article-aware chunking, kept for comparison.
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=overlap, separators=["\n\n", "\n", "제", "."], add_start_index=True
+    )
+
+
+def articles_of(doc) -> set[str]:
+    if doc.metadata.get("article_id"):
+        return {doc.metadata["article_id"]}
+    return {re.sub(r"\s+", "", match) for match in ARTICLE_PATTERN.findall(doc.page_content)}
+
+
+def percentile(samples: list[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+
+def evaluate(retriever: ItemRuleRetriever, labels: list[dict], k: int, repeat: int) -> dict:
+    builder = RuleContextBuilder(max_tokens=RULES_TOKEN_BUDGET)
+    recalls, reciprocal_ranks, context_tokens, latencies = [], [], [], []
+    for case in labels:
+        expected = set(case["expected"])
+        docs = retriever.retrieve(case["receipt"], k=k)
+        found = set().union(*(articles_of(doc) for doc in docs)) if docs else set()
+        recalls.append(len(found & expected) / len(expected))
+        rank = next((i for i, doc in enumerate(docs, 1) if articles_of(doc) & expected), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+        context_tokens.append(builder.build(docs)[1])
+
+        for _ in range(repeat):
+            started = time.perf_counter()
+            retriever.retrieve(case["receipt"], k=k)
+            latencies.append(time.perf_counter() - started)
+
+    return {
+        "recall_at_k": round(sum(recalls) / len(recalls), 4),
+        "mrr": round(sum(reciprocal_ranks) / len(reciprocal_ranks), 4),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+        },
+        "avg_context_tokens": round(sum(context_tokens) / len(context_tokens), 1),
+    }
+
+
+def run(policy: str, labels: list[dict], splitters, chunk_sizes, overlaps, spaces, modes, ks, repeat: int, dim: int,
+        backends=("chroma",), dtypes=("float32",)) -> list[dict]:
+    embedding = HashingEmbeddings(dim)
+    results = []
+    for splitter_name, chunk_size, overlap, space in itertools.product(splitters, chunk_sizes, overlaps, spaces):
+        chunks = RegulationEmbedder.assign_chunk_ids(
+            make_splitter(splitter_name, chunk_size, overlap).create_documents([policy]), "benchmark"
+        )
+        with tempfile.TemporaryDirectory() as path:
+            manager = VectorDBManager(path, watch=False)
+            manager.create_db(chunks, embedding, space=space)
+            manager.export_lexical_index(embedding)
+            indexes = [("chroma", None)] if "chroma" in backends else []
+            if "numpy" in backends and space == "cosine":
+                # The NumPy index always scores by cosine similarity, so it is only comparable to the cosine store.
+                indexes += [("numpy", dtype) for dtype in dtypes]
+            exported = None
+            for (backend, dtype), mode, k in itertools.product(indexes, modes, ks):
+                manager.backend = backend
+                if dtype is not None and dtype != exported:
+                    manager.numpy_index.dtype = np.dtype(dtype)
+                    manager.export_numpy_index(embedding)
+                    exported = dtype
+                # cache_size=0: every query is embedded, as for a first-seen item name.
+                retriever = ItemRuleRetriever(manager, embedding, cache_size=0, mode=mode)
+                results.append({
+                    "splitter": splitter_name,
+                    "chunk_size": chunk_size,
+                    "chunk_overlap": overlap,
+                    "space": space,
+                    "backend": backend,
+                    "dtype": dtype,
+                    "mode": mode,
+                    "k": k,
+                    "chunks": len(chunks),
+                    **evaluate(retriever, labels, k, repeat),
+                })
+    return sorted(results, key=lambda r: (r["recall_at_k"], r["mrr"]), reverse=True)
+
+
+def _ints(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def _strs(value: str) -> list[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark retrieval quality and latency per configuration")
+    parser.add_argument("--policy", help="policy text file (default: SAMPLE_POLICY in web/config.py)")
+    parser.add_argument("--labels", default=str(LABELS_PATH), help="JSON list of {receipt, expected: [article ids]}")
+    parser.add_argument("--splitters", type=_strs, default=["article", "recursive"])
+    parser.add_argument("--chunk-sizes", type=_ints, default=[300, 600])
+    parser.add_argument("--overlaps", type=_ints, default=[0, 100])
+    parser.add_argument("--spaces", type=_strs, default=["cosine", "l2", "ip"])
+    parser.add_argument("--modes", type=_strs, default=["vector", "hybrid"])
+    parser.add_argument("--backends", type=_strs, default=["chroma"], help="chroma and/or numpy")
+    parser.add_argument("--dtypes", type=_strs, default=["float32"], help="NumPy index dtypes (float32, float16, int8)")
+    parser.add_argument("--k", type=_ints, default=[1, 3, 5])
+    parser.add_argument("--repeat", type=int, default=5, help="timed retrievals per labeled receipt")
+    parser.add_argument("--dim", type=int, default=512, help="hashing embedding dimension")
+    args = parser.parse_args()
+
+    if args.policy:
+        policy = Path(args.policy).read_text(encoding="utf-8")
+    else:
+        from web.config import SAMPLE_POLICY as policy
+    labels = json.loads(Path(args.labels).read_text(encoding="utf-8"))
+
+    results = run(policy, labels, args.splitters, args.chunk_sizes, args.overlaps, args.spaces, args.modes, args.k, args.repeat, args.dim,
+                  args.backends, args.dtypes)
+    print(json.dumps({"labels": len(labels), "results": results}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
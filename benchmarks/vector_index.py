@@ -0,0 +1,137 @@
+"""Compare the Chroma (HNSW) and NumPy exact-search backends of VectorDBManager.
+
+Runs fully offline on a synthetic, clustered corpus shaped like the policy
+store (a few hundred chunks of ``solar-embedding-1-large`` sized vectors)::
+
+    python -m benchmarks.vector_index --chunks 500 --dim 4096 --queries 200 --k 3
+
+Both backends are loaded through ``VectorDBManager`` exactly as the audit
+service uses them. Reports single-query and batched latency percentiles and
+recall@k against brute-force ground truth. With ``--dtype float16`` or
+``--dtype int8`` the quantized NumPy index is also measured without the
+rerank from Chroma's stored embeddings, to show how much recall it recovers.
+For recall on the real policy text use ``benchmarks.retrieval_quality``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+from core.rag_engine.vector_db import VectorDBManager
+
+
+def make_corpus(chunks: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    # Policy chunks cluster by topic (alcohol, hours, supplies...), so draw them around a few centers.
+    centers = rng.standard_normal((clusters, dim))
+    vectors = centers[rng.integers(0, clusters, chunks)] + 0.8 * rng.standard_normal((chunks, dim))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def make_queries(corpus: np.ndarray, count: int, rng: np.random.Generator) -> np.ndarray:
+    # Item-name queries land near, but not on, the chunk that answers them.
+    base = corpus[rng.integers(0, len(corpus), count)]
+    queries = base + 0.6 * rng.standard_normal(base.shape) / np.sqrt(corpus.shape[1]) * 10
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def percentile(samples: list[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+
+def build_store(path: str, corpus: np.ndarray, dtype: str, rerank: int) -> VectorDBManager:
+    manager = VectorDBManager(path, backend="chroma", watch=False)
+    manager.numpy_index.dtype = np.dtype(dtype)
+    manager.numpy_index.rerank = rerank
+    docs = [
+        Document(page_content=f"chunk {i}", metadata={"source": "benchmark", "chunk_id": f"c{i:06d}"})
+        for i in range(len(corpus))
+    ]
+    lookup = {doc.page_content: corpus[i].tolist() for i, doc in enumerate(docs)}
+    manager.sync_documents(docs, None, embed_documents=lambda texts: [lookup[t] for t in texts])
+    manager.export_numpy_index(None)
+    return manager
+
+
+def measure(manager: VectorDBManager, backend: str, queries: np.ndarray, truth: list[set], k: int, batch: int) -> dict:
+    manager.backend = backend
+    vectors = queries.tolist()
+    manager.search_rules_by_vectors(vectors[:1], None, k=k)  # warm up (open / map the index)
+
+    single, hits = [], 0
+    for vector, expected in zip(vectors, truth):
+        started = time.perf_counter()
+        result = manager.search_rules_by_vectors([vector], None, k=k)[0]
+        single.append(time.perf_counter() - started)
+        hits += len({doc.id for doc, _ in result} & expected)
+
+    batched = []
+    for start in range(0, len(vectors), batch):
+        started = time.perf_counter()
+        manager.search_rules_by_vectors(vectors[start:start + batch], None, k=k)
+        batched.append(time.perf_counter() - started)
+
+    return {
+        "recall_at_k": round(hits / (k * len(vectors)), 4),
+        "single_ms": {
+            "p50": round(percentile(single, 50) * 1000, 3),
+            "p99": round(percentile(single, 99) * 1000, 3),
+        },
+        f"batch{batch}_ms": {
+            "p50": round(percentile(batched, 50) * 1000, 3),
+            "p99": round(percentile(batched, 99) * 1000, 3),
+        },
+    }
+
+
+def run(chunks: int, dim: int, queries: int, k: int, batch: int, dtype: str, rerank: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    corpus = make_corpus(chunks, dim, clusters=max(1, chunks // 25), rng=rng)
+    query_vectors = make_queries(corpus, queries, rng)
+
+    exact = query_vectors @ corpus.T
+    truth = [{f"c{i:06d}" for i in np.argsort(-row)[:k]} for row in exact]
+
+    with tempfile.TemporaryDirectory() as path:
+        manager = build_store(path, corpus, dtype, rerank)
+        report = {
+            "chunks": chunks,
+            "dim": dim,
+            "queries": queries,
+            "k": k,
+            "numpy_index": manager.numpy_index.stats(),
+            "chroma": measure(manager, "chroma", query_vectors, truth, k, batch),
+            "numpy": measure(manager, "numpy", query_vectors, truth, k, batch),
+        }
+        if dtype != "float32" and rerank > 1:
+            manager.numpy_index.rerank = 0
+            report["numpy_no_rerank"] = measure(manager, "numpy", query_vectors, truth, k, batch)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the vector search backends")
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=4096)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--batch", type=int, default=8, help="queries per batched call (items per receipt)")
+    parser.add_argument("--dtype", choices=["float32", "float16", "int8"], default="float32")
+    parser.add_argument("--rerank", type=int, default=4, help="candidates reranked from stored embeddings per result (k * rerank)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = run(args.chunks, args.dim, args.queries, args.k, args.batch, args.dtype, args.rerank, args.seed)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
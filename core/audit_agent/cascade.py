@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import deque
+
+from core.config import AUDIT_TIERS
+from .reasoning import AuditReasoning
+
+
+class AuditTier:
+    """계층형 감사의 한 단계(모델 하나)와 그 단계의 승급 기준, 누적 지표를 담습니다."""
+
+    def __init__(self, model, min_confidence=0.0, escalate_score=1.01, cost_per_1k_input=0.0, cost_per_1k_output=0.0):
+        self.model = model
+        self.min_confidence = min_confidence
+        self.escalate_score = escalate_score
+        self.cost_per_1k_input = cost_per_1k_input
+        self.cost_per_1k_output = cost_per_1k_output
+
+        self.calls = 0
+        self.escalations = 0
+        self.failures = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.latencies = deque(maxlen=500)
+
+    def cost(self, input_tokens, output_tokens):
+        return input_tokens / 1000 * self.cost_per_1k_input + output_tokens / 1000 * self.cost_per_1k_output
+
+    def needs_escalation(self, result):
+        # 확신도가 낮거나, 위반 가능성이 높아서 더 강한 모델의 판단이 필요한 경우 다음 tier로 넘깁니다.
+        # confidence를 돌려주지 않은 경우에는 확신이 없는 것으로 보고 승급합니다.
+        try:
+            confidence = float(result.get("confidence", 0.0))
+            score = float(result.get("violation_score", 0.0))
+        except (TypeError, ValueError):
+            return True
+        return confidence < self.min_confidence or score >= self.escalate_score
+
+    def metrics(self):
+        latencies = sorted(self.latencies)
+
+        def pct(p):
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000, 1)
+
+        return {
+            "model": self.model,
+            "calls": self.calls,
+            "escalations": self.escalations,
+            "failures": self.failures,
+            "escalation_rate": round(self.escalations / self.calls, 4) if self.calls else 0.0,
+            "latency_ms": {"p50": pct(50), "p95": pct(95)},
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost": round(self.cost(self.input_tokens, self.output_tokens), 6),
+        }
+
+
+class AuditCascade:
+    """싸고 빠른 모델로 먼저 감사하고, 필요한 영수증만 더 강한 모델로 넘기는 계층형 감사입니다.
+
+    대부분의 영수증(사무용품, 식비 등 일상 지출)은 첫 tier에서 끝나고,
+    확신도가 낮거나 위반 점수가 높은 영수증만 다음 tier로 승급됩니다.
+    """
+
+    def __init__(self, tiers=None):
+        self.tiers = [AuditTier(**spec) for spec in (tiers or AUDIT_TIERS)]
+        self._agents = {}
+        self._lock = threading.Lock()
+
+    def agent(self, tier):
+        with self._lock:
+            if tier.model not in self._agents:
+                self._agents[tier.model] = AuditReasoning(model=tier.model)
+            return self._agents[tier.model]
+
+    def record(self, tier, latency, usage, escalated):
+        with self._lock:
+            tier.calls += 1
+            tier.escalations += int(escalated)
+            tier.input_tokens += usage.get("input_tokens", 0)
+            tier.output_tokens += usage.get("output_tokens", 0)
+            tier.latencies.append(latency)
+
+    def analyze(self, receipt_json, retrieved_rules, start_tier=0):
+        """start_tier부터 순서대로 감사하고, 최종 결과에 사용한 model/tier와 tier별 기록을 붙여서 돌려줍니다."""
+        result = None
+        trace = []
+        last = len(self.tiers) - 1
+
+        for index in range(start_tier, len(self.tiers)):
+            tier = self.tiers[index]
+            started = time.perf_counter()
+            try:
+                result, usage = self.agent(tier).analyze_with_usage(receipt_json, retrieved_rules)
+            except Exception:
+                with self._lock:
+                    tier.failures += 1
+                # 상위 tier에서 실패했다면 하위 tier 결과라도 돌려줍니다. 첫 시도부터 실패하면 그대로 예외를 올립니다.
+                if result is None:
+                    raise
+                break
+
+            latency = time.perf_counter() - started
+            escalate = index < last and tier.needs_escalation(result)
+            self.record(tier, latency, usage, escalate)
+            trace.append({
+                "tier": index,
+                "model": tier.model,
+                "latency_ms": round(latency * 1000, 1),
+                "input_tokens": usage.get("input_tokens", 0),
+                "output_tokens": usage.get("output_tokens", 0),
+                "cost": round(tier.cost(usage.get("input_tokens", 0), usage.get("output_tokens", 0)), 6),
+            })
+
+            result["model"] = tier.model
+            result["tier"] = index
+            if not escalate:
+                break
+
+        result["cascade"] = trace
+        return result
+
+    def metrics(self):
+        return [dict(tier=index, **tier.metrics()) for index, tier in enumerate(self.tiers)]
@@ -14,8 +14,39 @@ AUDIT_SYSTEM_PROMPT = """
             "policy_reference": "관련 규정 조항 문구"
         }}
     ],
-    "reasoning": "종합적인 감사 의견"
+    "reasoning": "종합적인 감사 의견",
+    "confidence": 0.0 ~ 1.0 (이 판단에 대한 확신도. 규정이 모호하거나 품목이 불분명하면 낮게)
 }}
 
 주의: '참이슬', '카스' 등 주류 품목이나 자정 이후 결제 등 사적 이용 의심 사례를 집중 감시하세요.
-"""
\ No newline at end of file
+"""
+
+# 여러 영수증을 한 번에 감사할 때(월말 일괄 재감사 등) 사용하는 프롬프트입니다.
+# 같은 규정을 공유하는 영수증들을 묶어서 보내고, 영수증마다 index를 붙여서 결과를 구분합니다.
+BATCH_AUDIT_SYSTEM_PROMPT = """
+당신은 'Transparent-Audit' 시스템의 수석 감사관입니다.
+제공된 [조직 규정]을 바탕으로 여러 장의 [영수증 데이터] 각각의 적절성을 판단하세요.
+영수증마다 독립적으로 판단하고, 다른 영수증의 내용을 근거로 삼지 마세요.
+
+반드시 다음 JSON 형식을 엄격히 준수하여 답변하세요. 입력된 모든 영수증에 대해 index 순서대로 하나씩 결과를 작성해야 합니다:
+{{
+    "results": [
+        {{
+            "index": 입력 영수증의 index,
+            "audit_decision": "Pass" 또는 "Anomaly Detected",
+            "violation_score": 0.0 ~ 1.0 (위험도),
+            "violations": [
+                {{
+                    "item_id": 해당 품목의 ID,
+                    "reason": "위반 사유(예: 주류 구매 금지 위반)",
+                    "policy_reference": "관련 규정 조항 문구"
+                }}
+            ],
+            "reasoning": "종합적인 감사 의견",
+            "confidence": 0.0 ~ 1.0 (이 판단에 대한 확신도)
+        }}
+    ]
+}}
+
+주의: '참이슬', '카스' 등 주류 품목이나 자정 이후 결제 등 사적 이용 의심 사례를 집중 감시하세요.
+"""
@@ -1,29 +1,173 @@
 import json
+from functools import partial
 from langchain_upstage import ChatUpstage
+from langchain_core.exceptions import OutputParserException
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
-from .prompt_templates import AUDIT_SYSTEM_PROMPT
+from core.config import AUDIT_MODEL
+from core.rag_engine.context_builder import estimate_tokens
+from .prompt_templates import AUDIT_SYSTEM_PROMPT, BATCH_AUDIT_SYSTEM_PROMPT
 
 class AuditReasoning:
-    def __init__(self):
-        # 모델은 우선 solar-1-mini-chat으로 설정했습니다. 추후에 변경하면 될 것 같습니다.
+    def __init__(self, model=AUDIT_MODEL):
+        # 모델은 기본값으로 solar-1-mini-chat을 사용하고, AUDIT_MODEL 환경변수나 인자로 바꿀 수 있습니다. (계층형 감사에서는 tier마다 다른 모델을 넘겨줍니다.)
         # JsonOutputParser를 통해 LLM의 출력문 중에서 JSON 형식의 텍스트만 골라내서 딕셔너리 객체로 변환합니다.
-        self.llm = ChatUpstage(model="solar-1-mini-chat")
+        self.model = model
+        self.llm = ChatUpstage(model=model)
         self.parser = JsonOutputParser()
 
-    def analyze(self, receipt_json, retrieved_rules):
-        
+    def _build_prompt(self):
         # "system"이랑 "human"으로 구분하였습니다. system은 사전에 작성한 프롬프트 양식을 입력하고, human은 유사 규정과 영수증 json을 입력하게 됩니다.
-        prompt = ChatPromptTemplate.from_messages([
+        return ChatPromptTemplate.from_messages([
             ("system", AUDIT_SYSTEM_PROMPT),
             ("human", "규정: {rules}\n\n영수증: {receipt}")
         ])
-        
+
+    def _build_chain(self):
         # langchain 구성입니다.
-        chain = prompt | self.llm | self.parser
-        
+        return self._build_prompt() | self.llm | self.parser
+
+    @staticmethod
+    def _usage_of(message):
+        usage = getattr(message, "usage_metadata", None) or {}
+        return {
+            "input_tokens": usage.get("input_tokens", 0),
+            "output_tokens": usage.get("output_tokens", 0),
+        }
+
+    def analyze_with_usage(self, receipt_json, retrieved_rules):
+        # analyze와 같지만, 파싱 전 LLM 응답에서 토큰 사용량(usage_metadata)을 함께 꺼내서 돌려줍니다.
+        message = (self._build_prompt() | self.llm).invoke({
+            "rules": retrieved_rules,
+            "receipt": json.dumps(receipt_json, ensure_ascii=False)
+        })
+        return self.parser.invoke(message), self._usage_of(message)
+
+    def analyze(self, receipt_json, retrieved_rules):
         # 입력받은 영수증 데이터와 유사 규정들을 llm에게 주고 규정 위반 여부를 판단하게 합니다.
-        return chain.invoke({
+        result, _ = self.analyze_with_usage(receipt_json, retrieved_rules)
+        return result
+
+    @staticmethod
+    def _share(usage, receipts, spent):
+        # 여러 영수증을 묶은 호출의 토큰 사용량을 영수증별 프롬프트 크기에 비례해서 나눠 spent에 더합니다.
+        # 정수로 나누고 남는 토큰은 마지막 영수증에 붙여서 합계가 호출 사용량과 같게 합니다.
+        weights = [max(1, estimate_tokens(json.dumps(receipt, ensure_ascii=False))) for receipt in receipts]
+        total = sum(weights)
+        for key in ("input_tokens", "output_tokens"):
+            left = usage.get(key, 0)
+            for i, weight in enumerate(weights):
+                share = left if i == len(weights) - 1 else usage.get(key, 0) * weight // total
+                spent[i][key] += share
+                left -= share
+
+    def _analyze_batch(self, receipts, retrieved_rules, spent):
+        # 영수증 여러 장을 index와 함께 하나의 프롬프트에 넣고, index별 결과 딕셔너리를 돌려줍니다.
+        # 응답에서 빠졌거나 형식이 잘못된 영수증은 결과에 포함되지 않습니다. 토큰 사용량은 읽지 못한 응답까지 spent에 나눠 더합니다.
+        # 응답 전체를 JSON으로 읽지 못한 경우만 빈 결과로 보고, 요청 자체의 오류(네트워크, 요청 한도 등)는 그대로 올립니다.
+        # (전송 오류까지 파싱 실패로 보면 장애 중에 반씩 나눠 다시 보내는 요청이 늘어납니다)
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", BATCH_AUDIT_SYSTEM_PROMPT),
+            ("human", "규정: {rules}\n\n영수증 목록: {receipts}")
+        ])
+        payload = [{"index": i, "receipt": receipt} for i, receipt in enumerate(receipts)]
+        message = (prompt | self.llm).invoke({
+            "rules": retrieved_rules,
+            "receipts": json.dumps(payload, ensure_ascii=False)
+        })
+        self._share(self._usage_of(message), receipts, spent)
+        try:
+            response = self.parser.invoke(message)
+        except OutputParserException:
+            return {}
+
+        parsed = {}
+        for result in (response.get("results") if isinstance(response, dict) else None) or []:
+            if not isinstance(result, dict) or "audit_decision" not in result:
+                continue
+            try:
+                index = int(result.pop("index"))
+            except (KeyError, TypeError, ValueError):
+                continue
+            if 0 <= index < len(receipts) and index not in parsed:
+                parsed[index] = result
+        return parsed
+
+    def _analyze_group(self, receipts, retrieved_rules, spent):
+        if len(receipts) == 1:
+            message = (self._build_prompt() | self.llm).invoke({
+                "rules": retrieved_rules,
+                "receipt": json.dumps(receipts[0], ensure_ascii=False)
+            })
+            self._share(self._usage_of(message), receipts, spent)
+            try:
+                return [self.parser.invoke(message)]
+            except OutputParserException:
+                return [None]
+
+        parsed = self._analyze_batch(receipts, retrieved_rules, spent)
+        failed = [i for i in range(len(receipts)) if i not in parsed]
+        if failed:
+            # 파싱에 실패한 영수증만 반으로 나눠서 다시 묶어 보내고, 한 장만 남으면 단건으로 처리합니다.
+            retry = [receipts[i] for i in failed]
+            retry_spent = [spent[i] for i in failed]
+            half = len(retry) // 2 or 1
+            retried = []
+            for lo, hi in ((0, half), (half, len(retry))):
+                if lo < hi:
+                    retried.extend(self._analyze_group(retry[lo:hi], retrieved_rules, retry_spent[lo:hi]))
+            parsed.update(zip(failed, retried))
+        return [parsed[i] for i in range(len(receipts))]
+
+    def analyze_many_with_usage(self, requests, batch_size=8, call=None):
+        """analyze_many와 같지만, (결과 목록, 영수증별 토큰 사용량 목록, 영수증별 예외 목록)을 돌려줍니다.
+
+        여러 영수증을 묶은 호출의 사용량은 영수증별 프롬프트 크기에 비례해서 나누고,
+        다시 시도한 호출의 사용량도 해당 영수증에 더합니다.
+        묶음 하나의 호출이 실패하면 그 묶음의 영수증만 결과가 None이고 예외 목록에 그 예외가 들어갑니다. (다른 묶음은 계속 감사)
+        call(fn)을 넘기면 묶음마다 fn을 그 안에서 실행합니다. (서버의 circuit breaker와 단계 deadline 등)
+        """
+        call = call or (lambda fn: fn())
+        groups = {}
+        for position, (receipt_json, retrieved_rules) in enumerate(requests):
+            groups.setdefault(retrieved_rules, []).append(position)
+
+        results = [None] * len(requests)
+        spent = [{"input_tokens": 0, "output_tokens": 0} for _ in requests]
+        errors = [None] * len(requests)
+        for retrieved_rules, positions in groups.items():
+            for start in range(0, len(positions), batch_size):
+                chunk = positions[start:start + batch_size]
+                # deadline을 넘긴 호출은 끝까지 실행되므로, 묶음마다 따로 센 사용량을 성공한 경우에만 더합니다.
+                chunk_spent = [{"input_tokens": 0, "output_tokens": 0} for _ in chunk]
+                try:
+                    chunk_results = call(partial(self._analyze_group, [requests[p][0] for p in chunk], retrieved_rules, chunk_spent))
+                except Exception as exc:
+                    for position in chunk:
+                        errors[position] = exc
+                    continue
+                for position, result, used in zip(chunk, chunk_results, chunk_spent):
+                    results[position] = result
+                    spent[position] = used
+        return results, spent, errors
+
+    def analyze_many(self, requests, batch_size=8):
+        """(영수증, 검색된 규정) 쌍 목록을 받아, 같은 규정을 쓰는 영수증끼리 batch_size장씩 묶어서 감사합니다.
+
+        같은 시스템 프롬프트와 규정을 영수증마다 반복해서 보내지 않기 때문에 일괄 재감사 시 토큰과 요청 수가 줄어듭니다.
+        결과는 입력 순서대로 돌려주며, 단건으로 다시 시도해도 응답을 읽지 못한 영수증의 자리에는 None이 들어갑니다.
+        LLM 호출 자체가 실패하면 예외를 그대로 올립니다.
+        """
+        results, _, errors = self.analyze_many_with_usage(requests, batch_size)
+        for error in errors:
+            if error is not None:
+                raise error
+        return results
+
+    def stream(self, receipt_json, retrieved_rules):
+        # analyze와 같은 체인을 스트리밍으로 실행합니다.
+        # JsonOutputParser는 스트리밍 시 지금까지 받은 토큰으로 만들 수 있는 "부분 JSON" 딕셔너리를 계속 내보내 줍니다.
+        yield from self._build_chain().stream({
             "rules": retrieved_rules,
             "receipt": json.dumps(receipt_json, ensure_ascii=False)
         })
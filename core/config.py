@@ -0,0 +1,105 @@
+"""
+Configuration file for Transparent-Audit core engines (RAG, Audit Agent)
+"""
+
+import json
+import os
+
+# Embedding Configuration
+# upstage: Upstage 임베딩 API (EMBEDDING_MODEL)
+# sentence-transformers: 로컬 CPU에서 작은 문장 임베딩 모델(LOCAL_EMBEDDING_MODEL)로 배치 추론합니다. (sentence-transformers 설치 필요)
+# hashing: 글자 n-gram 해싱 벡터. 모델 파일도 네트워크도 필요 없는 최소 구성입니다.
+# 백엔드를 바꾸면 벡터 차원이 달라지므로 규정을 다시 적재해야 합니다. (ingest가 새 스냅샷을 처음부터 만듭니다)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "upstage")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "solar-embedding-1-large")
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "intfloat/multilingual-e5-small")
+# e5 계열 모델은 검색 쿼리와 문서 앞에 서로 다른 접두어를 붙여야 성능이 나옵니다. (다른 모델이면 빈 문자열로)
+LOCAL_EMBEDDING_QUERY_PREFIX = os.getenv("LOCAL_EMBEDDING_QUERY_PREFIX", "query: ")
+LOCAL_EMBEDDING_DOCUMENT_PREFIX = os.getenv("LOCAL_EMBEDDING_DOCUMENT_PREFIX", "passage: ")
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "32"))
+LOCAL_EMBEDDING_DEVICE = os.getenv("LOCAL_EMBEDDING_DEVICE", "cpu")
+HASHING_EMBEDDING_DIM = int(os.getenv("HASHING_EMBEDDING_DIM", "1024"))
+
+# 한 번 임베딩한 텍스트는 (모델 이름, 텍스트 해시) 키로 로컬 SQLite에 저장해 두고 재사용합니다.
+# 빈 문자열로 설정하면 캐시를 사용하지 않습니다.
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./data/intermediate/embedding_cache.db")
+# 질의 배치 임베딩을 지원하지 않는 모델(Upstage)은 품목 질의를 embed_query로 하나씩 보내므로, 동시에 보낼 요청 수입니다.
+QUERY_EMBED_CONCURRENCY = int(os.getenv("QUERY_EMBED_CONCURRENCY", "4"))
+
+# Vector Store Configuration
+# 벡터 DB root. 규정을 적재할 때마다 snapshots/<버전>/에 새 스냅샷을 만들고 CURRENT 파일로 현재 버전을 가리킵니다.
+VECTOR_STORE_PATH = os.getenv("VECTOR_STORE_PATH", "./data/vector_store")
+# 롤백용으로 남겨 둘 최근 스냅샷 수 (현재 버전과 그 직전 버전은 항상 남김)
+VECTOR_STORE_KEEP = int(os.getenv("VECTOR_STORE_KEEP", "3"))
+# 서버가 CURRENT 파일을 확인하는 간격 (초)
+VECTOR_STORE_POLL_SECONDS = float(os.getenv("VECTOR_STORE_POLL_SECONDS", "2"))
+# 단체(학생회, 학과 등)마다 규정이 다르므로 테넌트별 벡터 DB root를 TENANT_STORE_ROOT/<tenant_id>에 둡니다.
+# tenant_id가 없는 요청은 VECTOR_STORE_PATH(기본 테넌트)를 씁니다.
+TENANT_STORE_ROOT = os.getenv("TENANT_STORE_ROOT", "./data/tenants")
+# 서버 메모리에 열어 둘 테넌트 검색기 수. 넘으면 가장 오래 안 쓴 테넌트부터 닫고, 다음 요청 때 다시 엽니다.
+TENANT_MAX_WARM = int(os.getenv("TENANT_MAX_WARM", "8"))
+# chroma: 영속 Chroma(HNSW) 컬렉션에서 검색합니다.
+# numpy: 적재할 때 Chroma 내용을 메모리 매핑 행렬(vector_store/numpy_index)로 내보내고, 행렬 곱 한 번으로 정확 검색합니다.
+#        규정 chunk가 수백~수천 개 정도일 때 더 빠릅니다. 인덱스가 아직 없으면 Chroma로 검색합니다.
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+# numpy 인덱스 저장 형식 (float32, 검색 메모리를 절반만 쓰는 float16, 4분의 1만 쓰는 int8)
+# 인덱스는 Chroma의 사본이라 디스크는 Chroma(float32 벡터 포함)에 더해 이 행렬 크기만큼 늘어납니다.
+# VECTOR_INDEX_RERANK > 1이면 양자화 행렬로 고른 후보 k * VECTOR_INDEX_RERANK개를 Chroma에 저장된 원본 임베딩으로 다시 정렬합니다.
+# 이때 Chroma가 float32 벡터 전체를 메모리에 올려서 테넌트마다 메모리가 오히려 늘어나므로 기본값은 끔(0)입니다.
+VECTOR_INDEX_DTYPE = os.getenv("VECTOR_INDEX_DTYPE", "float32")
+VECTOR_INDEX_RERANK = int(os.getenv("VECTOR_INDEX_RERANK", "0"))
+
+# Retrieval Configuration
+# vector: 품목명을 임베딩해서 벡터 검색만 합니다.
+# hybrid: 벡터 검색과 글자 n-gram BM25 검색 결과를 reciprocal-rank fusion(RRF)으로 합칩니다.
+# lexical: BM25 결과의 coverage가 LEXICAL_MIN_COVERAGE 이상인 품목은 임베딩 호출 없이 BM25 결과만 쓰고, 나머지 품목만 hybrid로 검색합니다.
+# BM25 인덱스가 아직 없으면(적재 전) 항상 벡터 검색만 합니다.
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector")
+# RRF 점수 1 / (RRF_K + 순위)의 상수 (보통 60)
+RRF_K = int(os.getenv("RRF_K", "60"))
+# 쿼리 n-gram(idf 가중) 중 top-1 chunk에 들어 있는 비율이 이 값 이상이면 BM25 결과를 믿습니다.
+LEXICAL_MIN_COVERAGE = float(os.getenv("LEXICAL_MIN_COVERAGE", "0.8"))
+
+# Item Lookup Configuration
+# 자주 나오는 품목명을 미리 카테고리로 분류하고, 카테고리별 관련 조항을 계산해 둔 조회 테이블(SQLite)입니다.
+# `python -m core.rag_engine.item_lookup`으로 만들며, 테이블에 있는 품목은 감사할 때 임베딩/벡터 검색 없이 조항을 찾습니다.
+# 빈 문자열로 설정하면 조회 테이블을 사용하지 않습니다.
+ITEM_LOOKUP_PATH = os.getenv("ITEM_LOOKUP_PATH", "./data/intermediate/item_lookup.db")
+# 품목 카테고리 (JSON: 카테고리 -> 키워드 목록). 품목명에 키워드가 들어 있으면 그 카테고리로 분류하고,
+# 키워드로 분류되지 않는 품목은 임베딩이 가장 가까운 카테고리로 분류합니다. (유사도가 ITEM_CATEGORY_MIN_SIMILARITY 미만이면 분류하지 않음)
+ITEM_CATEGORIES = json.loads(os.getenv("ITEM_CATEGORIES", json.dumps({
+    "주류": ["주류", "소주", "맥주", "와인", "막걸리", "위스키", "양주", "하이볼", "참이슬", "처음처럼", "카스", "테라", "하이트", "클라우드"],
+    "담배": ["담배", "전자담배", "궐련", "에쎄", "말보로", "레종"],
+    "식품": ["김밥", "도시락", "라면", "샌드위치", "햄버거", "빵", "우유", "커피", "음료", "생수", "과자", "치킨", "피자"],
+    "사무용품": ["a4", "용지", "볼펜", "노트", "파일", "토너", "잉크", "스테이플러", "포스트잇", "테이프"],
+    "개인용품": ["화장품", "샴푸", "의류", "양말", "우산"],
+}, ensure_ascii=False)))
+ITEM_CATEGORY_MIN_SIMILARITY = float(os.getenv("ITEM_CATEGORY_MIN_SIMILARITY", "0.5"))
+
+# Ingestion Configuration
+# 규정 문서를 적재할 때 임베딩 요청 하나에 담는 최대 chunk 수와 (추정) 토큰 수, 동시에 보내는 요청 수입니다.
+# 요청 한도 초과(429)나 일시적인 서버 오류는 INGEST_EMBED_MAX_RETRIES번까지 지수 백오프로 다시 시도합니다.
+INGEST_EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "100"))
+INGEST_EMBED_BATCH_TOKENS = int(os.getenv("INGEST_EMBED_BATCH_TOKENS", "50000"))
+INGEST_EMBED_CONCURRENCY = int(os.getenv("INGEST_EMBED_CONCURRENCY", "4"))
+INGEST_EMBED_MAX_RETRIES = int(os.getenv("INGEST_EMBED_MAX_RETRIES", "5"))
+# PDF 파싱/split을 병렬로 처리할 프로세스 수 (0이면 CPU 개수)
+INGEST_PARSE_WORKERS = int(os.getenv("INGEST_PARSE_WORKERS", "0"))
+
+# Prompt Configuration
+# 검색된 규정을 프롬프트에 넣을 때 허용하는 최대 토큰 수 (추정치 기준)
+RULES_TOKEN_BUDGET = int(os.getenv("RULES_TOKEN_BUDGET", "1200"))
+
+# Audit Agent Configuration
+AUDIT_MODEL = os.getenv("AUDIT_MODEL", "solar-1-mini-chat")
+
+# 계층형(cascade) 감사 설정 (JSON 리스트, 앞 tier부터 순서대로 시도)
+# - model: 해당 tier에서 사용할 모델
+# - min_confidence: 응답의 confidence가 이 값보다 낮으면 다음 tier로 넘깁니다.
+# - escalate_score: violation_score가 이 값 이상이면 다음 tier로 넘깁니다.
+# - cost_per_1k_input / cost_per_1k_output: 1,000 토큰당 비용 (비용 지표 계산용, 단가는 계약에 맞게 설정)
+# 마지막 tier의 결과는 그대로 최종 결과가 됩니다.
+AUDIT_TIERS = json.loads(os.getenv("AUDIT_TIERS", json.dumps([
+    {"model": AUDIT_MODEL, "min_confidence": 0.7, "escalate_score": 0.6, "cost_per_1k_input": 0.0, "cost_per_1k_output": 0.0},
+    {"model": "solar-pro", "min_confidence": 0.0, "escalate_score": 1.01, "cost_per_1k_input": 0.0, "cost_per_1k_output": 0.0},
+])))
@@ -0,0 +1,208 @@
+import re
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# 줄 맨 앞에 오는 조문 제목만 조항의 시작으로 봅니다. ("제3조 (금지 품목)", "제12조의2(특례)")
+# 뒤에 "에", "의 규정" 등이 붙는 "제3조에 따라" 같은 본문 속 인용은 조항 시작이 아닙니다.
+ARTICLE_HEADER = re.compile(
+    r"^[ \t]*제\s*(?P<no>\d+)\s*조(?:\s*의\s*(?P<sub>\d+))?[ \t]*(?:[(（【](?P<title>[^)）】\n]*)[)）】])?(?=[ \t]|$)",
+    re.MULTILINE,
+)
+CHAPTER_HEADER = re.compile(r"^[ \t]*제\s*\d+\s*[장절편][ \t].*$", re.MULTILINE)
+# 항: ①②③..., 호: "1." "2.", 목: "가." "나."
+PARAGRAPH_START = re.compile(r"^[ \t]*[①-⑳]")
+ITEM_START = re.compile(r"^[ \t]*(?:\d+|[가-하])\.[ \t]")
+REFERENCE_PATTERN = re.compile(r"제\s*(\d+)\s*조(?:\s*의\s*(\d+))?")
+
+
+def article_id_of(no, sub=None):
+    return f"제{int(no)}조" + (f"의{int(sub)}" if sub else "")
+
+
+def article_label(metadata):
+    """chunk metadata로 "제3조 (금지 품목)" 형태의 조항 표기를 만듭니다. 조항이 아니면 None."""
+    article_id = (metadata or {}).get("article_id")
+    if not article_id:
+        return None
+    title = metadata.get("article_title")
+    return f"{article_id} ({title})" if title else article_id
+
+
+def resolve_policy_reference(reference, labels):
+    """LLM이 쓴 policy_reference를 검색된 조항의 정식 표기로 바꿉니다.
+
+    인용한 조항 번호가 검색된 조항 중에 있으면 그 표기로, 조항 번호 없이 썼는데 검색된 조항이
+    하나뿐이면 그 조항으로 바꾸고, 그 밖의 경우(검색되지 않은 조항, 영수증 간 검사 등)는 그대로 둡니다.
+    """
+    by_id = {label.split(" ", 1)[0]: label for label in labels or []}
+    match = REFERENCE_PATTERN.search(str(reference or ""))
+    if match:
+        return by_id.get(article_id_of(match.group(1), match.group(2)), reference)
+    if not reference and len(by_id) == 1:
+        return next(iter(by_id.values()))
+    return reference
+
+
+class ArticleTextSplitter:
+    """규정 문서를 제N조 / 항 / 호 구조에 맞춰 자르는 splitter입니다.
+
+    조항 하나가 chunk_size 안에 들어가면 조항 전체를 chunk 하나로 만들고, 넘치면 항(①②) 단위,
+    그래도 넘치면 호(1. 2.) 단위로 묶어서 나눕니다. 나뉜 chunk에도 조문 제목 줄을 앞에 붙여서
+    chunk만 보고도 어느 조항인지 알 수 있게 합니다. metadata에는 article_id("제3조"),
+    article_title("금지 품목"), chapter("제1장 총칙"), start_index(원문에서의 시작 위치)를 남깁니다.
+    조항 구조가 없는 문서는 줄/문장 단위의 일반 splitter로 자릅니다.
+    """
+
+    def __init__(self, chunk_size=600, chunk_overlap=100, min_preamble_chars=100):
+        self.chunk_size = chunk_size
+        self.min_preamble_chars = min_preamble_chars
+        # 조항 구조가 없는 문서, 항/호로도 나눌 수 없는 긴 문단에만 쓰는 예비 splitter입니다.
+        # ("제"를 구분자로 쓰면 "제출", "제한" 같은 단어 중간에서 잘리므로 쓰지 않습니다.)
+        self._fallback = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            separators=["\n\n", "\n", ". ", " ", ""],
+        )
+
+    def _articles(self, text):
+        # (시작 위치, 끝 위치, article_id, 제목) 목록. 조항 번호가 앞 조항보다 작으면 본문 속 인용으로 보고 무시합니다.
+        headers = []
+        last = (0, 0)
+        for match in ARTICLE_HEADER.finditer(text):
+            number = (int(match.group("no")), int(match.group("sub") or 0))
+            if number <= last:
+                continue
+            headers.append((match.start(), article_id_of(match.group("no"), match.group("sub")), (match.group("title") or "").strip()))
+            last = number
+        return [
+            (start, headers[i + 1][0] if i + 1 < len(headers) else len(text), article_id, title)
+            for i, (start, article_id, title) in enumerate(headers)
+        ]
+
+    @staticmethod
+    def _units(lines, pattern):
+        # pattern에 맞는 줄에서 새 단위가 시작되도록 (시작 위치, 줄 목록) 단위로 묶습니다.
+        units = []
+        for offset, line in lines:
+            if not units or pattern.match(line):
+                units.append([offset, []])
+            units[-1][1].append((offset, line))
+        return units
+
+    def _pieces(self, lines, budget):
+        # 항 -> 호 -> 예비 splitter 순서로, 각 조각이 budget 글자를 넘지 않게 나눕니다.
+        text = "\n".join(line for _, line in lines)
+        if len(text) <= budget:
+            return [(lines[0][0], text)]
+        for pattern in (PARAGRAPH_START, ITEM_START):
+            units = self._units(lines, pattern)
+            if len(units) > 1:
+                return [piece for _, unit_lines in units for piece in self._pieces(unit_lines, budget)]
+        start = lines[0][0]
+        return [(start + text.find(part), part) for part in self._fallback.split_text(text)]
+
+    def _pack(self, pieces, budget):
+        # 작은 조각들은 budget 안에서 다시 이어 붙여서 chunk 수를 줄입니다.
+        packed = []
+        for start, text in pieces:
+            if packed and len(packed[-1][1]) + 1 + len(text) <= budget:
+                packed[-1] = (packed[-1][0], packed[-1][1] + "\n" + text)
+            else:
+                packed.append((start, text))
+        return packed
+
+    def _split_article(self, text, start):
+        lines = []
+        offset = start
+        for line in text.split("\n"):
+            if line.strip() and not CHAPTER_HEADER.match(line):
+                lines.append((offset, line.rstrip()))
+            offset += len(line) + 1
+        if not lines:
+            return []
+
+        body = "\n".join(line for _, line in lines)
+        if len(body) <= self.chunk_size:
+            return [(lines[0][0], body)]
+
+        header = lines[0][1]
+        budget = max(self.chunk_size - len(header) - 1, self.chunk_size // 2)
+        pieces = self._pack(self._pieces(lines[1:], budget), budget) if len(lines) > 1 else []
+        if not pieces:
+            return self._pieces(lines, self.chunk_size)
+        # 첫 조각은 제목 줄과 함께 시작하고, 나머지 조각에도 제목 줄을 붙입니다.
+        return [(lines[0][0] if i == 0 else piece_start, f"{header}\n{piece}") for i, (piece_start, piece) in enumerate(pieces)]
+
+    def _split_plain(self, text):
+        # 조항이 아닌 부분은 예비 splitter로 자르고, 원문에서의 시작 위치만 metadata에 남깁니다.
+        chunks, offset = [], 0
+        for chunk in self._fallback.split_text(text):
+            start = text.find(chunk, offset)
+            if start >= 0:
+                offset = start + 1
+            chunks.append((chunk, {"start_index": start}))
+        return chunks
+
+    def split_text_with_metadata(self, text):
+        """(chunk 텍스트, metadata) 목록을 돌려줍니다."""
+        articles = self._articles(text)
+        if not articles:
+            return self._split_plain(text)
+
+        chunks = []
+        preamble = text[:articles[0][0]]
+        # 장 제목은 조항 metadata(chapter)에 남으므로 빼고 봅니다.
+        short_preamble = CHAPTER_HEADER.sub("", preamble).strip()
+        if len(short_preamble) >= self.min_preamble_chars:
+            chunks.extend(self._split_plain(preamble))
+            short_preamble = ""
+
+        chapters = [(m.start(), m.group(0).strip()) for m in CHAPTER_HEADER.finditer(text)]
+        for start, end, article_id, title in articles:
+            chapter = next((name for position, name in reversed(chapters) if position < start), None)
+            metadata = {"article_id": article_id}
+            if title:
+                metadata["article_title"] = title
+            if chapter:
+                metadata["chapter"] = chapter
+            for piece_start, piece in self._split_article(text[start:end], start):
+                if short_preamble:
+                    # 짧은 머리말(문서 제목, 시행일 등)은 따로 chunk를 만들지 않고 첫 조항의 첫 chunk 앞에 붙입니다.
+                    piece_start = text.find(short_preamble)
+                    piece = f"{short_preamble}\n{piece}"
+                    short_preamble = ""
+                chunks.append((piece, {**metadata, "start_index": piece_start}))
+        return chunks
+
+    def split_text(self, text):
+        return [chunk for chunk, _ in self.split_text_with_metadata(text)]
+
+    def create_documents(self, texts, metadatas=None):
+        documents = []
+        for i, text in enumerate(texts):
+            base = dict(metadatas[i]) if metadatas else {}
+            for chunk, metadata in self.split_text_with_metadata(text):
+                documents.append(Document(page_content=chunk, metadata={**base, **metadata}))
+        return documents
+
+    def split_documents(self, documents):
+        # PDF는 쪽마다 Document가 하나씩이라 쪽 단위로 자르면 쪽을 넘어가는 조항이 끊깁니다.
+        # 그래서 같은 source의 쪽들을 이어 붙인 뒤 조항 단위로 자르고, chunk가 시작하는 쪽 번호를 metadata에 남깁니다.
+        grouped = {}
+        for doc in documents:
+            grouped.setdefault(doc.metadata.get("source"), []).append(doc)
+
+        chunks = []
+        for pages in grouped.values():
+            text, page_starts = "", []
+            for page in pages:
+                page_starts.append((len(text), page.metadata.get("page")))
+                text += page.page_content.rstrip("\n") + "\n"
+            base = {key: value for key, value in pages[0].metadata.items() if key not in ("page", "page_label")}
+            for chunk, metadata in self.split_text_with_metadata(text):
+                start = metadata.get("start_index", text.find(chunk))
+                page = next((number for position, number in reversed(page_starts) if position <= start), None)
+                extra = {"page": page} if page is not None else {}
+                chunks.append(Document(page_content=chunk, metadata={**base, **extra, **metadata}))
+        return chunks
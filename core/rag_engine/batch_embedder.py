@@ -0,0 +1,87 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .context_builder import estimate_tokens
+
+# 재시도할 만한 오류입니다. (요청 한도 초과, 일시적인 서버 오류)
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _is_retryable(exc):
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    message = str(exc).lower()
+    return "rate limit" in message or "too many requests" in message or "timeout" in message
+
+
+class BatchEmbedder:
+    """많은 chunk를 임베딩할 때 요청 크기와 동시 요청 수를 제한하는 래퍼입니다.
+
+    텍스트를 개수(batch_size)와 토큰 수(max_batch_tokens) 기준으로 나눠서,
+    최대 concurrency개의 요청을 동시에 보냅니다. 요청 한도 초과(429)나 일시적인
+    서버 오류는 지수 백오프(+jitter)로 max_retries번까지 다시 시도합니다.
+    """
+
+    def __init__(self, embedding_model, batch_size=100, max_batch_tokens=50000, concurrency=4, max_retries=5, backoff_base=1.0):
+        self.embedding_model = embedding_model
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+
+        self.requests = 0
+        self.retries = 0
+        self.tokens = 0
+        self._lock = threading.Lock()
+
+    def make_batches(self, texts):
+        # 원래 순서를 유지하면서 (시작 위치, 텍스트 목록) 단위로 나눕니다.
+        batches = []
+        start, current, current_tokens = 0, [], 0
+        for index, text in enumerate(texts):
+            tokens = estimate_tokens(text)
+            if current and (len(current) >= self.batch_size or current_tokens + tokens > self.max_batch_tokens):
+                batches.append((start, current))
+                start, current, current_tokens = index, [], 0
+            current.append(text)
+            current_tokens += tokens
+        if current:
+            batches.append((start, current))
+        return batches
+
+    def _embed_batch(self, texts):
+        for attempt in range(self.max_retries + 1):
+            try:
+                vectors = self.embedding_model.embed_documents(texts)
+                with self._lock:
+                    self.requests += 1
+                    self.tokens += sum(estimate_tokens(t) for t in texts)
+                return vectors
+            except Exception as exc:
+                if attempt == self.max_retries or not _is_retryable(exc):
+                    raise
+                with self._lock:
+                    self.retries += 1
+                time.sleep(self.backoff_base * (2 ** attempt) * (0.5 + random.random()))
+
+    def embed(self, texts, progress=None):
+        """texts를 임베딩해서 같은 순서의 벡터 목록을 돌려줍니다. progress(완료 개수, 전체 개수)로 진행 상황을 알립니다."""
+        texts = list(texts)
+        vectors = [None] * len(texts)
+        done = 0
+        with ThreadPoolExecutor(max_workers=max(1, self.concurrency)) as pool:
+            futures = {pool.submit(self._embed_batch, batch): (start, batch) for start, batch in self.make_batches(texts)}
+            for future in as_completed(futures):
+                start, batch = futures[future]
+                vectors[start:start + len(batch)] = future.result()
+                done += len(batch)
+                if progress is not None:
+                    progress(done, len(texts))
+        return vectors
+
+    def stats(self):
+        return {"requests": self.requests, "retries": self.retries, "tokens": self.tokens}
@@ -0,0 +1,148 @@
+import math
+import re
+
+ARTICLE_PATTERN = re.compile(r"제\s*\d+\s*조(?:\s*의\s*\d+)?")
+
+
+def estimate_tokens(text):
+    """프롬프트 토큰 수를 대략적으로 계산합니다.
+
+    한글/한자처럼 ASCII가 아닌 글자는 글자당 1토큰, 영문/숫자/기호는 4글자당 1토큰으로 셉니다.
+    실제 토크나이저보다 약간 크게 잡히도록 한 보수적인 추정치입니다.
+    """
+    if not text:
+        return 0
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    ascii_chars = sum(1 for ch in text if ord(ch) <= 127 and not ch.isspace())
+    return non_ascii + math.ceil(ascii_chars / 4)
+
+
+def _overlap(left, right, min_overlap=20, max_overlap=300):
+    # left의 끝부분과 right의 앞부분이 겹치는 가장 긴 길이를 찾습니다. (chunk_overlap으로 생긴 중복 구간)
+    upper = min(len(left), len(right), max_overlap)
+    for size in range(upper, min_overlap - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+class RuleContextBuilder:
+    """검색된 규정 chunk들을 프롬프트에 넣을 하나의 텍스트로 압축합니다.
+
+    - chunk_overlap 때문에 인접 chunk끼리 겹치는 구간은 한 번만 남깁니다.
+    - 같은 조항(제N조)에 속한 인접 chunk는 하나로 이어 붙입니다.
+    - 검색 순위가 높은 규정부터 채워 넣고, 토큰 예산을 넘으면 잘라냅니다.
+    """
+
+    def __init__(self, max_tokens=1200, min_overlap=20):
+        self.max_tokens = max_tokens
+        self.min_overlap = min_overlap
+
+    @staticmethod
+    def _article_of(doc):
+        article_id = doc.metadata.get("article_id")
+        if article_id:
+            return article_id
+        match = ARTICLE_PATTERN.match(doc.page_content.strip())
+        return re.sub(r"\s+", "", match.group(0)) if match else None
+
+    @staticmethod
+    def _source_of(doc):
+        return doc.metadata.get("source", "")
+
+    def _try_merge(self, segment, text, article, start):
+        if text in segment["text"]:
+            return True
+        if segment["text"] in text:
+            # text가 segment를 포함하므로 문서상 시작 위치도 text 쪽입니다.
+            segment["text"] = text
+            if start is not None:
+                segment["start"] = start
+            return True
+
+        # 앞/뒤로 겹치는 구간이 있으면 겹친 부분을 한 번만 남기고 이어 붙입니다.
+        size = _overlap(segment["text"], text, self.min_overlap)
+        if size:
+            segment["text"] += text[size:]
+            return True
+        size = _overlap(text, segment["text"], self.min_overlap)
+        if size:
+            segment["text"] = text + segment["text"][size:]
+            if start is not None:
+                segment["start"] = start
+            return True
+
+        # 겹치는 구간은 없지만 같은 조항이라면 문서상 순서대로 이어 붙입니다.
+        if article and article == segment["article"]:
+            if start is not None and segment["start"] is not None and start < segment["start"]:
+                segment["text"] = text + "\n" + segment["text"]
+                segment["start"] = start
+            else:
+                segment["text"] += "\n" + text
+            return True
+        return False
+
+    def _merge(self, docs):
+        segments = []
+        for doc in docs:
+            text = doc.page_content.strip()
+            if not text:
+                continue
+
+            article = self._article_of(doc)
+            source = self._source_of(doc)
+            start = doc.metadata.get("start_index")
+
+            for segment in segments:
+                if segment["source"] == source and self._try_merge(segment, text, article, start):
+                    break
+            else:
+                segments.append({"source": source, "article": article, "start": start, "text": text})
+        return segments
+
+    @staticmethod
+    def _cut(line, budget):
+        # 줄 하나가 예산보다 길면 예산 안에 들어가는 가장 긴 앞부분만 남깁니다. (estimate_tokens는 앞부분이 길수록 커지므로 이분 탐색)
+        low, high = 0, len(line)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if estimate_tokens(line[:mid]) <= budget:
+                low = mid
+            else:
+                high = mid - 1
+        return line[:low]
+
+    def _truncate(self, text, budget):
+        # 예산 안에 들어가는 만큼만 줄 단위로 남깁니다. 첫 줄부터 예산을 넘으면 그 줄을 글자 단위로 자릅니다.
+        kept = []
+        used = 0
+        for line in text.split("\n"):
+            cost = estimate_tokens(line)
+            if used + cost > budget:
+                if not kept:
+                    kept.append(self._cut(line, budget))
+                break
+            kept.append(line)
+            used += cost
+        return "\n".join(kept).strip()
+
+    def build(self, docs):
+        """검색 순위 순서의 docs를 받아 (규정 텍스트, 추정 토큰 수)를 돌려줍니다."""
+        parts = []
+        used = 0
+        for segment in self._merge(docs):
+            remaining = self.max_tokens - used
+            if remaining <= 0:
+                break
+
+            text = segment["text"]
+            if estimate_tokens(text) > remaining:
+                text = self._truncate(text, remaining)
+                # 남은 예산으로는 이 규정을 한 글자도 못 넣는 경우이므로, 다음(더 짧을 수 있는) 규정을 봅니다.
+                if not text:
+                    continue
+
+            parts.append(text)
+            used += estimate_tokens(text)
+
+        return "\n\n".join(parts), used
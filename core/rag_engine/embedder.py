@@ -1,32 +1,83 @@
+import hashlib
+
 from dotenv import load_dotenv
 from langchain_upstage import UpstageEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader
 
+from core.config import (
+    EMBEDDING_BACKEND,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_MODEL,
+    HASHING_EMBEDDING_DIM,
+    LOCAL_EMBEDDING_BATCH_SIZE,
+    LOCAL_EMBEDDING_DEVICE,
+    LOCAL_EMBEDDING_DOCUMENT_PREFIX,
+    LOCAL_EMBEDDING_MODEL,
+    LOCAL_EMBEDDING_QUERY_PREFIX,
+)
+from .article_splitter import ArticleTextSplitter
+from .embedding_cache import CachedEmbeddings
+from .local_embeddings import HashingEmbeddings, SentenceTransformerEmbeddings
+
 load_dotenv()
 
-class RegulationEmbedder:
-    def __init__(self):
-        self.embeddings = UpstageEmbeddings(model="solar-embedding-1-large")
-        # TODO 규정 끊는 단위를 우선 문단 단위로 설정했습니다! 이건 확인해보시고 우선순위를 어떻게 정할 지 함께 이야기해보면 좋을 것 같아요!
-        '''
-        chunk_size: 600자 내외로 규정을 자릅니다.
-        chunk_overlap: 문맥 유지를 위해서 chunk 사이에 100자의 겹치는 구간을 설정했습니다.
-        separators: 우선순위에 따라서 문단을 자릅니다.
-            - 1순위: "\n\n"(문단 기준)
-            - 2순위: "\n"(줄바꿈 기준)
-            - 3순위: "제"(보통 규정집에서는 조항마다 '제1조'처럼 되어있는 경우가 많으므로, '제'라는 글자를 기준)
-            - 4순위: "."(그래도 안되면 문장 끝마침표 기준)
-        '''
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=600,
-            chunk_overlap=100,
-            separators=["\n\n", "\n", "제", "."]
+
+def build_text_splitter():
+    # 임베딩 모델 없이 split만 필요한 곳(규정 문서 병렬 적재의 worker 프로세스 등)에서도 같은 설정을 쓰도록 분리했습니다.
+    '''
+    규정집의 제N조 / 항 / 호 구조에 맞춰 자릅니다. (ArticleTextSplitter 참고)
+    chunk_size: 조항 하나가 600자를 넘으면 항(①②), 호(1. 2.) 단위로 나눕니다.
+    chunk_overlap: 조항 구조가 없는 문서를 일반 splitter로 자를 때만 100자씩 겹치게 자릅니다.
+    이전에는 "제"를 구분자로 썼는데, "제출", "제한"처럼 단어 중간에서 잘리고 조항이 예측할 수 없게 끊겨서 바꿨습니다.
+    '''
+    return ArticleTextSplitter(chunk_size=600, chunk_overlap=100)
+
+
+def build_embeddings(backend=EMBEDDING_BACKEND):
+    # EMBEDDING_BACKEND에 맞는 임베딩 모델과, 캐시 키/벡터 DB 기록에 쓸 모델 이름을 돌려줍니다.
+    if backend == "hashing":
+        embeddings = HashingEmbeddings(HASHING_EMBEDDING_DIM)
+        return embeddings, embeddings.model_name
+    if backend == "sentence-transformers":
+        embeddings = SentenceTransformerEmbeddings(
+            LOCAL_EMBEDDING_MODEL,
+            device=LOCAL_EMBEDDING_DEVICE,
+            batch_size=LOCAL_EMBEDDING_BATCH_SIZE,
+            query_prefix=LOCAL_EMBEDDING_QUERY_PREFIX,
+            document_prefix=LOCAL_EMBEDDING_DOCUMENT_PREFIX,
         )
+        return embeddings, LOCAL_EMBEDDING_MODEL
+    if backend == "upstage":
+        return UpstageEmbeddings(model=EMBEDDING_MODEL), EMBEDDING_MODEL
+    raise ValueError(f"지원하지 않는 EMBEDDING_BACKEND입니다: {backend}")
+
+
+class RegulationEmbedder:
+    def __init__(self, backend=EMBEDDING_BACKEND):
+        self.embeddings, self.model_name = build_embeddings(backend)
+        # 같은 텍스트를 다시 임베딩하지 않도록 로컬 캐시로 감쌉니다. (ingest와 검색이 같은 캐시 파일을 공유)
+        # 해싱 벡터는 캐시를 읽는 것보다 바로 계산하는 편이 빠르므로 감싸지 않습니다.
+        if EMBEDDING_CACHE_PATH and backend != "hashing":
+            self.embeddings = CachedEmbeddings(self.embeddings, self.model_name, EMBEDDING_CACHE_PATH)
+        self.text_splitter = build_text_splitter()
+
+    @staticmethod
+    def assign_chunk_ids(chunks, source=None):
+        # chunk 내용의 해시로 id를 만듭니다. 규정 문서를 다시 적재해도 내용이 바뀌지 않은 chunk는 같은 id를 가지므로
+        # 벡터 DB에서 다시 임베딩하거나 중복으로 추가하지 않습니다. (출처가 다르면 같은 문장이라도 다른 chunk로 봅니다.)
+        for chunk in chunks:
+            if source is not None or "source" not in chunk.metadata:
+                chunk.metadata["source"] = source or "inline"
+            content_hash = hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest()
+            chunk.metadata["content_hash"] = content_hash
+            chunk.metadata["chunk_id"] = hashlib.sha256(
+                f"{chunk.metadata['source']}:{content_hash}".encode("utf-8")
+            ).hexdigest()[:32]
+        return chunks
 
-    def get_chunks(self, text_list):
+    def get_chunks(self, text_list, source=None):
         # text_list를 받아서, LangChain이 이해할 수 있는 Document 객체들의 리스트로 변환함
-        return self.text_splitter.create_documents(text_list)
+        return self.assign_chunk_ids(self.text_splitter.create_documents(text_list), source)
 
     def get_embedding_model(self):
         return self.embeddings
@@ -34,4 +85,4 @@ class RegulationEmbedder:
     def split_documents(self, file_path: str):
         loader = PyPDFLoader(file_path)
         docs = loader.load()
-        return self.text_splitter.split_documents(docs)
\ No newline at end of file
+        return self.assign_chunk_ids(self.text_splitter.split_documents(docs))
\ No newline at end of file
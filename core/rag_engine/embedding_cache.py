@@ -0,0 +1,147 @@
+import hashlib
+import sqlite3
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from langchain_core.embeddings import Embeddings
+
+from core.config import QUERY_EMBED_CONCURRENCY
+
+
+def embed_query_batch(embeddings, texts, concurrency=QUERY_EMBED_CONCURRENCY):
+    """여러 질의를 질의용 임베딩으로 벡터화합니다.
+
+    질의를 배치로 임베딩할 수 있는 모델이면 한 번에 요청하고, 그렇지 않으면 embed_query를
+    최대 concurrency개씩 동시에 호출합니다. 질의용/문서용 임베딩이 다른 모델(Upstage)에서
+    embed_documents로 질의를 벡터화하면 저장된 chunk와 다른 공간의 벡터가 나오기 때문입니다.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(texts)
+    if len(texts) == 1 or concurrency <= 1:
+        return [embeddings.embed_query(t) for t in texts]
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(texts))) as pool:
+        return list(pool.map(embeddings.embed_query, texts))
+
+
+class CachedEmbeddings(Embeddings):
+    """임베딩 결과를 로컬 SQLite 파일에 저장해 두고 재사용하는 래퍼입니다.
+
+    키는 (모델 이름, 텍스트의 sha256)이고, 벡터는 float32 바이트로 저장합니다.
+    규정 적재(ingest)와 규정 검색(retrieval)이 같은 파일을 쓰기 때문에,
+    한 번이라도 임베딩한 문장은 다시 네트워크를 타지 않습니다.
+    """
+
+    def __init__(self, embeddings, model_name, cache_path):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache_path = str(cache_path)
+        Path(self.cache_path).parent.mkdir(parents=True, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _conn(self):
+        return sqlite3.connect(self.cache_path, timeout=30)
+
+    def _init_db(self):
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                )
+                """
+            )
+
+    @staticmethod
+    def _hash(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _lookup(self, model, hashes):
+        found = {}
+        with self._conn() as conn:
+            # SQLite 바인딩 변수 개수 제한을 넘지 않도록 나눠서 조회합니다.
+            for start in range(0, len(hashes), 500):
+                part = hashes[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(part))})",
+                    (model, *part),
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = array("f", blob).tolist()
+        return found
+
+    def _store(self, model, pairs):
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                [(model, text_hash, array("f", vector).tobytes()) for text_hash, vector in pairs],
+            )
+
+    def _record(self, hits, misses):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def _embed_cached(self, texts, model, compute):
+        texts = list(texts)
+        if not texts:
+            return []
+
+        hashes = [self._hash(t) for t in texts]
+        found = self._lookup(model, list(set(hashes)))
+
+        # 캐시에 없는 텍스트만 (중복 제거 후) 원래 임베딩 모델로 한 번에 요청합니다.
+        missing = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in found and text_hash not in missing:
+                missing[text_hash] = text
+        if missing:
+            vectors = compute(list(missing.values()))
+            computed = list(zip(missing.keys(), vectors))
+            self._store(model, computed)
+            found.update(computed)
+
+        self._record(len(texts) - len(missing), len(missing))
+        return [found[h] for h in hashes]
+
+    def embed_documents(self, texts):
+        return self._embed_cached(texts, self.model_name, self.embeddings.embed_documents)
+
+    def embed_queries(self, texts):
+        # embed_query와 같은 질의 키 공간을 쓰고, 캐시에 없는 질의만 질의용 임베딩으로 요청합니다.
+        return self._embed_cached(texts, f"{self.model_name}:query", lambda missing: embed_query_batch(self.embeddings, missing))
+
+    def embed_query(self, text):
+        # Upstage는 질의용/문서용 임베딩이 다를 수 있으므로 질의는 별도 키 공간에 저장합니다.
+        model = f"{self.model_name}:query"
+        text_hash = self._hash(text)
+        found = self._lookup(model, [text_hash])
+        if text_hash in found:
+            self._record(1, 0)
+            return found[text_hash]
+
+        vector = self.embeddings.embed_query(text)
+        self._store(model, [(text_hash, vector)])
+        self._record(0, 1)
+        return vector
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
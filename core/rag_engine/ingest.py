@@ -1,26 +1,211 @@
+import argparse
 import os
-from .embedder import RegulationEmbedder
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from langchain_community.document_loaders import PyPDFLoader
+
+from core.config import (
+    INGEST_EMBED_BATCH_SIZE,
+    INGEST_EMBED_BATCH_TOKENS,
+    INGEST_EMBED_CONCURRENCY,
+    INGEST_EMBED_MAX_RETRIES,
+    INGEST_PARSE_WORKERS,
+)
+from .batch_embedder import BatchEmbedder
+from .embedder import RegulationEmbedder, build_text_splitter
+from .snapshots import SnapshotStore
+from .tenants import tenant_store_path
 from .vector_db import VectorDBManager
 
-def run_ingestion(pdf_path):
+
+def _split_pdf(pdf_path):
+    # 프로세스 풀의 worker에서 실행됩니다. 임베딩 모델은 만들지 않고 PDF 파싱과 split만 합니다.
+    # source는 경로 표기("./a.pdf"와 "a.pdf")가 달라도 같은 문서로 보이도록 정규화합니다.
+    try:
+        docs = PyPDFLoader(pdf_path).load()
+        chunks = build_text_splitter().split_documents(docs)
+        return pdf_path, len(docs), RegulationEmbedder.assign_chunk_ids(chunks, os.path.normpath(pdf_path)), None
+    except Exception as exc:
+        return pdf_path, 0, [], f"{type(exc).__name__}: {exc}"
+
+
+def _stale_sources(sources, directory, current):
+    # directory 아래에 있던 규정 파일 중 이번 적재 목록(current)에 없는 것들입니다.
+    # 문자열 접두사로 비교하면 data/raw를 적재할 때 data/raw2 아래 파일까지 지워지므로 경로 단위로 비교합니다.
+    # (이전에 절대 경로로 적재한 source도 있을 수 있으므로 절대 경로로 바꿔서 비교합니다.)
+    root = os.path.abspath(directory)
+    return [
+        source for source in sources
+        if source not in current and os.path.commonpath([root, os.path.abspath(source)]) == root
+    ]
+
+
+def _progress(stage):
+    def report(done, total):
+        print(f"\r[{stage}] {done}/{total}", end="" if done < total else "\n", file=sys.stderr, flush=True)
+    return report
+
+
+def _ingest(pdf_paths, directory=None, workers=INGEST_PARSE_WORKERS, batch_size=INGEST_EMBED_BATCH_SIZE, concurrency=INGEST_EMBED_CONCURRENCY, tenant_id=None):
+    # 서버가 읽고 있는 벡터 DB에는 쓰지 않고, 현재 스냅샷을 복사한 새 스냅샷에 동기화한 뒤 다 끝나면 한 번에 전환합니다.
+    # tenant_id가 있으면 그 테넌트의 벡터 DB에 적재합니다. (TENANT_STORE_ROOT/<tenant_id>)
+    snapshots = SnapshotStore(tenant_store_path(tenant_id))
     embedder = RegulationEmbedder()
-    db_manager = VectorDBManager()
-    
+    # 임베딩 모델이 바뀌면 기존 벡터와 섞을 수 없으므로 현재 스냅샷을 복사하지 않고 전부 다시 임베딩합니다.
+    previous_model = snapshots.embedding_of()
+    same_model = previous_model in (None, embedder.model_name)
+    if not same_model:
+        print(f"--- 임베딩 모델 변경 ({previous_model} -> {embedder.model_name}): 새 스냅샷에 전부 다시 임베딩합니다 ---")
+    previous_version = snapshots.active_version()
+    version, path = snapshots.prepare(copy=same_model)
+    try:
+        report = _ingest_into(path, embedder, pdf_paths, directory, workers, batch_size, concurrency)
+        snapshots.record_embedding(path, embedder.model_name)
+        # 복사해서 시작한 스냅샷이면 새로 생기거나 바뀐 chunk만 기록하고, 전부 다시 임베딩했으면 모든 감사가 영향을 받습니다.
+        snapshots.record_changes(path, {
+            "previous_version": previous_version,
+            "reembedded": not same_model,
+            "removed": report["removed"],
+            "added_articles": report["added_articles"],
+        })
+    except BaseException:
+        snapshots.discard(version)
+        raise
+
+    changed = report["added"] or report["removed"] or report["metadata_updated"] or not same_model
+    if not changed and snapshots.active_version() is not None:
+        # 바뀐 chunk가 없으면 새 버전을 만들지 않습니다.
+        snapshots.discard(version)
+        report["version"] = snapshots.active_version()
+        print(f"--- 바뀐 규정이 없어 현재 스냅샷({report['version']})을 그대로 사용합니다 ---")
+        return report
+
+    snapshots.publish(version)
+    pruned = snapshots.prune()
+    report["version"] = version
+    print(f"--- 새 스냅샷 {version} 적용 (서버는 재시작 없이 전환, 보관 {len(snapshots.versions())}개, 삭제 {len(pruned)}개) ---")
+    tenant_option = f" --tenant {tenant_id}" if tenant_id else ""
+    print(f"--- 바뀐 규정을 참고한 감사만 다시 돌리려면: python -m server.batch_audit --policy-change {version}{tenant_option} ---")
+    return report
+
+
+def _ingest_into(persist_path, embedder, pdf_paths, directory, workers, batch_size, concurrency):
+    db_manager = VectorDBManager(persist_path, watch=False)
+    embedding_model = embedder.get_embedding_model()
+    started = time.perf_counter()
+
+    # 1. PDF 파싱과 split은 CPU 작업이므로 프로세스 풀에서 병렬로 처리합니다.
+    print(f"--- 규정 문서 {len(pdf_paths)}개 split 진행 중 ---")
+    chunks, pages, failed = [], 0, []
+    report_parse = _progress("parse")
+    with ProcessPoolExecutor(max_workers=workers or None) as pool:
+        for done, (path, page_count, doc_chunks, error) in enumerate(pool.map(_split_pdf, pdf_paths), 1):
+            if error:
+                failed.append((path, error))
+            chunks.extend(doc_chunks)
+            pages += page_count
+            report_parse(done, len(pdf_paths))
+    parse_seconds = time.perf_counter() - started
+
+    # 디렉터리 단위로 적재할 때는 디렉터리에서 사라진 규정 파일의 chunk도 정리합니다.
+    # (파싱에 실패한 파일의 chunk는 그대로 둡니다.)
+    stale = []
+    if directory is not None:
+        current = {doc.metadata["source"] for doc in chunks} | {os.path.normpath(path) for path, _ in failed}
+        stale = _stale_sources(db_manager.list_sources(embedding_model), directory, current)
+
+    # 2. 새로 생기거나 바뀐 chunk만 크기 제한된 배치로, 제한된 동시 요청 수로 임베딩하고 벡터 DB에 한 번에 씁니다.
+    print(f"--- 벡터화 및 벡터 DB 동기화 중 (경로: {db_manager.persist_path}) ---")
+    batcher = BatchEmbedder(
+        embedding_model,
+        batch_size=batch_size,
+        max_batch_tokens=INGEST_EMBED_BATCH_TOKENS,
+        concurrency=concurrency,
+        max_retries=INGEST_EMBED_MAX_RETRIES,
+    )
+    sync_started = time.perf_counter()
+    report = db_manager.sync_documents(
+        chunks,
+        embedding_model,
+        sources=stale,
+        embed_documents=lambda texts: batcher.embed(texts, progress=_progress("embed")),
+    )
+    # numpy 검색을 쓰는 경우, 동기화가 끝난 Chroma 컬렉션을 검색용 행렬로 다시 내보냅니다.
+    index = db_manager.export_numpy_index(embedding_model) if db_manager.backend == "numpy" else None
+    # 하이브리드/어휘 검색용 BM25 인덱스는 백엔드와 관계없이 항상 다시 만듭니다.
+    lexical = db_manager.export_lexical_index(embedding_model)
+    sync_seconds = time.perf_counter() - sync_started
+    # 새로 생긴 chunk가 속한 조항. 기존 조항에 문단이 추가된 경우, 그 조항을 참고했던 감사도 다시 봐야 합니다.
+    metadata = {doc.metadata["chunk_id"]: doc.metadata for doc in chunks}
+    report["added_articles"] = sorted({
+        (metadata[chunk_id]["source"], metadata[chunk_id]["article_id"])
+        for chunk_id in report["added"]
+        if metadata[chunk_id].get("article_id")
+    })
+    total_seconds = time.perf_counter() - started
+
+    print(
+        f"--- 규정 문서 벡터 DB 동기화 완료: 추가 {len(report['added'])} / 삭제 {len(report['removed'])} / "
+        f"위치만 변경 {len(report['metadata_updated'])} / 변경 없음 {report['unchanged']} ---"
+    )
+    stats = batcher.stats()
+    print(
+        f"--- 파싱: 문서 {len(pdf_paths)}개, {pages}쪽, chunk {len(chunks)}개, {parse_seconds:.1f}초 "
+        f"({len(pdf_paths) / parse_seconds if parse_seconds else 0:.1f} 문서/초) ---"
+    )
+    print(
+        f"--- 임베딩/저장: chunk {len(report['added'])}개, 요청 {stats['requests']}회 (재시도 {stats['retries']}회), "
+        f"약 {stats['tokens']} 토큰, {sync_seconds:.1f}초 ({len(report['added']) / sync_seconds if sync_seconds else 0:.1f} chunk/초) ---"
+    )
+    print(f"--- 전체 {total_seconds:.1f}초 ---")
+    if index:
+        print(f"--- numpy 인덱스 생성: chunk {index['chunks']}개, {index['dimension']}차원 {index['dtype']} ({index['bytes'] / 1024:.0f} KB) ---")
+    print(f"--- BM25 인덱스 생성: chunk {lexical['chunks']}개, n-gram {lexical['terms']}개 ---")
+    for path, error in failed:
+        print(f"에러: {path} 파싱 실패 ({error})")
+
+    if hasattr(embedding_model, "stats"):
+        cache = embedding_model.stats()
+        print(f"--- 임베딩 캐시: hit {cache['hits']} / miss {cache['misses']} (hit rate {cache['hit_rate']:.1%}) ---")
+
+    report.update(
+        documents=len(pdf_paths),
+        pages=pages,
+        chunks=len(chunks),
+        failed=failed,
+        embedding=stats,
+        seconds={"parse": round(parse_seconds, 2), "sync": round(sync_seconds, 2), "total": round(total_seconds, 2)},
+    )
+    return report
+
+
+def run_ingestion(pdf_path, tenant_id=None):
     # 규정 문서는 일단 pdf 문서라고 가정하고 코드 작성하였습니다! 추후 규정 문서가 어떤 형식인지에 따라서 변경하면 될 것 같아요!
-    print(f"--- '{pdf_path}' split 진행 중 ---")
-    chunks = embedder.split_documents(pdf_path)
-    
-    # 규정 문서 벡터화
-    print(f"--- 벡터화 및 벡터 DB 생성 중 (경로: ./data/vector_store) ---")
-    db_manager.create_db(chunks, embedder.get_embedding_model())
-    
-    print("--- 규정 문서 벡터 DB 구축 완료 ---")
+    return _ingest([pdf_path], workers=1, tenant_id=tenant_id)
+
+
+def run_directory_ingestion(directory, workers=INGEST_PARSE_WORKERS, batch_size=INGEST_EMBED_BATCH_SIZE, concurrency=INGEST_EMBED_CONCURRENCY, tenant_id=None):
+    # 디렉터리 아래(하위 폴더 포함)의 모든 PDF를 적재합니다. (총칙, 부서별 규정, 연도별 개정안 등)
+    pdf_paths = sorted(str(path) for path in Path(directory).rglob("*.pdf"))
+    return _ingest(pdf_paths, directory=directory, workers=workers, batch_size=batch_size, concurrency=concurrency, tenant_id=tenant_id)
+
 
 if __name__ == "__main__":
     # 규정 pdf 경로는 임의로 설정했습니다! 이후 실제 규정 pdf가 담기는 경로에 따라서 수정하면 됩니다.
-    SAMPLE_POLICY_PATH = "./data/raw/organization_policy.pdf"
-    
-    if os.path.exists(SAMPLE_POLICY_PATH):
-        run_ingestion(SAMPLE_POLICY_PATH)
+    parser = argparse.ArgumentParser(description="규정 문서(PDF)를 벡터 DB에 적재합니다.")
+    parser.add_argument("path", nargs="?", default="./data/raw", help="PDF 파일 또는 PDF가 들어 있는 디렉터리")
+    parser.add_argument("--workers", type=int, default=INGEST_PARSE_WORKERS, help="PDF 파싱 프로세스 수 (0이면 CPU 개수)")
+    parser.add_argument("--batch-size", type=int, default=INGEST_EMBED_BATCH_SIZE, help="임베딩 요청 하나에 담는 chunk 수")
+    parser.add_argument("--concurrency", type=int, default=INGEST_EMBED_CONCURRENCY, help="동시에 보내는 임베딩 요청 수")
+    parser.add_argument("--tenant", help="규정을 적재할 테넌트 id (생략하면 기본 벡터 DB)")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.path):
+        run_directory_ingestion(args.path, args.workers, args.batch_size, args.concurrency, tenant_id=args.tenant)
+    elif os.path.exists(args.path):
+        _ingest([args.path], workers=1, batch_size=args.batch_size, concurrency=args.concurrency, tenant_id=args.tenant)
     else:
-        print(f"에러: {SAMPLE_POLICY_PATH} 파일을 찾을 수 없습니다.")
\ No newline at end of file
+        print(f"에러: {args.path} 파일을 찾을 수 없습니다.")
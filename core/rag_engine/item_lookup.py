@@ -0,0 +1,287 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from core.config import (
+    INGEST_EMBED_BATCH_SIZE,
+    INGEST_EMBED_BATCH_TOKENS,
+    INGEST_EMBED_CONCURRENCY,
+    INGEST_EMBED_MAX_RETRIES,
+    ITEM_CATEGORIES,
+    ITEM_CATEGORY_MIN_SIMILARITY,
+    ITEM_LOOKUP_PATH,
+)
+from .article_splitter import article_label
+from .batch_embedder import BatchEmbedder
+
+
+def normalize_key(name):
+    # "참이슬 후레쉬", "참이슬후레쉬", "A4 용지"/"a4용지"가 같은 키가 되도록 소문자로 바꾸고 공백을 없앱니다.
+    return re.sub(r"\s+", "", str(name or "")).lower()
+
+
+class _Trie:
+    # 품목명 키의 접두사 트리입니다. "참이슬후레쉬360ml"처럼 뒤에 용량/맛이 붙은 품목명을 가장 긴 등록 품목("참이슬후레쉬")으로 찾습니다.
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, key, value):
+        node = self.root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node[None] = value
+
+    def longest_prefix(self, key, min_length=2):
+        node, found = self.root, None
+        for depth, ch in enumerate(key, 1):
+            node = node.get(ch)
+            if node is None:
+                break
+            if None in node and depth >= min_length:
+                found = node[None]
+        return found
+
+
+class ItemCategoryLookup:
+    """미리 계산해 둔 품목명 -> 카테고리 -> 관련 조항 조회 테이블입니다.
+
+    테이블은 오프라인 작업(build_item_lookup)이 SQLite 파일로 만들고, 감사할 때는 파일 전체를
+    메모리(dict + 접두사 트리)에 올려서 조회합니다. 파일이 교체되면(변경 시각 기준) 다시 읽습니다.
+    """
+
+    def __init__(self, path=ITEM_LOOKUP_PATH, min_prefix=2):
+        self.path = str(path or "")
+        self.min_prefix = min_prefix
+        self._items = {}
+        self._trie = _Trie()
+        self._articles = {}
+        self._loaded_mtime = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def exists(self):
+        return bool(self.path) and os.path.exists(self.path)
+
+    def _load(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        with self._lock:
+            if self._loaded_mtime == mtime:
+                return
+            with sqlite3.connect(self.path) as conn:
+                items = dict(conn.execute("SELECT item_key, category FROM item_categories").fetchall())
+                articles = {}
+                for category, article_id, chunk_id, score in conn.execute(
+                    "SELECT category, article_id, chunk_id, score FROM category_articles ORDER BY category, rank"
+                ):
+                    articles.setdefault(category, []).append({"article_id": article_id, "chunk_id": chunk_id, "score": score})
+            trie = _Trie()
+            for key, category in items.items():
+                trie.insert(key, category)
+            self._items, self._trie, self._articles = items, trie, articles
+            self._loaded_mtime = mtime
+
+    def resolve(self, name):
+        """품목명의 카테고리를 돌려줍니다. 등록되지 않은 품목이면 None."""
+        if not self.exists():
+            return None
+        self._load()
+        key = normalize_key(name)
+        category = self._items.get(key) or self._trie.longest_prefix(key, self.min_prefix)
+        if category is not None and category in self._articles:
+            self.hits += 1
+            return category
+        self.misses += 1
+        return None
+
+    def articles(self, category):
+        """카테고리의 관련 조항 목록 (관련도 순서): [{"article_id", "chunk_id", "score"}, ...]"""
+        self._load()
+        return list(self._articles.get(category, []))
+
+    def version(self):
+        # 테이블 파일이 바뀌었는지 확인할 때 씁니다. (카테고리별 chunk를 캐시하는 쪽에서 사용)
+        return self._loaded_mtime
+
+    def stats(self):
+        if self.exists():
+            self._load()
+        total = self.hits + self.misses
+        return {
+            "items": len(self._items),
+            "categories": len(self._articles),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def classify_items(names, embedding_model, categories=ITEM_CATEGORIES, min_similarity=ITEM_CATEGORY_MIN_SIMILARITY, embed_documents=None):
+    """품목명 목록을 카테고리로 분류합니다. {정규화한 품목명: (카테고리, 방법, 유사도)}"""
+    classified = {}
+    keywords = [(normalize_key(word), category) for category, words in categories.items() for word in words]
+    # 긴 키워드부터 확인해서 "전자담배"가 "담배"보다, "하이볼"이 다른 짧은 키워드보다 먼저 맞도록 합니다.
+    keywords.sort(key=lambda pair: len(pair[0]), reverse=True)
+    remaining = []
+    for name in names:
+        key = normalize_key(name)
+        match = next((category for word, category in keywords if word and word in key), None)
+        if match:
+            classified[key] = (match, "keyword", 1.0)
+        else:
+            remaining.append(name)
+
+    # 키워드로 분류되지 않는 품목은 카테고리 설명(이름 + 키워드)과 임베딩 유사도로 분류합니다.
+    if remaining and categories:
+        embed = embed_documents or embedding_model.embed_documents
+        labels = list(categories)
+        descriptions = [f"{label}: {', '.join(categories[label])}" for label in labels]
+        vectors = np.asarray(embed(descriptions + remaining), dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        similarity = vectors[len(labels):] @ vectors[:len(labels)].T
+        for name, row in zip(remaining, similarity):
+            best = int(row.argmax())
+            if row[best] >= min_similarity:
+                classified[normalize_key(name)] = (labels[best], "embedding", round(float(row[best]), 4))
+    return classified
+
+
+def category_articles(db_manager, embedding_model, categories=ITEM_CATEGORIES, k=3):
+    """카테고리마다 설명 문장으로 벡터 DB를 검색해서 관련 조항 top-k를 구합니다. {카테고리: [행, ...]}"""
+    labels = list(categories)
+    queries = [f"{label}: {', '.join(categories[label])}" for label in labels]
+    # 같은 조항의 chunk가 여러 개 검색될 수 있으므로 넉넉하게 가져와서 조항 단위로 중복을 없앱니다.
+    per_category = db_manager.search_rules_by_vectors(embedding_model.embed_documents(queries), embedding_model, k=k * 3)
+    result = {}
+    for label, hits in zip(labels, per_category):
+        rows, seen = [], set()
+        for doc, score in hits:
+            article_id = doc.metadata.get("article_id")
+            key = article_id or doc.id
+            if key in seen:
+                continue
+            seen.add(key)
+            rows.append({"article_id": article_id, "chunk_id": doc.id, "label": article_label(doc.metadata), "score": round(float(score), 4)})
+            if len(rows) == k:
+                break
+        result[label] = rows
+    return result
+
+
+def write_lookup(path, classified, articles, meta):
+    # 읽는 쪽이 반쯤 만들어진 테이블을 보지 않도록 임시 파일에 만든 뒤 os.replace로 교체합니다.
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    if tmp.exists():
+        tmp.unlink()
+    with sqlite3.connect(tmp) as conn:
+        conn.executescript(
+            """
+            CREATE TABLE item_categories (
+                item_key TEXT PRIMARY KEY,
+                category TEXT NOT NULL,
+                method TEXT NOT NULL,
+                similarity REAL NOT NULL
+            );
+            CREATE INDEX idx_item_categories_category ON item_categories (category);
+            CREATE TABLE category_articles (
+                category TEXT NOT NULL,
+                rank INTEGER NOT NULL,
+                article_id TEXT,
+                chunk_id TEXT NOT NULL,
+                label TEXT,
+                score REAL NOT NULL,
+                PRIMARY KEY (category, rank)
+            );
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """
+        )
+        conn.executemany(
+            "INSERT INTO item_categories VALUES (?, ?, ?, ?)",
+            [(key, category, method, similarity) for key, (category, method, similarity) in classified.items()],
+        )
+        conn.executemany(
+            "INSERT INTO category_articles VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (category, rank, row["article_id"], row["chunk_id"], row["label"], row["score"])
+                for category, rows in articles.items()
+                for rank, row in enumerate(rows)
+            ],
+        )
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [(key, json.dumps(value, ensure_ascii=False)) for key, value in meta.items()])
+    os.replace(tmp, path)
+
+
+def load_item_names(items_file=None, receipts_db=None):
+    # 품목명 목록 파일(한 줄에 하나)과 저장된 영수증(DB)의 품목명을 합칩니다.
+    names = []
+    if items_file:
+        names.extend(line.strip() for line in Path(items_file).read_text(encoding="utf-8").splitlines())
+    if receipts_db:
+        with sqlite3.connect(receipts_db) as conn:
+            for (payload_json,) in conn.execute("SELECT payload_json FROM receipts"):
+                names.extend(str(item.get("name") or "").strip() for item in json.loads(payload_json).get("items", []))
+    # 정규화한 키 기준으로 중복을 없애고 처음 나온 표기를 남깁니다.
+    unique = {}
+    for name in names:
+        if name:
+            unique.setdefault(normalize_key(name), name)
+    return list(unique.values())
+
+
+def build_item_lookup(names, db_manager, embedding_model, path=ITEM_LOOKUP_PATH, categories=ITEM_CATEGORIES, k=3):
+    batcher = BatchEmbedder(
+        embedding_model,
+        batch_size=INGEST_EMBED_BATCH_SIZE,
+        max_batch_tokens=INGEST_EMBED_BATCH_TOKENS,
+        concurrency=INGEST_EMBED_CONCURRENCY,
+        max_retries=INGEST_EMBED_MAX_RETRIES,
+    )
+    classified = classify_items(names, embedding_model, categories, embed_documents=batcher.embed)
+    articles = category_articles(db_manager, embedding_model, categories, k=k)
+    meta = {
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+        "vector_store": db_manager.persist_path,
+        "vector_store_version": db_manager.version,
+        "categories": categories,
+        "k": k,
+    }
+    write_lookup(path, classified, articles, meta)
+    return classified, articles
+
+
+if __name__ == "__main__":
+    from .embedder import RegulationEmbedder
+    from .tenants import tenant_lookup_path, tenant_store_path
+    from .vector_db import VectorDBManager
+
+    parser = argparse.ArgumentParser(description="품목명 -> 카테고리 -> 관련 조항 조회 테이블을 만듭니다. (규정 적재 후 실행)")
+    parser.add_argument("--items", help="품목명 목록 파일 (한 줄에 하나)")
+    parser.add_argument("--receipts-db", help="저장된 영수증의 품목명도 포함 (예: data/intermediate/transparent_audit.db)")
+    parser.add_argument("--output", help="조회 테이블 경로 (기본값: ITEM_LOOKUP_PATH, 테넌트는 item_lookup.<tenant>.db)")
+    parser.add_argument("--tenant", help="테넌트 id (생략하면 기본 벡터 DB)")
+    parser.add_argument("--k", type=int, default=3, help="카테고리마다 저장할 관련 조항 수")
+    args = parser.parse_args()
+
+    names = load_item_names(args.items, args.receipts_db)
+    if not names:
+        print("에러: 품목명이 없습니다. --items 또는 --receipts-db를 지정하세요.")
+        raise SystemExit(1)
+
+    output = args.output or tenant_lookup_path(args.tenant)
+    classified, articles = build_item_lookup(
+        names, VectorDBManager(tenant_store_path(args.tenant)), RegulationEmbedder().get_embedding_model(), output, k=args.k
+    )
+    print(f"--- 품목 {len(names)}개 중 {len(classified)}개 분류 (미분류 품목은 감사할 때 벡터 검색) ---")
+    for category, rows in articles.items():
+        count = sum(1 for value in classified.values() if value[0] == category)
+        print(f"  {category}: 품목 {count}개 -> {', '.join(row['label'] or row['chunk_id'] for row in rows) or '(관련 조항 없음)'}")
+    print(f"--- 조회 테이블 저장: {output} ---")
@@ -0,0 +1,124 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+# 한글은 띄어쓰기와 조사 때문에 단어 단위로 자르면 "주류를"과 "주류"가 다른 토큰이 되므로, 글자 n-gram으로 색인합니다.
+WORD_PATTERN = re.compile(r"[0-9a-z가-힣]+")
+
+
+def tokenize(text, ngram_sizes=(2, 3)):
+    grams = []
+    for word in WORD_PATTERN.findall(str(text or "").lower()):
+        # n-gram보다 짧은 단어("술", "차")는 그대로 토큰으로 씁니다.
+        if len(word) < min(ngram_sizes):
+            grams.append(word)
+            continue
+        for n in ngram_sizes:
+            grams.extend(word[i:i + n] for i in range(len(word) - n + 1))
+    return grams
+
+
+class LexicalIndex:
+    """규정 chunk에 대한 글자 n-gram BM25 인덱스입니다.
+
+    "주류", "담배", "제3조", "22시" 같은 문자 그대로의 표현은 임베딩 검색에서 놓치는 경우가 있어서
+    적재할 때 벡터와 함께 만들어 둡니다. 검색은 네트워크 호출 없이 로컬에서 끝나고,
+    쿼리 n-gram 중 top-1 chunk에 실제로 들어 있는 비율(idf 가중 coverage)을 함께 돌려줘서
+    검색 결과를 얼마나 믿을 수 있는지 판단할 수 있게 합니다.
+    """
+
+    INDEX_FILE = "lexical_index.json"
+
+    def __init__(self, path, k1=1.2, b=0.75):
+        self.path = Path(path)
+        self.k1 = k1
+        self.b = b
+        self._docs = []
+        self._postings = {}
+        self._lengths = []
+        self._avg_length = 0.0
+        self._loaded_mtime = None
+        self._lock = threading.Lock()
+
+    def exists(self):
+        return (self.path / self.INDEX_FILE).exists()
+
+    def build(self, ids, documents, metadatas):
+        postings = {}
+        lengths = []
+        for doc_index, text in enumerate(documents):
+            grams = Counter(tokenize(text))
+            lengths.append(sum(grams.values()))
+            for gram, tf in grams.items():
+                postings.setdefault(gram, []).append([doc_index, tf])
+
+        # numpy 인덱스와 마찬가지로 임시 파일에 쓴 뒤 교체합니다.
+        self.path.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "ids": list(ids),
+            "documents": list(documents),
+            "metadatas": [dict(m or {}) for m in metadatas],
+            "lengths": lengths,
+            "postings": postings,
+        }
+        tmp = self.path / f".{self.INDEX_FILE}.tmp"
+        tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path / self.INDEX_FILE)
+
+    def _load(self):
+        index_path = self.path / self.INDEX_FILE
+        mtime = index_path.stat().st_mtime_ns
+        with self._lock:
+            if self._loaded_mtime == mtime:
+                return
+            payload = json.loads(index_path.read_text(encoding="utf-8"))
+            self._docs = [
+                Document(page_content=text, metadata=metadata, id=chunk_id)
+                for chunk_id, text, metadata in zip(payload["ids"], payload["documents"], payload["metadatas"])
+            ]
+            self._postings = payload["postings"]
+            self._lengths = payload["lengths"]
+            self._avg_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+            self._loaded_mtime = mtime
+
+    def _idf(self, gram):
+        total = len(self._docs)
+        df = len(self._postings.get(gram, ()))
+        return math.log(1 + (total - df + 0.5) / (df + 0.5))
+
+    def search(self, query, k=3):
+        """(Document, BM25 점수) top-k 목록과 top-1 chunk의 coverage(0~1)를 돌려줍니다."""
+        self._load()
+        grams = Counter(tokenize(query))
+        if not grams or not self._docs:
+            return [], 0.0
+
+        scores = {}
+        matched = {}
+        for gram, query_tf in grams.items():
+            idf = self._idf(gram)
+            for doc_index, tf in self._postings.get(gram, ()):
+                length_norm = 1 - self.b + self.b * self._lengths[doc_index] / (self._avg_length or 1)
+                score = idf * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+                scores[doc_index] = scores.get(doc_index, 0.0) + query_tf * score
+                matched.setdefault(doc_index, set()).add(gram)
+
+        if not scores:
+            return [], 0.0
+        ranked = sorted(scores.items(), key=lambda pair: pair[1], reverse=True)[:k]
+
+        # 코퍼스에 없는 n-gram은 idf가 가장 크므로, 규정에 없는 단어가 섞인 쿼리일수록 coverage가 낮아집니다.
+        weights = {gram: self._idf(gram) * query_tf for gram, query_tf in grams.items()}
+        top = ranked[0][0]
+        coverage = sum(weights[gram] for gram in matched[top]) / sum(weights.values())
+        return [(self._docs[i], score) for i, score in ranked], round(coverage, 4)
+
+    def stats(self):
+        self._load()
+        return {"chunks": len(self._docs), "terms": len(self._postings)}
@@ -0,0 +1,94 @@
+import math
+import threading
+import zlib
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .lexical_index import tokenize
+
+
+@lru_cache(maxsize=200000)
+def _bucket(gram, dim):
+    # 프로세스마다 값이 바뀌는 hash() 대신 crc32를 써서, 적재할 때와 검색할 때 같은 벡터가 나오게 합니다.
+    h = zlib.crc32(gram.encode("utf-8"))
+    return h % dim, 1.0 if h & 0x80000000 else -1.0
+
+
+class HashingEmbeddings(Embeddings):
+    """글자 n-gram을 고정 차원으로 해싱한 벡터입니다. (EMBEDDING_BACKEND=hashing)
+
+    모델 파일도 네트워크도 필요 없는 최소 구성으로, 의미가 아니라 글자가 겹치는 정도만 반영합니다.
+    n-gram 빈도는 1 + log(tf)로 눌러서 긴 chunk에서 같은 글자가 반복되는 영향을 줄이고, L2 정규화합니다.
+    """
+
+    def __init__(self, dim=1024, ngram_sizes=(1, 2, 3)):
+        self.dim = dim
+        self.ngram_sizes = ngram_sizes
+        self.model_name = f"hashing-{dim}"
+
+    def embed_documents(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for gram, tf in Counter(tokenize(text, self.ngram_sizes)).items():
+                index, sign = _bucket(gram, self.dim)
+                matrix[row, index] += sign * (1.0 + math.log(tf))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (matrix / norms).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """로컬 CPU에서 sentence-transformers 모델로 배치 추론하는 임베딩입니다. (EMBEDDING_BACKEND=sentence-transformers)
+
+    모델은 처음 임베딩할 때 한 번만 불러오고, 여러 텍스트는 batch_size개씩 묶어서 한 번에 계산합니다.
+    e5 계열처럼 질의/문서 접두어가 필요한 모델을 위해 query_prefix, document_prefix를 붙입니다.
+    """
+
+    def __init__(self, model_name, device="cpu", batch_size=32, query_prefix="", document_prefix=""):
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+        self.query_prefix = query_prefix
+        self.document_prefix = document_prefix
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                except ImportError as exc:
+                    raise ImportError(
+                        "EMBEDDING_BACKEND=sentence-transformers를 쓰려면 `pip install sentence-transformers`가 필요합니다."
+                    ) from exc
+                self._model = SentenceTransformer(self.model_name, device=self.device)
+            return self._model
+
+    def _encode(self, texts, prefix):
+        if not texts:
+            return []
+        vectors = self._get_model().encode(
+            [prefix + text for text in texts],
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return vectors.astype(np.float32).tolist()
+
+    def embed_documents(self, texts):
+        return self._encode(list(texts), self.document_prefix)
+
+    def embed_queries(self, texts):
+        # 영수증 품목명처럼 여러 질의를 한 번에 임베딩할 때 씁니다. (ItemRuleRetriever)
+        return self._encode(list(texts), self.query_prefix)
+
+    def embed_query(self, text):
+        return self.embed_queries([text])[0]
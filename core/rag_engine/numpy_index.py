@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document
+
+
+class NumpyVectorIndex:
+    """규정 chunk 수백 개 규모에서 쓰는 메모리 매핑 정확 검색(exact search) 인덱스입니다.
+
+    정규화한 임베딩을 (chunk 수 x 차원) 행렬로 vectors.npy에 저장하고, chunk 내용과
+    metadata는 chunks.json에 저장합니다. 검색은 행렬 곱 한 번(여러 쿼리면 GEMM 한 번)으로
+    코사인 유사도를 계산한 뒤 top-k를 고릅니다. HNSW 같은 근사 검색이 아니므로 recall은 항상 1입니다.
+
+    dtype이 float16/int8이면 검색용 행렬만 양자화해서 저장합니다. (int8은 행마다 scale을 따로 저장)
+    이 인덱스는 Chroma 컬렉션(float32 벡터 포함)을 내보낸 사본이므로 디스크에는 Chroma에 더해 양자화 행렬만큼 늘고,
+    검색할 때 메모리에 올라가는 것은 양자화 행렬뿐입니다. 기본은 양자화 점수로 바로 top-k를 고릅니다.
+    rerank > 1이고 search에 fetch_vectors(chunk id로 원본 벡터를 읽는 함수)를 넘기면 후보 k * rerank개만
+    원본 벡터로 다시 점수를 매깁니다. Chroma에서 읽으면 Chroma가 float32 벡터 전체를 메모리에 올리므로 기본값은 꺼 둡니다.
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    SCALES_FILE = "scales.npy"
+    # 예전 버전이 만들던 rerank용 float32 원본 파일입니다. 다시 만들 때 지웁니다.
+    LEGACY_FULL_VECTORS_FILE = "vectors_full.npy"
+    CHUNKS_FILE = "chunks.json"
+    # 양자화 행렬을 float32로 바꿔 곱할 때 한 번에 바꾸는 행 수 (임시 메모리 상한)
+    BLOCK_ROWS = 8192
+
+    def __init__(self, path, dtype="float32", rerank=0):
+        self.path = Path(path)
+        self.dtype = np.dtype(dtype)
+        self.rerank = rerank
+        self._matrix = None
+        self._scales = None
+        self._docs = []
+        self._ids = []
+        self._loaded_mtime = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def exists(self):
+        return (self.path / self.CHUNKS_FILE).exists() and (self.path / self.VECTORS_FILE).exists()
+
+    def _quantize(self, normalized):
+        # int8은 행마다 절댓값 최대치를 127로 맞추는 대칭 양자화입니다. (행 scale을 곱하면 원래 값으로 돌아옵니다.)
+        if self.dtype == np.int8:
+            scales = np.abs(normalized).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            matrix = np.clip(np.rint(normalized / scales[:, None]), -127, 127).astype(np.int8)
+            return matrix, scales.astype(np.float32)
+        return normalized.astype(self.dtype), None
+
+    def _save(self, name, array):
+        tmp = self.path / f".{name}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp, self.path / name)
+
+    def build(self, ids, vectors, documents, metadatas):
+        # 읽는 쪽이 반쯤 쓰인 파일을 보지 않도록 임시 파일에 쓴 뒤 os.replace로 교체합니다.
+        # (행렬 파일들을 먼저, chunks.json을 나중에 교체하고, 읽는 쪽은 chunks.json의 변경 시각을 기준으로 다시 읽습니다.)
+        self.path.mkdir(parents=True, exist_ok=True)
+        normalized = self._normalize(vectors) if len(ids) else np.zeros((0, 0), dtype=np.float32)
+        matrix, scales = self._quantize(normalized)
+        self._save(self.VECTORS_FILE, matrix)
+        if scales is not None:
+            self._save(self.SCALES_FILE, scales)
+        # int8이 아니면 scale 파일은 쓰지 않고, 예전 rerank용 원본 파일은 항상 지웁니다.
+        stale = [self.LEGACY_FULL_VECTORS_FILE] + ([self.SCALES_FILE] if scales is None else [])
+        for name in stale:
+            if (self.path / name).exists():
+                os.remove(self.path / name)
+
+        tmp_chunks = self.path / f".{self.CHUNKS_FILE}.tmp"
+        payload = {
+            "dtype": self.dtype.name,
+            "ids": list(ids),
+            "documents": list(documents),
+            "metadatas": [dict(m or {}) for m in metadatas],
+        }
+        tmp_chunks.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_chunks, self.path / self.CHUNKS_FILE)
+
+    def _load(self):
+        chunks_path = self.path / self.CHUNKS_FILE
+        mtime = chunks_path.stat().st_mtime_ns
+        with self._lock:
+            if self._matrix is not None and self._loaded_mtime == mtime:
+                return self._matrix, self._docs
+            payload = json.loads(chunks_path.read_text(encoding="utf-8"))
+            # 행렬은 메모리 매핑으로 열어서, 실제로 읽는 부분만 페이지 캐시에 올라가게 합니다.
+            self._matrix = np.load(self.path / self.VECTORS_FILE, mmap_mode="r")
+            scales_path = self.path / self.SCALES_FILE
+            # scale은 chunk마다 float 하나라 메모리에 올립니다.
+            self._scales = np.load(scales_path) if self._matrix.dtype == np.int8 and scales_path.exists() else None
+            self._ids = payload["ids"]
+            self._docs = [
+                Document(page_content=text, metadata=metadata, id=chunk_id)
+                for chunk_id, text, metadata in zip(payload["ids"], payload["documents"], payload["metadatas"])
+            ]
+            self._loaded_mtime = mtime
+            return self._matrix, self._docs
+
+    def search(self, vectors, k=3, fetch_vectors=None):
+        """쿼리 벡터 목록에 대해 쿼리마다 (Document, 코사인 유사도) top-k 목록을 돌려줍니다.
+
+        fetch_vectors(chunk id 목록) -> 벡터 목록: 양자화한 인덱스에서 후보를 원본 벡터로 다시 정렬할 때 씁니다.
+        """
+        matrix, docs = self._load()
+        if not len(docs) or not len(vectors):
+            return [[] for _ in vectors]
+
+        queries = self._normalize(vectors)
+        scores = self._scores(queries, matrix)
+        k = min(k, scores.shape[1])
+        rerank = fetch_vectors is not None and matrix.dtype != np.float32 and self.rerank > 1
+        # 양자화 행렬로는 후보를 넉넉히 고르고, 후보만 원본 벡터로 다시 점수를 매깁니다.
+        candidates_per_query = min(k * self.rerank, scores.shape[1]) if rerank else k
+        top = np.argpartition(-scores, candidates_per_query - 1, axis=1)[:, :candidates_per_query]
+        if rerank:
+            # 모든 쿼리의 후보를 모아서 원본 벡터를 한 번에 읽습니다.
+            rows = sorted(set(top.ravel().tolist()))
+            exact = self._normalize(fetch_vectors([self._ids[i] for i in rows])) @ queries.T
+            position = {row: n for n, row in enumerate(rows)}
+
+        results = []
+        for q, (row, candidates) in enumerate(zip(scores, top)):
+            if rerank:
+                row = {i: float(exact[position[i], q]) for i in candidates.tolist()}
+                ordered = sorted(row, key=row.get, reverse=True)[:k]
+            else:
+                ordered = candidates[np.argsort(-row[candidates])]
+            results.append([(docs[i], float(row[i])) for i in ordered])
+        return results
+
+    def _scores(self, queries, matrix):
+        # float16/int8로 저장한 경우에도 계산은 float32로 하되, 임시 행렬이 커지지 않도록 BLOCK_ROWS행씩 바꿔서 곱합니다.
+        if matrix.dtype == np.float32:
+            return queries @ np.asarray(matrix).T
+        scores = np.empty((len(queries), matrix.shape[0]), dtype=np.float32)
+        for start in range(0, matrix.shape[0], self.BLOCK_ROWS):
+            block = np.asarray(matrix[start:start + self.BLOCK_ROWS], dtype=np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        if self._scales is not None:
+            scores *= self._scales
+        return scores
+
+    def stats(self):
+        matrix, docs = self._load()
+        return {
+            "chunks": len(docs),
+            "dimension": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+            "dtype": matrix.dtype.name,
+            # 디스크와 검색할 때 상주하는 크기 (양자화 행렬 + int8 scale)
+            "bytes": int(matrix.nbytes) + (int(self._scales.nbytes) if self._scales is not None else 0),
+            # 양자화 후보를 다시 정렬할 때 원본 벡터를 읽는 후보 배수 (float32면 0)
+            "rerank": self.rerank if matrix.dtype != np.float32 and self.rerank > 1 else 0,
+        }
@@ -0,0 +1,199 @@
+import re
+from collections import OrderedDict
+
+from core.config import LEXICAL_MIN_COVERAGE, RETRIEVAL_MODE, RRF_K
+from .context_builder import estimate_tokens
+from .embedding_cache import embed_query_batch
+
+
+class EmbeddingError(Exception):
+    """질의 임베딩 요청(외부 임베딩 API)이 실패했습니다. 테넌트 벡터 DB의 오류와 구분하기 위해 감싸서 올립니다."""
+
+
+class ItemRuleRetriever:
+    """영수증 품목 단위로 관련 규정을 검색합니다.
+
+    영수증 전체를 json.dumps 해서 하나의 쿼리로 쓰면 id, 가격, 키 이름까지 임베딩되어
+    쿼리가 길고 지저분해지고, 상호명에 검색 결과가 끌려가는 문제가 있었습니다.
+    그래서 품목명만으로 짧은 쿼리를 만들고, 이미 임베딩한 품목명은 캐시에서 꺼내 쓰고,
+    캐시에 없는 품목명만 모아서 질의용 임베딩으로 벡터화합니다. (embed_query_batch 참고)
+
+    mode가 "hybrid"/"lexical"이면 품목마다 BM25 검색도 해서 벡터 검색 결과와 RRF로 합칩니다.
+    ("lexical"은 BM25 결과를 믿을 만한 품목은 임베딩하지 않습니다. RETRIEVAL_MODE 참고)
+    """
+
+    def __init__(self, db_manager, embedding_model, cache_size=2048, mode=RETRIEVAL_MODE, rrf_k=RRF_K, min_coverage=LEXICAL_MIN_COVERAGE, lookup=None):
+        self.db_manager = db_manager
+        self.embedding_model = embedding_model
+        # 품목명 -> 카테고리 -> 관련 조항 조회 테이블 (ItemCategoryLookup). 테이블에 있는 품목은 검색하지 않습니다.
+        self.lookup = lookup
+        # (조회 테이블 버전, 벡터 DB 스냅샷 버전, 카테고리) -> 조항 chunk 목록
+        self._category_docs = {}
+        self.cache_size = cache_size
+        self.mode = mode
+        self.rrf_k = rrf_k
+        self.min_coverage = min_coverage
+        # 품목명 -> 임베딩 벡터 (LRU)
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # 임베딩 없이 BM25 결과만으로 답한 품목 쿼리 수
+        self.lexical_only = 0
+
+    @staticmethod
+    def _normalize(name):
+        return re.sub(r"\s+", " ", str(name or "")).strip()
+
+    def build_item_queries(self, receipt):
+        # 품목명만 남기고 중복을 제거합니다. 순서는 영수증에 나온 순서를 유지합니다.
+        queries = []
+        for item in receipt.get("items", []):
+            name = self._normalize(item.get("name"))
+            if name and name not in queries:
+                queries.append(name)
+
+        # 품목이 하나도 없는 영수증이라면 상호명이라도 쿼리로 사용합니다.
+        if not queries:
+            store_name = self._normalize(receipt.get("store_name"))
+            if store_name:
+                queries.append(store_name)
+        return queries
+
+    def _cache_get(self, query):
+        vector = self._cache.get(query)
+        if vector is not None:
+            self._cache.move_to_end(query)
+        return vector
+
+    def _cache_put(self, query, vector):
+        self._cache[query] = vector
+        self._cache.move_to_end(query)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def embed_queries(self, queries, usage=None):
+        vectors = {q: self._cache_get(q) for q in queries}
+        misses = [q for q, v in vectors.items() if v is None]
+        self.hits += len(queries) - len(misses)
+        self.misses += len(misses)
+        if usage is not None:
+            # 임베딩 모델로 보낸 품목명의 토큰 수(추정치)를 감사 1건 단위로 기록합니다.
+            usage["embedding_tokens"] = usage.get("embedding_tokens", 0) + sum(estimate_tokens(q) for q in misses)
+
+        # 캐시에 없는 품목명만 질의용 임베딩으로 벡터화합니다. (배치를 지원하면 한 번에, 아니면 embed_query를 동시에)
+        # 임베딩 요청이 진행 중인 동안 usage["embedding_pending"]을 남겨서, 검색 단계가 deadline을 넘겼을 때 그 원인이 임베딩 API인지 알 수 있게 합니다.
+        if misses:
+            pending = usage if usage is not None else {}
+            pending["embedding_pending"] = pending.get("embedding_pending", 0) + 1
+            try:
+                embedded = embed_query_batch(self.embedding_model, misses)
+            except Exception as exc:
+                raise EmbeddingError(f"{type(exc).__name__}: {exc}") from exc
+            finally:
+                left = pending.get("embedding_pending", 1) - 1
+                if left > 0:
+                    pending["embedding_pending"] = left
+                else:
+                    pending.pop("embedding_pending", None)
+            for query, vector in zip(misses, embedded):
+                self._cache_put(query, vector)
+                vectors[query] = vector
+        return [vectors[q] for q in queries]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "mode": self.mode,
+            "lexical_only": self.lexical_only,
+            "lookup": self.lookup.stats() if self.lookup is not None else None,
+        }
+
+    def _category_hits(self, category):
+        # 조회 테이블의 카테고리별 조항을 (문서, 점수) 목록으로 만듭니다. 조항 id가 있으면 조항 전체를, 없으면 저장된 chunk를 가져옵니다.
+        key = (self.lookup.version(), self.db_manager.current_version(), category)
+        if key not in self._category_docs:
+            rows = self.lookup.articles(category)
+            article_ids = [row["article_id"] for row in rows if row["article_id"]]
+            docs = self.db_manager.get_articles(article_ids, self.embedding_model)
+            docs += self.db_manager.get_chunks([row["chunk_id"] for row in rows if not row["article_id"]], self.embedding_model)
+
+            hits = []
+            for rank, row in enumerate(rows, 1):
+                # vector 모드는 미리 계산한 코사인 유사도를, 나머지는 다른 품목의 RRF 점수와 비교할 수 있도록 순위 점수를 씁니다.
+                score = row["score"] if self.mode == "vector" else 1 / (self.rrf_k + rank)
+                for doc in docs:
+                    if (row["article_id"] and doc.metadata.get("article_id") == row["article_id"]) or (not row["article_id"] and doc.id == row["chunk_id"]):
+                        hits.append((doc, score))
+            self._category_docs = {k: v for k, v in self._category_docs.items() if k[:2] == key[:2]}
+            self._category_docs[key] = hits
+        return self._category_docs[key]
+
+    def _fuse(self, ranked_lists):
+        # reciprocal-rank fusion: 목록마다 1 / (rrf_k + 순위)를 더합니다. 점수 단위가 다른 BM25와 코사인 유사도를 순위로만 합치기 위함입니다.
+        # 품목마다 합친 목록 수가 다를 수 있으므로(BM25만 쓴 품목) 목록 수로 나눠서 품목 간 점수를 비교할 수 있게 합니다.
+        fused = {}
+        for hits in ranked_lists:
+            for rank, (doc, _) in enumerate(hits, 1):
+                key = doc.page_content
+                score = fused[key][1] if key in fused else 0.0
+                fused[key] = (doc, score + 1 / (self.rrf_k + rank) / len(ranked_lists))
+        return sorted(fused.values(), key=lambda pair: pair[1], reverse=True)
+
+    def _search(self, queries, k, usage=None):
+        # 품목 쿼리마다 (문서, 점수) 목록을 돌려줍니다.
+        if self.mode == "vector" or not self.db_manager.lexical_index.exists():
+            vectors = self.embed_queries(queries, usage)
+            return self.db_manager.search_rules_by_vectors(vectors, self.embedding_model, k=k)
+
+        # 합치기 전 후보는 넉넉하게 가져옵니다.
+        depth = k * 3
+        lexical = [self.db_manager.search_rules_lexical(q, k=depth) for q in queries]
+        if self.mode == "lexical":
+            need = [i for i, (hits, coverage) in enumerate(lexical) if not hits or coverage < self.min_coverage]
+        else:
+            need = list(range(len(queries)))
+        self.lexical_only += len(queries) - len(need)
+
+        vector_hits = {}
+        if need:
+            vectors = self.embed_queries([queries[i] for i in need], usage)
+            searched = self.db_manager.search_rules_by_vectors(vectors, self.embedding_model, k=depth)
+            vector_hits = dict(zip(need, searched))
+
+        per_item = []
+        for i, (hits, _) in enumerate(lexical):
+            lists = [hits] + ([vector_hits[i]] if i in vector_hits else [])
+            per_item.append(self._fuse([l for l in lists if l])[:k])
+        return per_item
+
+    def retrieve(self, receipt, k=3, usage=None):
+        queries = self.build_item_queries(receipt)
+        if not queries:
+            return []
+
+        # 조회 테이블에 있는 품목은 카테고리의 조항을 바로 쓰고, 처음 보는 품목명만 검색합니다.
+        categories, unseen = [], []
+        for query in queries:
+            category = self.lookup.resolve(query) if self.lookup is not None else None
+            if category is None:
+                unseen.append(query)
+            elif category not in categories:
+                categories.append(category)
+        per_item = [self._category_hits(category) for category in categories]
+        if unseen:
+            per_item += self._search(unseen, k, usage)
+
+        # 품목별 top-k 결과를 합치면서 같은 chunk는 가장 높은 점수 하나만 남깁니다.
+        merged = {}
+        for hits in per_item:
+            for doc, score in hits:
+                key = doc.page_content
+                if key not in merged or score > merged[key][1]:
+                    merged[key] = (doc, score)
+
+        ranked = sorted(merged.values(), key=lambda pair: pair[1], reverse=True)
+        return [doc for doc, _ in ranked[:k]]
@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from core.config import EMBEDDING_MODEL, VECTOR_STORE_KEEP, VECTOR_STORE_PATH
+
+
+class SnapshotStore:
+    """벡터 DB를 버전별 스냅샷 디렉터리로 관리합니다.
+
+    root/
+      CURRENT                  서버가 읽는 스냅샷 버전 (한 줄)
+      PREVIOUS                 CURRENT를 바꾸기 직전의 버전 (아직 이 버전을 읽고 있는 서버가 있을 수 있음)
+      snapshots/<버전>/        Chroma 파일 + numpy_index/ + lexical_index/ + embedding.json + changes.json
+      snapshots/.building-<버전>/  적재 중인 스냅샷 (완성되면 이름을 바꿔서 공개)
+
+    적재는 현재 스냅샷을 복사한 새 디렉터리에 하고, 다 만든 뒤 CURRENT를 os.replace로 바꿔서
+    한 번에 전환합니다. 서버는 CURRENT를 지켜보다가 새 버전으로 갈아탑니다. (VectorDBManager 참고)
+    CURRENT가 없으면 예전처럼 root 자체를 벡터 DB로 씁니다.
+    """
+
+    POINTER_FILE = "CURRENT"
+    PREVIOUS_FILE = "PREVIOUS"
+    SNAPSHOT_DIR = "snapshots"
+    BUILDING_PREFIX = ".building-"
+    EMBEDDING_FILE = "embedding.json"
+    CHANGES_FILE = "changes.json"
+
+    def __init__(self, root=VECTOR_STORE_PATH, keep=VECTOR_STORE_KEEP):
+        self.root = Path(root)
+        self.keep = keep
+
+    @property
+    def snapshot_dir(self):
+        return self.root / self.SNAPSHOT_DIR
+
+    def path_of(self, version):
+        return str(self.snapshot_dir / version) if version else str(self.root)
+
+    def _read_pointer(self, name):
+        try:
+            return (self.root / name).read_text(encoding="utf-8").strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _write_pointer(self, name, version):
+        # 읽는 쪽이 빈 파일을 보지 않도록 임시 파일에 쓴 뒤 교체합니다.
+        tmp = self.root / f".{name}.tmp"
+        tmp.write_text(version + "\n", encoding="utf-8")
+        os.replace(tmp, self.root / name)
+
+    def active_version(self):
+        return self._read_pointer(self.POINTER_FILE)
+
+    def previous_version(self):
+        return self._read_pointer(self.PREVIOUS_FILE)
+
+    def active_path(self):
+        return self.path_of(self.active_version())
+
+    def versions(self):
+        # 버전 이름이 생성 시각으로 시작하므로 이름순이 곧 시간순입니다.
+        if not self.snapshot_dir.exists():
+            return []
+        return sorted(p.name for p in self.snapshot_dir.iterdir() if p.is_dir() and not p.name.startswith("."))
+
+    def embedding_of(self, path=None):
+        """스냅샷을 만든 임베딩 모델 이름. 기록이 없는 기존 벡터 DB는 Upstage 모델(EMBEDDING_MODEL)로 봅니다."""
+        path = Path(path or self.active_path())
+        try:
+            return json.loads((path / self.EMBEDDING_FILE).read_text(encoding="utf-8"))["model"]
+        except FileNotFoundError:
+            return EMBEDDING_MODEL if (path / "chroma.sqlite3").exists() else None
+
+    def record_embedding(self, path, model_name):
+        (Path(path) / self.EMBEDDING_FILE).write_text(
+            json.dumps({"model": model_name}, ensure_ascii=False) + "\n", encoding="utf-8"
+        )
+
+    def record_changes(self, path, changes):
+        # 이전 스냅샷과 비교해서 바뀐 chunk 목록입니다. 영향받는 감사만 다시 돌릴 때 씁니다. (server.batch_audit --policy-change)
+        (Path(path) / self.CHANGES_FILE).write_text(json.dumps(changes, ensure_ascii=False), encoding="utf-8")
+
+    def changes_of(self, version=None):
+        """스냅샷을 만들 때 바뀐 chunk 목록. 기록이 없으면 None."""
+        version = version or self.active_version()
+        try:
+            return json.loads((Path(self.path_of(version)) / self.CHANGES_FILE).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+    def prepare(self, copy=True):
+        """새 작업 디렉터리를 만들고 (버전, 경로)를 돌려줍니다. copy면 현재 스냅샷을 복사해서 시작합니다."""
+        version = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        building = self.snapshot_dir / f"{self.BUILDING_PREFIX}{version}"
+        source = Path(self.active_path())
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        if copy and source.exists():
+            # 기존(스냅샷 이전) 구조라면 root에서 스냅샷 관리 파일만 빼고 복사합니다.
+            ignore = shutil.ignore_patterns(
+                self.SNAPSHOT_DIR, self.POINTER_FILE, self.PREVIOUS_FILE, f".{self.POINTER_FILE}.tmp", f".{self.PREVIOUS_FILE}.tmp"
+            )
+            shutil.copytree(source, building, ignore=ignore)
+        else:
+            building.mkdir(parents=True)
+        return version, str(building)
+
+    def publish(self, version):
+        """작업 디렉터리를 스냅샷으로 공개하고 CURRENT를 새 버전으로 바꿉니다."""
+        os.replace(self.snapshot_dir / f"{self.BUILDING_PREFIX}{version}", self.snapshot_dir / version)
+        self.activate(version)
+
+    def discard(self, version):
+        shutil.rmtree(self.snapshot_dir / f"{self.BUILDING_PREFIX}{version}", ignore_errors=True)
+
+    def activate(self, version):
+        # 롤백에도 씁니다. 서버는 CURRENT를 주기적으로만 확인하므로 바꾸기 전 버전을 PREVIOUS에 남겨서 prune이 지우지 않게 합니다.
+        if version not in self.versions():
+            raise ValueError(f"없는 스냅샷 버전입니다: {version}")
+        previous = self.active_version()
+        if previous and previous != version:
+            self._write_pointer(self.PREVIOUS_FILE, previous)
+        self._write_pointer(self.POINTER_FILE, version)
+
+    def prune(self):
+        """최근 keep개와 현재 버전, 그 직전 버전만 남기고 오래된 스냅샷을 지웁니다. 지운 버전 목록을 돌려줍니다.
+
+        직전 버전(PREVIOUS, 그리고 시간순으로 현재 버전 바로 앞 버전)은 아직 전환하지 않은 서버가 열어 두고
+        있을 수 있으므로 keep과 상관없이 지우지 않습니다.
+        """
+        active = self.active_version()
+        versions = self.versions()
+        keep = set(versions[-self.keep:]) if self.keep > 0 else set()
+        keep.update(v for v in (active, self.previous_version()) if v)
+        if active in versions and versions.index(active) > 0:
+            keep.add(versions[versions.index(active) - 1])
+        removed = [v for v in versions if v not in keep]
+        for version in removed:
+            shutil.rmtree(self.snapshot_dir / version, ignore_errors=True)
+        return removed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="벡터 DB 스냅샷 목록 확인 / 롤백")
+    parser.add_argument("command", choices=["list", "activate", "prune"])
+    parser.add_argument("version", nargs="?", help="activate할 스냅샷 버전")
+    parser.add_argument("--tenant", help="테넌트 id (생략하면 기본 벡터 DB)")
+    args = parser.parse_args()
+
+    from .tenants import tenant_store_path
+
+    store = SnapshotStore(tenant_store_path(args.tenant))
+    if args.command == "activate":
+        if not args.version:
+            parser.error("activate에는 버전이 필요합니다.")
+        store.activate(args.version)
+        print(f"--- 현재 스냅샷: {args.version} (서버는 재시작 없이 전환됩니다) ---")
+    elif args.command == "prune":
+        print(f"--- 삭제한 스냅샷: {', '.join(store.prune()) or '없음'} ---")
+    else:
+        active = store.active_version()
+        for version in store.versions():
+            print(f"{'*' if version == active else ' '} {version}  ({store.embedding_of(store.path_of(version))})")
+        if active is None:
+            print(f"(스냅샷 없음: {store.root}를 그대로 사용 중)")
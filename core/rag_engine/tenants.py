@@ -0,0 +1,148 @@
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+
+from core.config import ITEM_LOOKUP_PATH, TENANT_MAX_WARM, TENANT_STORE_ROOT, VECTOR_STORE_PATH
+
+# 테넌트 id는 디렉터리 이름으로 쓰므로 영문/숫자/-/_만 허용합니다. (경로 조작 방지)
+TENANT_ID_PATTERN = r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$"
+
+
+def validate_tenant_id(tenant_id):
+    """빈 값이면 None(기본 테넌트), 형식이 맞지 않으면 ValueError."""
+    if not tenant_id:
+        return None
+    if not re.match(TENANT_ID_PATTERN, tenant_id):
+        raise ValueError(f"잘못된 tenant id입니다: {tenant_id}")
+    return tenant_id
+
+
+def tenant_store_path(tenant_id=None):
+    # 테넌트의 벡터 DB root (스냅샷 구조는 SnapshotStore 참고)
+    tenant_id = validate_tenant_id(tenant_id)
+    return VECTOR_STORE_PATH if tenant_id is None else str(Path(TENANT_STORE_ROOT) / tenant_id)
+
+
+def tenant_lookup_path(tenant_id=None):
+    # 품목 조회 테이블도 테넌트마다 따로 만듭니다. (item_lookup.db -> item_lookup.<tenant_id>.db)
+    tenant_id = validate_tenant_id(tenant_id)
+    if tenant_id is None or not ITEM_LOOKUP_PATH:
+        return ITEM_LOOKUP_PATH
+    path = Path(ITEM_LOOKUP_PATH)
+    return str(path.with_name(f"{path.stem}.{tenant_id}{path.suffix}"))
+
+
+def tenant_exists(tenant_id=None):
+    # 기본 테넌트는 적재 전이어도 항상 있는 것으로 봅니다. (규정이 없으면 규칙 기반 판단으로 처리)
+    return validate_tenant_id(tenant_id) is None or Path(tenant_store_path(tenant_id)).is_dir()
+
+
+class TenantRetrieverPool:
+    """테넌트별 검색기를 최근 사용 순으로 max_warm개까지만 열어 두는 LRU입니다.
+
+    검색기는 factory(tenant_id)로 처음 요청될 때 만들고, 개수가 넘으면 가장 오래 안 쓴 테넌트를 LRU에서 뺍니다.
+    검색기는 lease()로 빌려 쓰고, LRU에서 빠진 검색기의 벡터 DB는 빌려 간 요청이 모두 돌려준 뒤에 닫습니다.
+    (다른 스레드가 검색 중인 Chroma 클라이언트를 닫지 않기 위함) 테넌트가 아무리 많아도 메모리에는
+    max_warm개 테넌트와 아직 검색 중인 테넌트의 Chroma/인덱스만 올라갑니다.
+    """
+
+    def __init__(self, factory, max_warm=TENANT_MAX_WARM):
+        self.factory = factory
+        self.max_warm = max(1, max_warm)
+        self._retrievers = OrderedDict()
+        # 검색기 -> 빌려 간 요청 수. LRU에서 빠졌지만 아직 빌려 간 요청이 있는 검색기는 _retiring에 둡니다.
+        self._leases = {}
+        self._retiring = set()
+        # 테넌트 id -> 만들고 있는 검색기의 Future. 같은 테넌트를 동시에 여러 번 만들지 않기 위함입니다.
+        self._loading = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    def _lease_locked(self, retriever):
+        # self._lock을 잡은 상태에서 호출합니다. 빌려 준 수를 늘리고, LRU에서 빠진 검색기 중 바로 닫을 것들을 돌려줍니다.
+        self._leases[retriever] = self._leases.get(retriever, 0) + 1
+        idle = []
+        while len(self._retrievers) > self.max_warm:
+            old = self._retrievers.popitem(last=False)[1]
+            self.evictions += 1
+            if old in self._leases:
+                self._retiring.add(old)
+            else:
+                idle.append(old)
+        return idle
+
+    def _acquire(self, tenant_id):
+        while True:
+            with self._lock:
+                retriever = self._retrievers.get(tenant_id)
+                if retriever is not None:
+                    self._retrievers.move_to_end(tenant_id)
+                    idle = self._lease_locked(retriever)
+                    break
+                loading = self._loading.get(tenant_id)
+                owner = loading is None
+                if owner:
+                    loading = self._loading[tenant_id] = Future()
+            if not owner:
+                # 같은 테넌트를 다른 요청이 만들고 있으면 기다렸다가 처음부터 다시 찾습니다. (그 사이 LRU에서 빠졌을 수도 있습니다)
+                loading.result()
+                continue
+
+            # 검색기는 pool 전체의 lock 밖에서 만듭니다. 느린 테넌트 하나가 다른 테넌트의 요청까지 막지 않도록 하기 위함입니다.
+            try:
+                retriever = self.factory(tenant_id)
+            except BaseException as exc:
+                with self._lock:
+                    del self._loading[tenant_id]
+                loading.set_exception(exc)
+                raise
+            with self._lock:
+                del self._loading[tenant_id]
+                self._retrievers[tenant_id] = retriever
+                self.loads += 1
+                idle = self._lease_locked(retriever)
+            loading.set_result(retriever)
+            break
+        for old in idle:
+            old.db_manager.close()
+        return retriever
+
+    def _release(self, retriever):
+        with self._lock:
+            self._leases[retriever] -= 1
+            if self._leases[retriever]:
+                return
+            del self._leases[retriever]
+            if retriever not in self._retiring:
+                return
+            self._retiring.discard(retriever)
+        retriever.db_manager.close()
+
+    @contextmanager
+    def lease(self, tenant_id=None):
+        """테넌트의 검색기를 빌려 줍니다. with 블록이 끝날 때까지는 LRU에서 빠져도 닫히지 않습니다."""
+        retriever = self._acquire(validate_tenant_id(tenant_id))
+        try:
+            yield retriever
+        finally:
+            self._release(retriever)
+
+    def peek(self, tenant_id=None):
+        # 열려 있는 검색기만 돌려줍니다. (통계 조회처럼 테넌트를 새로 열 필요가 없는 경우)
+        with self._lock:
+            return self._retrievers.get(validate_tenant_id(tenant_id))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "warm": [tenant_id or "default" for tenant_id in self._retrievers],
+                "max_warm": self.max_warm,
+                "leased": sum(self._leases.values()),
+                "retiring": len(self._retiring),
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
@@ -1,30 +1,373 @@
-from langchain_chroma import Chroma
+import chromadb
+from langchain_core.documents import Document
+import logging
 import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from core.config import (
+    VECTOR_BACKEND,
+    VECTOR_INDEX_DTYPE,
+    VECTOR_INDEX_RERANK,
+    VECTOR_STORE_PATH,
+    VECTOR_STORE_POLL_SECONDS,
+)
+from .lexical_index import LexicalIndex
+from .numpy_index import NumpyVectorIndex
+from .snapshots import SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+
+def relevance_score_fn(space):
+    """Chroma 거리(작을수록 가까움)를 관련도 점수(클수록 가까움)로 바꾸는 함수.
+
+    정규화된 벡터라면 세 space 모두 코사인 유사도가 되므로 numpy 인덱스 점수와 같은 기준으로 비교할 수 있습니다.
+    (cosine/ip 거리는 1 - 내적, l2 거리는 유클리드 거리의 제곱 = 2 - 2 * 내적)
+    """
+    if space == "l2":
+        return lambda distance: 1.0 - distance / 2
+    if space in ("cosine", "ip"):
+        return lambda distance: 1.0 - distance
+    raise ValueError(f"지원하지 않는 거리 space입니다: {space}")
+
+
+class ChromaStore:
+    """영속 Chroma 컬렉션 하나. 클라이언트를 직접 만들어서 들고, chromadb의 공개 API만 씁니다.
+
+    langchain_chroma 래퍼의 내부 속성(_collection, _client 등)에 기대면 버전이 조금만 바뀌어도 조용히 깨지므로,
+    쓰기/검색/닫기를 모두 PersistentClient와 Collection 메서드로 합니다.
+    """
+
+    # 예전에 langchain_chroma로 만든 스냅샷을 그대로 읽을 수 있도록 그 기본 컬렉션 이름을 씁니다.
+    COLLECTION_NAME = "langchain"
+
+    def __init__(self, path, space="cosine"):
+        self.client = chromadb.PersistentClient(path=str(path))
+        # space는 컬렉션을 새로 만들 때만 적용됩니다. (이미 있으면 만들 때의 space를 그대로 씀)
+        self.collection = self.client.get_or_create_collection(self.COLLECTION_NAME, metadata={"hnsw:space": space})
+        hnsw = self.collection.configuration.get("hnsw") or {}
+        self.space = hnsw.get("space") or (self.collection.metadata or {}).get("hnsw:space") or "l2"
+
+    def get(self, **kwargs):
+        return self.collection.get(**kwargs)
+
+    def delete(self, ids):
+        self.collection.delete(ids=ids)
+
+    def upsert(self, ids, vectors, documents, write_batch_size=1000):
+        for start in range(0, len(ids), write_batch_size):
+            end = start + write_batch_size
+            self.collection.upsert(
+                ids=ids[start:end],
+                embeddings=vectors[start:end],
+                metadatas=[doc.metadata for doc in documents[start:end]],
+                documents=[doc.page_content for doc in documents[start:end]],
+            )
+
+    def update_metadata(self, ids, metadatas):
+        self.collection.update(ids=ids, metadatas=metadatas)
+
+    def query(self, vectors, k=3):
+        """쿼리 벡터마다 (Document, 관련도 점수) top-k 목록. 모든 쿼리를 한 번의 요청으로 검색합니다."""
+        if not len(vectors):
+            return []
+        data = self.collection.query(query_embeddings=vectors, n_results=k, include=["documents", "metadatas", "distances"])
+        relevance = relevance_score_fn(self.space)
+        return [
+            [
+                (Document(page_content=text, metadata=metadata or {}, id=chunk_id), relevance(distance))
+                for chunk_id, text, metadata, distance in zip(ids, texts, metadatas, distances)
+            ]
+            for ids, texts, metadatas, distances in zip(data["ids"], data["documents"], data["metadatas"], data["distances"])
+        ]
+
+    def close(self):
+        self.client.close()
 
 class VectorDBManager:
-    def __init__(self, persist_path="./data/vector_store"):
+    def __init__(self, persist_path=VECTOR_STORE_PATH, backend=VECTOR_BACKEND, watch=True):
+        # backend가 "numpy"이면 검색은 Chroma에서 내보낸 메모리 매핑 행렬(NumpyVectorIndex)로 합니다.
+        # chunk 추가/삭제(sync_documents)는 항상 Chroma를 기준으로 하고, export_numpy_index로 행렬을 다시 만듭니다.
+        self.backend = backend
+        # watch=True(서버)이면 persist_path를 스냅샷 root로 보고 CURRENT가 가리키는 스냅샷을 읽으며, 버전이 바뀌면 재시작 없이 갈아탑니다.
+        # watch=False(적재, 벤치마크)이면 persist_path 디렉터리를 그대로 씁니다.
+        self.snapshots = SnapshotStore(persist_path) if watch else None
+        # 검색할 때마다 Chroma를 새로 열면 느리고, 여러 요청이 동시에 열면 클라이언트 생성이 실패하는 경우가 있어서 한 번 연 DB를 재사용합니다.
+        self._db = None
+        self._db_embedding_model = None
+        self._lock = threading.Lock()
+        self._checked_at = time.monotonic()
+        self._switching = False
+        # 검색 중인 Chroma 클라이언트 수 (id(db) -> 수)와, 스냅샷 전환/close로 교체됐지만 아직 검색 중이라 닫지 못한 클라이언트
+        self._in_use = {}
+        self._retired = {}
+        if self.snapshots is not None:
+            self._bind(self.snapshots.active_path(), self.snapshots.active_version())
+        else:
+            self._bind(persist_path, None)
+
+    def _bind(self, persist_path, version, db=None):
+        # 한 스냅샷에 속한 경로와 인덱스들을 함께 바꿉니다.
         self.persist_path = persist_path
+        # 현재 읽고 있는 스냅샷 버전 (스냅샷을 쓰지 않으면 None). 감사 결과 캐시의 키로 씁니다.
+        self.version = version
+        self.numpy_index = NumpyVectorIndex(os.path.join(persist_path, "numpy_index"), VECTOR_INDEX_DTYPE, VECTOR_INDEX_RERANK)
+        # 글자 n-gram BM25 인덱스도 적재할 때 같은 chunk로 함께 만듭니다. (export_lexical_index)
+        self.lexical_index = LexicalIndex(os.path.join(persist_path, "lexical_index"))
+        self._db = db
+
+    def _refresh(self):
+        # 검색 요청마다 부르지만 CURRENT는 VECTOR_STORE_POLL_SECONDS마다 한 번만 확인합니다.
+        # 여러 요청이 동시에 전환을 시작하지 않도록 확인과 _switching 설정을 한 lock 안에서 합니다.
+        if self.snapshots is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if self._switching or now - self._checked_at < VECTOR_STORE_POLL_SECONDS:
+                return
+            self._checked_at = now
+            version = self.snapshots.active_version()
+            if version == self.version:
+                return
+            self._switching = True
+        # 새 스냅샷을 열고 미리 한 번 검색해 두는 동안 요청은 이전 스냅샷으로 계속 처리합니다. (지연 시간 튀는 것 방지)
+        threading.Thread(target=self._switch, args=(version,), daemon=True).start()
+
+    def _retire(self, db):
+        # self._lock 안에서 부릅니다. 검색 중인 클라이언트는 마지막 검색이 끝날 때 닫고(_release), 아니면 바로 닫을 목록으로 돌려줍니다.
+        if db is None:
+            return []
+        if self._in_use.get(id(db)):
+            self._retired[id(db)] = db
+            return []
+        return [db]
+
+    def _close_clients(self, dbs):
+        for db in dbs:
+            try:
+                db.close()
+            except Exception:
+                logger.debug("failed to close chroma client", exc_info=True)
+
+    def _release(self, db):
+        with self._lock:
+            self._in_use[id(db)] -= 1
+            if self._in_use[id(db)]:
+                return
+            del self._in_use[id(db)]
+            retired = self._retired.pop(id(db), None)
+        if retired is not None:
+            self._close_clients([retired])
+
+    @contextmanager
+    def _using(self, embedding_model):
+        # 검색하는 동안 Chroma 클라이언트를 빌려 씁니다. 그 사이 스냅샷이 바뀌어도 이 클라이언트는 검색이 끝난 뒤에 닫힙니다.
+        db = self._open(embedding_model, lease=True)
+        try:
+            yield db
+        finally:
+            self._release(db)
+
+    def _switch(self, version):
+        try:
+            path = self.snapshots.path_of(version)
+            embedding_model = self._db_embedding_model
+            db = None
+            if embedding_model is not None:
+                db = ChromaStore(path)
+                sample = db.get(limit=1, include=["embeddings"])
+                if len(sample["embeddings"]):
+                    db.query([list(sample["embeddings"][0])], k=1)
+            with self._lock:
+                idle = self._retire(self._db)
+                self._bind(path, version, db)
+            # 이전 스냅샷의 클라이언트는 진행 중인 검색이 없으면 바로, 있으면 끝난 뒤에 닫습니다.
+            self._close_clients(idle)
+            # 인덱스 파일도 미리 읽어 둡니다.
+            for index in (self.numpy_index, self.lexical_index):
+                if index.exists():
+                    index.stats()
+            logger.info("vector store switched to snapshot %s", version)
+        except Exception:
+            logger.exception("failed to switch vector store to snapshot %s", version)
+        finally:
+            with self._lock:
+                self._switching = False
+
+    def close(self):
+        # 오래 안 쓴 테넌트를 메모리에서 내릴 때 씁니다. Chroma 클라이언트를 닫고 인덱스 캐시를 버립니다. (다시 검색하면 새로 엽니다)
+        with self._lock:
+            idle = self._retire(self._db)
+            self._bind(self.persist_path, self.version)
+            self._db_embedding_model = None
+        self._close_clients(idle)
+
+    def current_version(self):
+        """지금 검색에 쓰고 있는 스냅샷 버전. (새 버전은 미리 열어 두기가 끝난 뒤에 바뀝니다)"""
+        self._refresh()
+        return self.version
+
+    def _open(self, embedding_model, lease=False):
+        # lease면 클라이언트를 돌려주기 전에 같은 lock 안에서 검색 중으로 표시합니다. (그 사이에 닫히지 않도록)
+        self._refresh()
+        idle = []
+        with self._lock:
+            if self._db is None or self._db_embedding_model is not embedding_model:
+                idle = self._retire(self._db)
+                # 컬렉션이 아직 없어서 새로 만들어지는 경우에도 create_db와 같은 코사인 유사도를 사용합니다. (이미 있으면 무시됨)
+                self._db = ChromaStore(self.persist_path)
+                self._db_embedding_model = embedding_model
+            db = self._db
+            if lease:
+                self._in_use[id(db)] = self._in_use.get(id(db), 0) + 1
+        self._close_clients(idle)
+        return db
 
     # documents로 입력받은 chunk들을 embedding_model(solar-embedding-1-large(임시))을 사용하여 벡터화
-    def create_db(self, documents, embedding_model):
-        db = Chroma.from_documents(
-            documents=documents,
-            embedding=embedding_model,
-            persist_directory=self.persist_path,
-            # 텍스트 사이의 의미적 연관성을 찾는 것이 목적이므로 코사인 유사도를 사용하도록 강제했습니다.
-            # TODO 사용하고자 하는 유사도 측정 방식에 따라 세 개중에 하나 주석 해제해서 사용하면 됩니다! 기본값은 l2거리입니다.
-            collection_metadata={"hnsw:space": "cosine"}
-            # collection_metadata={"hnsw:space": "l2"} # l2거리(Euclidean Distance)
-            # collection_metadata={"hnsw:space": "ip"} # 내적(inner product)
-        )
+    def create_db(self, documents, embedding_model, space="cosine"):
+        # 텍스트 사이의 의미적 연관성을 찾는 것이 목적이므로 코사인 유사도를 기본값으로 했습니다.
+        # space: "cosine"(코사인 유사도), "l2"(Euclidean Distance), "ip"(내적, inner product)
+        # 어떤 설정이 나은지는 benchmarks/retrieval_quality.py로 비교할 수 있습니다.
+        db = ChromaStore(self.persist_path, space=space)
+        # id가 없는 문서는 chunk_id(내용 해시), 그것도 없으면 새 uuid를 씁니다.
+        ids = [doc.id or doc.metadata.get("chunk_id") or str(uuid.uuid4()) for doc in documents]
+        db.upsert(ids, embedding_model.embed_documents([doc.page_content for doc in documents]), documents)
+        with self._lock:
+            idle = self._retire(self._db)
+            self._db = db
+            self._db_embedding_model = embedding_model
+        self._close_clients(idle)
         return db
 
+    # chunk_id(내용 해시, RegulationEmbedder.assign_chunk_ids 참고)를 기준으로 벡터 DB를 documents와 맞춥니다.
+    # 새로 생기거나 내용이 바뀐 chunk만 임베딩해서 추가하고, 이번에 적재한 문서(source)에서 사라진 chunk는 지웁니다.
+    # 내용은 같고 위치(start_index, page 등)만 바뀐 chunk는 임베딩 없이 metadata만 고칩니다.
+    # - sources: documents에 없더라도 정리 대상에 포함할 source (삭제된 규정 파일 등)
+    # - embed_documents: 임베딩 함수 (기본값은 embedding_model.embed_documents, 대량 적재 시 BatchEmbedder.embed)
+    # - write_batch_size: 벡터 DB에 한 번에 쓰는 chunk 수
+    def sync_documents(self, documents, embedding_model, sources=None, embed_documents=None, write_batch_size=1000):
+        db = self._open(embedding_model)
+
+        incoming = {}
+        for doc in documents:
+            # 한 문서 안에 완전히 같은 문단이 여러 번 나오면 하나만 저장합니다.
+            incoming.setdefault(doc.metadata["chunk_id"], doc)
+
+        sources = sorted(set(sources or []) | {doc.metadata["source"] for doc in incoming.values()})
+        current = {}
+        if sources:
+            existing = db.get(where={"source": {"$in": sources}}, include=["metadatas"])
+            current = dict(zip(existing["ids"], existing["metadatas"]))
+
+        added = [chunk_id for chunk_id in incoming if chunk_id not in current]
+        removed = [chunk_id for chunk_id in current if chunk_id not in incoming]
+        moved = [
+            chunk_id
+            for chunk_id in incoming
+            if chunk_id in current and current[chunk_id] != incoming[chunk_id].metadata
+        ]
+
+        for start in range(0, len(removed), write_batch_size):
+            db.delete(ids=removed[start:start + write_batch_size])
+        if added:
+            docs = [incoming[chunk_id] for chunk_id in added]
+            vectors = (embed_documents or embedding_model.embed_documents)([doc.page_content for doc in docs])
+            db.upsert(added, vectors, docs, write_batch_size)
+        for start in range(0, len(moved), write_batch_size):
+            part = moved[start:start + write_batch_size]
+            db.update_metadata(part, [incoming[chunk_id].metadata for chunk_id in part])
+
+        return {
+            "sources": sources,
+            "added": added,
+            "removed": removed,
+            "metadata_updated": moved,
+            "unchanged": len(incoming) - len(added) - len(moved),
+        }
+
+    # Chroma 컬렉션 전체(임베딩 포함)를 numpy 인덱스로 내보냅니다. 적재가 끝난 뒤 호출합니다.
+    def export_numpy_index(self, embedding_model):
+        db = self._open(embedding_model)
+        data = db.get(include=["embeddings", "documents", "metadatas"])
+        self.numpy_index.build(data["ids"], data["embeddings"], data["documents"], data["metadatas"])
+        return self.numpy_index.stats()
+
+    # Chroma 컬렉션 전체를 BM25 인덱스로 내보냅니다. 벡터는 필요 없으므로 문서와 metadata만 읽습니다.
+    def export_lexical_index(self, embedding_model):
+        db = self._open(embedding_model)
+        data = db.get(include=["documents", "metadatas"])
+        self.lexical_index.build(data["ids"], data["documents"], data["metadatas"])
+        return self.lexical_index.stats()
+
+    # 임베딩 없이 쿼리 하나를 BM25로 검색합니다. ((문서, 점수) 목록, top-1 coverage)
+    def search_rules_lexical(self, query, k=3):
+        self._refresh()
+        if not self.lexical_index.exists():
+            return [], 0.0
+        return self.lexical_index.search(query, k=k)
+
+    def _use_numpy(self):
+        self._refresh()
+        return self.backend == "numpy" and self.numpy_index.exists()
+
+    # 조항 id("제3조")로 그 조항의 chunk 전체를 문서 순서대로 가져옵니다. (조항 단위 split 이후의 chunk만 article_id가 있습니다.)
+    def get_articles(self, article_ids, embedding_model, source=None):
+        if not article_ids:
+            return []
+        where = {"article_id": {"$in": list(article_ids)}}
+        if source is not None:
+            where = {"$and": [where, {"source": source}]}
+        with self._using(embedding_model) as db:
+            data = db.get(where=where, include=["documents", "metadatas"])
+        docs = [
+            Document(page_content=text, metadata=metadata or {}, id=chunk_id)
+            for chunk_id, text, metadata in zip(data["ids"], data["documents"], data["metadatas"])
+        ]
+        return sorted(docs, key=lambda doc: (doc.metadata.get("source", ""), doc.metadata.get("start_index", 0)))
+
+    # chunk id 목록으로 chunk를 가져옵니다. (없는 id는 건너뜀)
+    def get_chunks(self, chunk_ids, embedding_model):
+        if not chunk_ids:
+            return []
+        with self._using(embedding_model) as db:
+            data = db.get(ids=list(chunk_ids), include=["documents", "metadatas"])
+        found = {
+            chunk_id: Document(page_content=text, metadata=metadata or {}, id=chunk_id)
+            for chunk_id, text, metadata in zip(data["ids"], data["documents"], data["metadatas"])
+        }
+        return [found[chunk_id] for chunk_id in chunk_ids if chunk_id in found]
+
+    # chunk id 순서대로 Chroma에 저장된 임베딩을 가져옵니다. (numpy 인덱스 rerank용)
+    def _stored_embeddings(self, chunk_ids, embedding_model):
+        with self._using(embedding_model) as db:
+            data = db.get(ids=list(chunk_ids), include=["embeddings"])
+        found = dict(zip(data["ids"], data["embeddings"]))
+        return [found[chunk_id] for chunk_id in chunk_ids]
+
+    # 벡터 DB에 chunk가 들어 있는 문서(source) 목록
+    def list_sources(self, embedding_model):
+        with self._using(embedding_model) as db:
+            metadatas = db.get(include=["metadatas"])["metadatas"]
+        return sorted({m.get("source") for m in metadatas if m and m.get("source")})
+
     # query를 통해 영수증 JSON을 입력받고, embedding_model(규정집 벡터화 시 사용한 모델과 동일해야함!)을 통해 벡터화하고, 영수증과 유사한 규정 탐색
     # TODO k: 끌어올 유사 조항 개수(여러 번 해보면서 조정해보면 될 것 같아요!)
     def search_rules(self, query, embedding_model, k=3):
-        db = Chroma(
-            persist_directory=self.persist_path,
-            embedding_function=embedding_model
-        )
-        # Chroma 내장함수. 유사도 검색 함수입니다.
-        return db.similarity_search(query, k=k)
\ No newline at end of file
+        if self._use_numpy():
+            return [doc for doc, _ in self.numpy_index.search([embedding_model.embed_query(query)], k=k)[0]]
+        with self._using(embedding_model) as db:
+            return [doc for doc, _ in db.query([embedding_model.embed_query(query)], k=k)[0]]
+
+    # 품목별로 미리 계산해 둔 쿼리 벡터들로 한 번에 검색합니다. Chroma는 한 번만 열고, 벡터마다 (문서, 유사도) 목록을 돌려줍니다.
+    def search_rules_by_vectors(self, vectors, embedding_model, k=3):
+        if self._use_numpy():
+            # 모든 품목 쿼리를 행렬 곱 한 번으로 검색합니다. (관련도 점수는 Chroma cosine과 같은 코사인 유사도)
+            # 양자화한 인덱스라면 후보만 Chroma에 저장된 원본 임베딩으로 다시 정렬합니다.
+            return self.numpy_index.search(vectors, k=k, fetch_vectors=lambda ids: self._stored_embeddings(ids, embedding_model))
+        with self._using(embedding_model) as db:
+            # Chroma는 거리(작을수록 가까움)를 돌려주므로 ChromaStore.query가 컬렉션 space에 맞는 관련도 점수로 바꿉니다.
+            # 품목별 결과를 점수로 합치는 retriever는 큰 점수를 먼저 쓰므로, 거리를 그대로 넘기면 가장 먼 chunk부터 고르게 됩니다.
+            return db.query(vectors, k=k)
@@ -0,0 +1,194 @@
+"""Offline batch re-audit over the receipts stored in ``transparent_audit.db``.
+
+    python -m server.batch_audit --since 2026-01-01 --until 2026-01-31 --status all --workers 4
+    python -m server.batch_audit --resume batch-20260201-1a2b3c
+    python -m server.batch_audit --policy-change [SNAPSHOT_VERSION] [--tenant council-a]
+
+A run snapshots the matching receipt ids, then audits them in batches. Each
+batch's audits and its checkpoint are committed in one transaction, so an
+interrupted run resumes where it stopped with ``--resume RUN_ID``. Receipts
+whose audit fell back to the rule tier because the LLM was unavailable stay
+pending, and do not replace an earlier audit, so ``--resume`` retries them.
+
+``--policy-change`` selects only receipts whose last audit used a policy chunk
+that the given snapshot (default: the current one) removed or changed, or an
+article that gained new text, using the per-audit chunk dependencies that
+``DBService`` records.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from uuid import uuid4
+
+from core.rag_engine.snapshots import SnapshotStore
+from core.rag_engine.tenants import tenant_store_path
+from server.services import AuditService, DBService
+
+STATUSES = ["all", "unaudited", "audited", "Pass", "Anomaly Detected"]
+
+
+def _format_eta(seconds: float) -> str:
+    seconds = int(max(0, seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours:d}:{minutes:02d}:{secs:02d}"
+
+
+def _report(done: int, total: int, processed: int, started: float) -> None:
+    elapsed = time.monotonic() - started
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    eta = (total - done) / rate if rate > 0 else 0.0
+    print(
+        f"\r[{done}/{total}] {done / total:6.1%}  {rate:6.2f} receipts/s  ETA {_format_eta(eta)}",
+        end="",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+def affected_receipts(db: DBService, version: str | None = None, tenant_id: str | None = None) -> tuple[str, list[str]]:
+    """Snapshot version and the receipts whose audits depend on what it changed."""
+    snapshots = SnapshotStore(tenant_store_path(tenant_id))
+    version = version or snapshots.active_version()
+    if version is None:
+        raise SystemExit("No policy snapshot yet; ingest the policy first")
+    changes = snapshots.changes_of(version)
+    if changes is None:
+        raise SystemExit(f"Snapshot {version} has no change record; use --since/--status instead")
+    if changes.get("reembedded"):
+        # A new embedding model can retrieve different chunks for any receipt.
+        return version, db.find_audited_receipts(tenant_id)
+    return version, db.find_audits_affected(changes["removed"], changes["added_articles"], tenant_id)
+
+
+def _needs_retry(result: dict) -> bool:
+    # A rule-tier answer forced by an outage (breaker open, error, deadline) is not a re-audit;
+    # only "no_rules" is the rule tier's own verdict.
+    return result.get("decision_path") == "rule" and result.get("fallback_reason") != "no_rules"
+
+
+def run(
+    db: DBService,
+    audit: AuditService,
+    run_id: str,
+    workers: int = 4,
+    batch_size: int = 50,
+    pack: int = 0,
+) -> dict:
+    run_info = db.get_batch_run(run_id)
+    if run_info is None:
+        raise SystemExit(f"Unknown run id: {run_id}")
+
+    pending = db.pending_batch_items(run_id)
+    total = run_info["total"]
+    done = run_info["done"]
+    processed = 0
+    retry = 0
+    started = time.monotonic()
+    print(f"run {run_id}: {done}/{total} already done, {len(pending)} to go", file=sys.stderr)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            payloads = [payload for _, payload in batch]
+            if pack > 1:
+                # Pack receipts sharing rules into one prompt; split the batch across workers.
+                size = -(-len(payloads) // workers)
+                parts = [payloads[i:i + size] for i in range(0, len(payloads), size)]
+                results = [r for part in pool.map(lambda p: audit.check_many(p, batch_size=pack), parts) for r in part]
+            else:
+                results = list(pool.map(audit.check, payloads))
+
+            finished, failed = [], []
+            for (receipt_id, _), result in zip(batch, results):
+                (failed if _needs_retry(result) else finished).append((receipt_id, result))
+            db.save_batch_results(run_id, finished, failed)
+            for (receipt_id, _), result in zip(batch, results):
+                db.record_audit_metrics(receipt_id, result.get("usage") or {})
+            done += len(finished)
+            retry += len(failed)
+            processed += len(batch)
+            _report(done, total, processed, started)
+
+    if pending:
+        print(file=sys.stderr)
+    db.finish_batch_run(run_id)
+    elapsed = time.monotonic() - started
+    return {
+        "run_id": run_id,
+        "total": total,
+        "processed": processed,
+        "retry": retry,
+        "elapsed_s": round(elapsed, 1),
+        "throughput": round(processed / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-audit stored receipts in bulk")
+    parser.add_argument("--since", help="receipt date lower bound, e.g. 2026-01-01")
+    parser.add_argument("--until", help="receipt date upper bound (inclusive), e.g. 2026-01-31 23:59")
+    parser.add_argument("--status", choices=STATUSES, default="all", help="filter on the current audit state")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=50, help="receipts per committed batch")
+    parser.add_argument("--pack", type=int, default=0, help="receipts per LLM prompt (analyze_many); 0 = one per call")
+    parser.add_argument("--resume", metavar="RUN_ID", help="continue an interrupted run")
+    parser.add_argument(
+        "--policy-change",
+        nargs="?",
+        const="",
+        metavar="VERSION",
+        help="re-audit only receipts affected by a policy snapshot (default: the current one)",
+    )
+    parser.add_argument("--tenant", help="tenant whose policy changed (with --policy-change)")
+    args = parser.parse_args()
+
+    db = DBService()
+    if args.resume:
+        run_id = args.resume
+    elif args.policy_change is not None:
+        version, receipt_ids = affected_receipts(db, args.policy_change or None, args.tenant)
+        total = len(db.find_audited_receipts(args.tenant))
+        filters = {"policy_change": version, "tenant": args.tenant}
+        run_id = f"batch-{datetime.now():%Y%m%d-%H%M%S}-{uuid4().hex[:6]}"
+        db.create_batch_run(run_id, filters, receipt_ids)
+        print(
+            f"created run {run_id} with {len(receipt_ids)} of {total} audited receipts affected by snapshot {version} "
+            f"(resume with --resume {run_id})",
+            file=sys.stderr,
+        )
+    else:
+        filters = {"since": args.since, "until": args.until, "status": args.status}
+        try:
+            receipt_ids = db.find_receipts(args.since, args.until, args.status)
+        except ValueError as exc:
+            parser.error(str(exc))
+        run_id = f"batch-{datetime.now():%Y%m%d-%H%M%S}-{uuid4().hex[:6]}"
+        db.create_batch_run(run_id, filters, receipt_ids)
+        print(f"created run {run_id} with {len(receipt_ids)} receipts (resume with --resume {run_id})", file=sys.stderr)
+
+    try:
+        summary = run(db, AuditService(), run_id, args.workers, args.batch_size, args.pack)
+    except KeyboardInterrupt:
+        print(f"\ninterrupted; resume with: python -m server.batch_audit --resume {run_id}", file=sys.stderr)
+        raise SystemExit(130)
+
+    print(
+        f"run {summary['run_id']} finished: {summary['processed']} audited in {summary['elapsed_s']}s "
+        f"({summary['throughput']} receipts/s)"
+    )
+    if summary["retry"]:
+        print(
+            f"{summary['retry']} fell back to the rule tier and stay pending; retry with: "
+            f"python -m server.batch_audit --resume {run_id}",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
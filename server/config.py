@@ -0,0 +1,40 @@
+"""
+Configuration file for Transparent-Audit Backend (FastAPI)
+"""
+
+import os
+
+# Stage deadlines (seconds)
+# 규정 검색(임베딩 + 벡터 검색)과 LLM 호출 단계가 이 시간을 넘기면 규칙 기반 판단으로 전환합니다.
+RETRIEVAL_DEADLINE_SECONDS = float(os.getenv("RETRIEVAL_DEADLINE_SECONDS", "5"))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "20"))
+
+# 검색/LLM 단계를 실행하는 공용 스레드 수. 요청 하나가 단계마다 최대 2개(헤지 포함)를 쓰고, 마감을 넘긴 작업도
+# 끝날 때까지 스레드를 잡고 있으므로 동시 요청 수의 2~3배 정도로 잡습니다. 대기 시간은 단계 마감에 포함되지 않습니다.
+STAGE_WORKERS = int(os.getenv("STAGE_WORKERS", "64"))
+
+# Hedged retries
+# 0이면 사용하지 않습니다. 예: 95로 설정하면 최근 지연시간 p95가 지나도록 응답이 없을 때 같은 요청을 한 번 더 보냅니다.
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
+# Circuit breaker
+# 연속 실패가 임계치를 넘으면 일정 시간 동안 LLM 경로를 건너뛰고 바로 규칙 기반 판단을 사용합니다.
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+
+# Cross-receipt analysis
+# 같은 가게에서 SPLIT_WINDOW_MINUTES 이내에 결제된 영수증들의 합계가 SPLIT_PURCHASE_CAP(원)을 넘으면 분할 결제로 의심합니다.
+# SPLIT_PURCHASE_CAP을 0으로 설정하면 분할 결제 검사를 하지 않습니다. (중복 영수증 검사는 항상 수행)
+SPLIT_PURCHASE_CAP = int(os.getenv("SPLIT_PURCHASE_CAP", "100000"))
+SPLIT_WINDOW_MINUTES = int(os.getenv("SPLIT_WINDOW_MINUTES", "60"))
+
+# Speculative audit
+# OCR 직후 사용자가 데이터를 검토하는 동안 백그라운드에서 미리 감사를 돌려 둡니다.
+# /audit/check 요청의 영수증 내용이 OCR 결과와 같으면 저장된 결과를 바로 돌려주고, 수정되었으면 버립니다.
+# 사용자가 수정한 영수증은 감사를 한 번 더 하므로 LLM 호출이 늘어납니다. 기본값은 끄고(0), 요청마다 ?speculative_audit=true로 켤 수 있습니다.
+SPECULATIVE_AUDIT = os.getenv("SPECULATIVE_AUDIT", "0") == "1"
+# 미리 돌린 감사가 아직 끝나지 않았을 때 /audit/check가 기다리는 최대 시간(초)
+SPECULATIVE_WAIT_SECONDS = float(os.getenv("SPECULATIVE_WAIT_SECONDS", "10"))
+# 규정이 바뀌었을 수 있으므로 오래된 결과는 사용하지 않습니다.
+SPECULATIVE_TTL_SECONDS = float(os.getenv("SPECULATIVE_TTL_SECONDS", "1800"))
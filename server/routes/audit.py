@@ -1,11 +1,22 @@
 from __future__ import annotations
 
 import base64
-
-from fastapi import APIRouter
-from pydantic import BaseModel, Field
-
-from server.services import AuditService, DBService, ReportService, StorageService
+import json
+from typing import Iterator, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+
+from core.rag_engine.tenants import TENANT_ID_PATTERN
+from server.services import (
+    AuditService,
+    CrossReceiptService,
+    DBService,
+    ReportService,
+    SpeculativeAuditService,
+    StorageService,
+)
 
 router = APIRouter(prefix="/api/v1/audit", tags=["audit"])
 
@@ -13,6 +24,8 @@ audit_service = AuditService()
 report_service = ReportService()
 storage_service = StorageService()
 db_service = DBService()
+cross_receipt_service = CrossReceiptService(db_service)
+speculative_audit_service = SpeculativeAuditService(audit_service, db_service)
 
 
 class ReceiptItem(BaseModel):
@@ -25,6 +38,11 @@ class ReceiptItem(BaseModel):
 
 class ReceiptData(BaseModel):
     receipt_id: str
+    tenant_id: Optional[str] = Field(
+        None,
+        pattern=TENANT_ID_PATTERN,
+        description="organization whose policy applies; omit for the default policy store",
+    )
     store_name: str
     date: str
     items: list[ReceiptItem]
@@ -37,11 +55,38 @@ class Violation(BaseModel):
     policy_reference: str
 
 
+class AuditUsage(BaseModel):
+    """Cost and latency of one audit; the full accounting record stays server-side (audit_metrics, audit_chunks)."""
+
+    retrieval_ms: Optional[float] = None
+    llm_ms: Optional[float] = None
+    total_ms: Optional[float] = None
+    embedding_tokens: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost: float = 0.0
+
+
 class AuditCheckResponse(BaseModel):
     audit_decision: str
     violation_score: float = Field(ge=0.0, le=1.0)
     violations: list[Violation]
     reasoning: str
+    decision_path: str = "llm"
+    fallback_reason: Optional[str] = None
+    confidence: Optional[float] = None
+    model: Optional[str] = None
+    tier: Optional[int] = None
+    cross_receipt: Optional[dict] = None
+    usage: Optional[AuditUsage] = None
+
+
+class AuditIncrementalRequest(BaseModel):
+    receipt_data: ReceiptData
+    changed_item_ids: list[int] = Field(
+        default_factory=list,
+        description="extra item ids to re-audit; edits since the stored audit are found on the server",
+    )
 
 
 class AuditConfirmRequest(BaseModel):
@@ -54,15 +99,108 @@ class AuditConfirmResponse(BaseModel):
     pdf_url: str
 
 
+def _receipt(payload: ReceiptData) -> dict:
+    # The default tenant leaves receipts (and so LLM prompts and content hashes) exactly as before.
+    return payload.model_dump(exclude={"tenant_id"} if payload.tenant_id is None else None)
+
+
+def _require_tenant(tenant_id: Optional[str]) -> None:
+    if not audit_service.has_tenant(tenant_id):
+        raise HTTPException(status_code=404, detail=f"Unknown tenant: {tenant_id}")
+
+
 @router.post("/check", response_model=AuditCheckResponse)
 def check(payload: ReceiptData) -> AuditCheckResponse:
-    receipt = payload.model_dump()
-    result = audit_service.check(receipt)
-    storage_service.save_json(result, f"{payload.receipt_id}_audit.json")
-    db_service.upsert_audit(payload.receipt_id, result)
+    _require_tenant(payload.tenant_id)
+    receipt = _receipt(payload)
+    result = speculative_audit_service.take(receipt) or audit_service.check(receipt)
+    return _save_result(payload.receipt_id, cross_receipt_service.apply(receipt, result))
+
+
+@router.post("/check/incremental", response_model=AuditCheckResponse)
+def check_incremental(payload: AuditIncrementalRequest) -> AuditCheckResponse:
+    _require_tenant(payload.receipt_data.tenant_id)
+    receipt = _receipt(payload.receipt_data)
+    # The baseline is the stored audit and the receipt it judged, never a client-supplied result.
+    receipt_id = payload.receipt_data.receipt_id
+    previous = db_service.get_audit(receipt_id)
+    if previous is not None:
+        previous = cross_receipt_service.strip(previous)
+    result = audit_service.check_incremental(
+        receipt, previous, db_service.get_receipt(receipt_id), payload.changed_item_ids
+    )
+    return _save_result(payload.receipt_data.receipt_id, cross_receipt_service.apply(receipt, result))
+
+
+def _save_result(receipt_id: str, result: dict) -> AuditCheckResponse:
+    # Persist the full result (usage carries the retrieved chunks and policy version); the response trims usage.
+    storage_service.save_json(result, f"{receipt_id}_audit.json")
+    db_service.upsert_audit(receipt_id, result)
+    db_service.record_audit_metrics(receipt_id, result.get("usage") or {})
     return AuditCheckResponse(**result)
 
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _stream_events(payload: ReceiptData) -> Iterator[str]:
+    receipt = _receipt(payload)
+    cached = speculative_audit_service.take(receipt)
+    events = [("decision", cached)] if cached is not None else audit_service.check_stream(receipt)
+    for event, data in events:
+        if event == "violation":
+            try:
+                data = Violation(**data).model_dump()
+            except (TypeError, ValidationError):
+                continue
+        elif event == "decision":
+            data = _save_result(payload.receipt_id, cross_receipt_service.apply(receipt, data)).model_dump()
+        yield _sse(event, data)
+
+
+def _event_stream_response(payload: ReceiptData) -> StreamingResponse:
+    _require_tenant(payload.tenant_id)
+    return StreamingResponse(
+        _stream_events(payload),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/check/stream")
+def check_stream(payload: ReceiptData) -> StreamingResponse:
+    return _event_stream_response(payload)
+
+
+@router.get("/check/stream")
+def check_stream_get(receipt: str = Query(..., description="JSON-encoded ReceiptData")) -> StreamingResponse:
+    try:
+        payload = ReceiptData.model_validate_json(receipt)
+    except ValidationError as exc:
+        raise HTTPException(status_code=422, detail=exc.errors(include_url=False)) from exc
+    return _event_stream_response(payload)
+
+
+@router.get("/cache-stats")
+def cache_stats(tenant_id: Optional[str] = Query(None, pattern=TENANT_ID_PATTERN)) -> dict:
+    _require_tenant(tenant_id)
+    return audit_service.cache_stats(tenant_id)
+
+
+@router.get("/tiers")
+def tier_metrics() -> list[dict]:
+    return audit_service.tier_metrics()
+
+
+@router.get("/metrics")
+def audit_metrics(
+    since: Optional[str] = Query(None, description="first day, YYYY-MM-DD"),
+    until: Optional[str] = Query(None, description="last day, YYYY-MM-DD"),
+) -> list[dict]:
+    return db_service.summarize_audit_metrics(since, until)
+
+
 @router.post("/confirm")
 def confirm(payload: AuditConfirmRequest) -> dict:
     receipt_data = payload.receipt_data.model_dump()
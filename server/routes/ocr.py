@@ -1,8 +1,14 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
+from typing import Optional
+
+from fastapi import APIRouter, BackgroundTasks, File, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 
+from core.rag_engine.tenants import TENANT_ID_PATTERN, tenant_exists
+from server.config import SPECULATIVE_AUDIT
+from server.routes.audit import speculative_audit_service
 from server.services import DBService, OCRService, StorageService
 
 router = APIRouter(prefix="/api/v1/ocr", tags=["ocr"])
@@ -25,6 +31,7 @@ class ReceiptItem(BaseModel):
 
 class OCRExtractResponse(BaseModel):
     receipt_id: str
+    tenant_id: Optional[str] = None
     store_name: str
     date: str
     items: list[ReceiptItem]
@@ -32,7 +39,14 @@ class OCRExtractResponse(BaseModel):
 
 
 @router.post("/extract", response_model=OCRExtractResponse)
-async def extract(file: UploadFile = File(...)) -> OCRExtractResponse:
+async def extract(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    speculative_audit: bool = Query(SPECULATIVE_AUDIT, description="start auditing the OCR result in the background"),
+    tenant_id: Optional[str] = Query(None, pattern=TENANT_ID_PATTERN, description="organization whose policy applies"),
+) -> OCRExtractResponse:
+    if not tenant_exists(tenant_id):
+        raise HTTPException(status_code=404, detail=f"Unknown tenant: {tenant_id}")
     if file.content_type not in ALLOWED_IMAGE_TYPES:
         raise HTTPException(status_code=400, detail="Unsupported image type")
 
@@ -45,7 +59,16 @@ async def extract(file: UploadFile = File(...)) -> OCRExtractResponse:
     image_path = await storage_service.save_upload(file, receipt_id)
 
     receipt = ocr_service.extract(image_path, receipt_id)
+    if tenant_id:
+        # Stored with the receipt so later batch re-audits use the same tenant's policy.
+        receipt["tenant_id"] = tenant_id
     storage_service.save_json(receipt, f"{receipt_id}_ocr.json")
     db_service.upsert_receipt(receipt_id, receipt, str(image_path))
 
-    return OCRExtractResponse(**receipt)
+    response = OCRExtractResponse(**receipt)
+    if speculative_audit:
+        audit_payload = response.model_dump(exclude={"tenant_id"} if tenant_id is None else None)
+        # Hashing the receipt reads the tenant's policy version, which may open its vector store.
+        await run_in_threadpool(speculative_audit_service.schedule, audit_payload)
+        background_tasks.add_task(speculative_audit_service.run, audit_payload)
+    return response
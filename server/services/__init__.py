@@ -1,7 +1,9 @@
 from .audit_service import AuditService
+from .cross_receipt_service import CrossReceiptService
 from .db_service import DBService
 from .ocr_service import OCRService
 from .report_service import ReportService
+from .speculative_audit_service import SpeculativeAuditService
 from .storage_service import StorageService
 
-__all__ = ["StorageService", "DBService", "OCRService", "AuditService", "ReportService"]
+__all__ = ["StorageService", "DBService", "OCRService", "AuditService", "ReportService", "CrossReceiptService", "SpeculativeAuditService"]
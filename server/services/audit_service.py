@@ -1,10 +1,39 @@
 from __future__ import annotations
 
 import json
+import logging
+import threading
+import time
 from datetime import datetime
+from typing import Iterator
+
+from server.config import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_SECONDS,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_PERCENTILE,
+    LLM_DEADLINE_SECONDS,
+    RETRIEVAL_DEADLINE_SECONDS,
+)
+from server.services.resilience import CircuitBreaker, CircuitOpen, Stage, StageTimeout
+
+logger = logging.getLogger(__name__)
 
 
 class AuditService:
+    def __init__(self):
+        self._retrievers = None
+        self._embedding_model = None
+        self._context_builder = None
+        self._cascade = None
+        self._init_lock = threading.Lock()
+        self._retrieval_stage = Stage("retrieval", RETRIEVAL_DEADLINE_SECONDS, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES)
+        self._llm_stage = Stage("llm", LLM_DEADLINE_SECONDS, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES)
+        # Packed bulk prompts are not hedged (a duplicate would re-send the whole pack) and keep their
+        # latencies out of the single-audit hedging percentile.
+        self._packed_llm_stage = Stage("llm", LLM_DEADLINE_SECONDS)
+        self._breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS)
+
     def _rule_fallback(self, receipt_data: dict) -> dict:
         violations = []
         banned = ["참이슬", "소주", "맥주", "와인", "카스", "담배"]
@@ -53,28 +82,509 @@ class AuditService:
             "reasoning": "규칙 기반 점검에서 명확한 위반 항목이 확인되지 않았습니다.",
         }
 
+    def _new_retriever(self, tenant_id: str | None):
+        from core.rag_engine.item_lookup import ItemCategoryLookup
+        from core.rag_engine.retriever import ItemRuleRetriever
+        from core.rag_engine.snapshots import SnapshotStore
+        from core.rag_engine.tenants import tenant_lookup_path, tenant_store_path
+        from core.rag_engine.vector_db import VectorDBManager
+
+        path = tenant_store_path(tenant_id)
+        embedding_model, model_name = self._embedding_model
+        stored_model = SnapshotStore(path).embedding_of()
+        if stored_model not in (None, model_name):
+            logger.warning(
+                "vector store %s was built with embedding model %s but %s is configured; re-run ingest",
+                path,
+                stored_model,
+                model_name,
+            )
+        return ItemRuleRetriever(
+            VectorDBManager(path),
+            embedding_model,
+            lookup=ItemCategoryLookup(tenant_lookup_path(tenant_id)),
+        )
+
+    def _get_retrievers(self):
+        with self._init_lock:
+            if self._retrievers is None:
+                from core.rag_engine.embedder import RegulationEmbedder
+                from core.rag_engine.tenants import TenantRetrieverPool
+
+                # Every tenant shares one embedding model and its cache; only the policy stores are per tenant.
+                embedder = RegulationEmbedder()
+                self._embedding_model = (embedder.get_embedding_model(), embedder.model_name)
+                self._retrievers = TenantRetrieverPool(self._new_retriever)
+        return self._retrievers
+
+    def _lease_retriever(self, tenant_id: str | None = None):
+        # Held for the whole retrieval so an LRU eviction cannot close the store mid-search.
+        return self._get_retrievers().lease(tenant_id)
+
+    def has_tenant(self, tenant_id: str | None) -> bool:
+        from core.rag_engine.tenants import tenant_exists
+
+        return tenant_exists(tenant_id)
+
+    def _get_cascade(self):
+        with self._init_lock:
+            if self._cascade is None:
+                from core.audit_agent.cascade import AuditCascade
+
+                self._cascade = AuditCascade()
+        return self._cascade
+
+    def tier_metrics(self) -> list[dict]:
+        if self._cascade is None:
+            return []
+        return self._cascade.metrics()
+
+    def _get_context_builder(self):
+        if self._context_builder is None:
+            from core.config import RULES_TOKEN_BUDGET
+            from core.rag_engine.context_builder import RuleContextBuilder
+
+            self._context_builder = RuleContextBuilder(max_tokens=RULES_TOKEN_BUDGET)
+        return self._context_builder
+
+    def _prompt_tokens(self, receipt_data: dict, rules_tokens: int) -> dict:
+        from core.audit_agent.prompt_templates import AUDIT_SYSTEM_PROMPT
+        from core.rag_engine.context_builder import estimate_tokens
+
+        system_tokens = estimate_tokens(AUDIT_SYSTEM_PROMPT)
+        receipt_tokens = estimate_tokens(json.dumps(receipt_data, ensure_ascii=False))
+        return {
+            "total": system_tokens + rules_tokens + receipt_tokens,
+            "system": system_tokens,
+            "rules": rules_tokens,
+            "receipt": receipt_tokens,
+        }
+
+    def _log_prompt_tokens(self, receipt_data: dict, rules_tokens: int) -> None:
+        tokens = self._prompt_tokens(receipt_data, rules_tokens)
+        logger.info(
+            "audit prompt tokens receipt_id=%s total=%d system=%d rules=%d receipt=%d",
+            receipt_data.get("receipt_id", ""),
+            tokens["total"],
+            tokens["system"],
+            tokens["rules"],
+            tokens["receipt"],
+        )
+
+    def policy_version(self, tenant_id: str | None = None) -> str | None:
+        """Snapshot of the tenant's vector store that audits currently run against; cached results should key on it."""
+        try:
+            with self._lease_retriever(tenant_id) as retriever:
+                return retriever.db_manager.current_version()
+        except Exception:
+            return None
+
+    def cache_stats(self, tenant_id: str | None = None) -> dict:
+        try:
+            with self._lease_retriever(tenant_id) as retriever:
+                embedding_model = retriever.embedding_model
+                return {
+                    "item_cache": retriever.stats(),
+                    "embedding_cache": embedding_model.stats() if hasattr(embedding_model, "stats") else None,
+                    "policy_version": retriever.db_manager.current_version(),
+                    "tenants": self._get_retrievers().stats(),
+                }
+        except Exception:
+            return {"item_cache": None, "embedding_cache": None, "policy_version": None, "tenants": None}
+
+    def _retrieve_rules(self, receipt_data: dict, usage: dict | None = None) -> str:
+        from core.rag_engine.article_splitter import article_label
+
+        with self._lease_retriever(receipt_data.get("tenant_id")) as retriever:
+            docs = retriever.retrieve(receipt_data, k=3, usage=usage)
+            version = retriever.db_manager.version
+        rules_text, rules_tokens = self._get_context_builder().build(docs)
+        if usage is not None:
+            usage["rules_tokens"] = rules_tokens
+            usage["tenant_id"] = receipt_data.get("tenant_id")
+            usage["policy_version"] = version
+            # Articles shown to the LLM, used to normalize each violation's policy_reference.
+            labels = [article_label(doc.metadata) for doc in docs]
+            usage["articles"] = list(dict.fromkeys(label for label in labels if label))
+            # Chunks the verdict depended on; DBService stores them so a policy change can find affected audits.
+            usage["chunks"] = [
+                {
+                    "chunk_id": doc.id or doc.metadata.get("chunk_id"),
+                    "content_hash": doc.metadata.get("content_hash"),
+                    "source": doc.metadata.get("source"),
+                    "article_id": doc.metadata.get("article_id"),
+                }
+                for doc in docs
+                if doc.id or doc.metadata.get("chunk_id")
+            ]
+        if rules_text:
+            self._log_prompt_tokens(receipt_data, rules_tokens)
+        return rules_text
+
+    @staticmethod
+    def _new_usage() -> dict:
+        return {
+            "retrieval_ms": None,
+            "embedding_tokens": 0,
+            "rules_tokens": 0,
+            "llm_ms": None,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cost": 0.0,
+        }
+
+    @staticmethod
+    def _elapsed_ms(started: float) -> float:
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    def _with_usage(self, result: dict, usage: dict, started: float) -> dict:
+        """Attach the per-audit accounting record (``result["usage"]``) that the routes persist."""
+        for step in result.get("cascade") or []:
+            usage["input_tokens"] += step.get("input_tokens", 0)
+            usage["output_tokens"] += step.get("output_tokens", 0)
+            usage["cost"] = round(usage["cost"] + step.get("cost", 0.0), 6)
+        usage.update(
+            decision_path=result.get("decision_path"),
+            fallback_reason=result.get("fallback_reason"),
+            model=result.get("model"),
+            tier=result.get("tier"),
+            total_ms=self._elapsed_ms(started),
+        )
+        result["usage"] = usage
+        return result
+
+    def _with_defaults(self, result: dict, articles: list[str] | None = None) -> dict:
+        from core.rag_engine.article_splitter import resolve_policy_reference
+
+        result.setdefault("audit_decision", "Pass")
+        result.setdefault("violation_score", 0.2)
+        result.setdefault("violations", [])
+        result.setdefault("reasoning", "LLM 기반 판단")
+        if articles:
+            for violation in result["violations"]:
+                reference = resolve_policy_reference(violation.get("policy_reference"), articles)
+                if reference is not None:
+                    violation["policy_reference"] = reference
+        result["decision_path"] = "llm"
+        result["fallback_reason"] = None
+        return result
+
+    def _fallback(self, receipt_data: dict, reason: str) -> dict:
+        result = self._rule_fallback(receipt_data)
+        result["decision_path"] = "rule"
+        result["fallback_reason"] = reason
+        if reason not in ("no_rules", "circuit_open"):
+            logger.warning("audit fell back to rule tier receipt_id=%s reason=%s", receipt_data.get("receipt_id", ""), reason)
+        return result
+
+    def _skip_breaker(self, probe: bool) -> None:
+        # The audit ended without calling the LLM, so it says nothing about the LLM's health: a probe is
+        # handed back for the next request and the consecutive-failure count is left alone.
+        if probe:
+            self._breaker.release()
+
+    @staticmethod
+    def _reason(exc: Exception) -> str:
+        if isinstance(exc, CircuitOpen):
+            return "circuit_open"
+        if isinstance(exc, StageTimeout):
+            return f"{exc.stage}_deadline"
+        logger.debug("audit pipeline error", exc_info=exc)
+        return "error"
+
+    @staticmethod
+    def _upstream_failure(exc: Exception, stage: str, usage: dict | None = None) -> bool:
+        # The LLM and the query-embedding API are shared by every tenant; the vector stores are per tenant,
+        # so one tenant's cold or broken store must not open the circuit for everyone.
+        from core.rag_engine.retriever import EmbeddingError
+
+        if stage == "llm" or isinstance(exc, EmbeddingError):
+            return True
+        # A retrieval deadline counts only if it ran out while a query embedding was still in flight.
+        return isinstance(exc, StageTimeout) and bool(usage and usage.pop("embedding_pending", 0))
+
+    def _failure_reason(self, exc: Exception, stage: str, probe: bool, usage: dict | None = None) -> str:
+        if self._upstream_failure(exc, stage, usage):
+            self._breaker.record_failure()
+        else:
+            self._skip_breaker(probe)
+        return self._reason(exc)
+
+    def _guarded(self, stage: Stage, fn):
+        """Run one LLM call under the breaker and a stage deadline, settling the breaker like ``check``."""
+        if not self._breaker.allow():
+            raise CircuitOpen()
+        try:
+            result = stage.call(fn)
+        except Exception:
+            self._breaker.record_failure()
+            raise
+        self._breaker.record_success()
+        return result
+
     def check(self, receipt_data: dict) -> dict:
+        started = time.perf_counter()
+        usage = self._new_usage()
+        probe = self._breaker.state == "half_open"
+        if not self._breaker.allow():
+            return self._with_usage(self._fallback(receipt_data, "circuit_open"), usage, started)
+
+        stage = "retrieval"
         try:
-            from core.audit_agent.reasoning import AuditReasoning
-            from core.rag_engine.embedder import RegulationEmbedder
-            from core.rag_engine.vector_db import VectorDBManager
-
-            embedder = RegulationEmbedder()
-            db = VectorDBManager()
-            docs = db.search_rules(
-                json.dumps(receipt_data, ensure_ascii=False),
-                embedder.get_embedding_model(),
-                k=3,
-            )
-            rules_text = "\n\n".join(doc.page_content for doc in docs)
+            stage_started = time.perf_counter()
+            rules_text = self._retrieval_stage.call(lambda: self._retrieve_rules(receipt_data, usage))
+            usage["retrieval_ms"] = self._elapsed_ms(stage_started)
             if not rules_text:
-                return self._rule_fallback(receipt_data)
-
-            result = AuditReasoning().analyze(receipt_data, rules_text)
-            result.setdefault("audit_decision", "Pass")
-            result.setdefault("violation_score", 0.2)
-            result.setdefault("violations", [])
-            result.setdefault("reasoning", "LLM 기반 판단")
-            return result
-        except Exception:
-            return self._rule_fallback(receipt_data)
+                self._skip_breaker(probe)
+                return self._with_usage(self._fallback(receipt_data, "no_rules"), usage, started)
+
+            stage = "llm"
+            cascade = self._get_cascade()
+            stage_started = time.perf_counter()
+            result = self._llm_stage.call(lambda: cascade.analyze(receipt_data, rules_text))
+            usage["llm_ms"] = self._elapsed_ms(stage_started)
+            self._breaker.record_success()
+            return self._with_usage(self._with_defaults(result, usage.get("articles")), usage, started)
+        except Exception as exc:
+            reason = self._failure_reason(exc, stage, probe, usage)
+            return self._with_usage(self._fallback(receipt_data, reason), usage, started)
+
+    @staticmethod
+    def _changed_items(previous_receipt: dict, receipt_data: dict) -> list[int]:
+        # Edited or added item ids, or [0] when receipt-level fields (store name, date, tenant) differ.
+        def header(receipt: dict) -> dict:
+            return {k: v for k, v in receipt.items() if k not in ("items", "total_price")}
+
+        if header(previous_receipt) != header(receipt_data):
+            return [0]
+        before = {item.get("id"): item for item in previous_receipt.get("items", [])}
+        return [item.get("id") for item in receipt_data.get("items", []) if before.get(item.get("id")) != item]
+
+    def check_incremental(
+        self,
+        receipt_data: dict,
+        previous_result: dict | None,
+        previous_receipt: dict | None,
+        changed_item_ids: list[int] = (),
+    ) -> dict:
+        """Re-audit only the edited items of a receipt and merge them into ``previous_result``.
+
+        ``previous_result`` and ``previous_receipt`` are the stored audit and the
+        receipt it judged; the edited items are found by comparing that receipt
+        with ``receipt_data``, and ``changed_item_ids`` can only add to them.
+        Previous verdicts for items no longer on the receipt are dropped. A
+        missing previous audit, changed receipt-level fields (id 0) or a previous
+        result that came from the rule tier needs a full ``check``.
+        """
+        if (
+            previous_result is None
+            or previous_receipt is None
+            or previous_result.get("decision_path") not in ("llm", "cache", "incremental")
+        ):
+            return self.check(receipt_data)
+        changed_item_ids = list(dict.fromkeys([*self._changed_items(previous_receipt, receipt_data), *changed_item_ids]))
+        if 0 in changed_item_ids:
+            return self.check(receipt_data)
+
+        started = time.perf_counter()
+        item_ids = {item.get("id") for item in receipt_data.get("items", [])}
+        changed = [item_id for item_id in dict.fromkeys(changed_item_ids) if item_id in item_ids]
+        kept = [
+            v
+            for v in previous_result.get("violations", [])
+            if v.get("item_id") == 0 or (v.get("item_id") in item_ids and v.get("item_id") not in changed)
+        ]
+        previous_score = float(previous_result.get("violation_score", 0.0))
+
+        delta = None
+        new = []
+        usage = self._new_usage()
+        if changed:
+            # Retrieval is per item name, so only the edited names are embedded and searched.
+            delta = self.check({**receipt_data, "items": [i for i in receipt_data["items"] if i.get("id") in changed]})
+            usage = delta.pop("usage")
+            new = [v for v in delta.get("violations", []) if v.get("item_id") in changed]
+
+        delta_score = float(delta["violation_score"]) if delta else previous_score
+        scores = ([previous_score] if kept else []) + ([delta_score] if new else [])
+        violations = kept + new
+        if delta:
+            note = f"변경된 품목 {changed}만 다시 감사했고, 나머지 품목은 이전 판단을 유지했습니다."
+            reasoning = f"{delta.get('reasoning', '')} ({note})"
+        else:
+            reasoning = f"{previous_result.get('reasoning', '')} (변경된 품목이 없어 이전 판단을 유지했습니다.)"
+
+        result = {
+            "audit_decision": "Anomaly Detected" if violations else "Pass",
+            "violation_score": max(scores) if scores else min(previous_score, delta_score),
+            "violations": violations,
+            "reasoning": reasoning,
+            "decision_path": "incremental",
+            "fallback_reason": delta.get("fallback_reason") if delta else None,
+            "confidence": previous_result.get("confidence"),
+            "model": previous_result.get("model"),
+            "tier": previous_result.get("tier"),
+        }
+        if delta and delta.get("decision_path") == "llm":
+            result.update(model=delta.get("model"), tier=delta.get("tier"))
+            if delta.get("confidence") is not None and result["confidence"] is not None:
+                result["confidence"] = min(float(result["confidence"]), float(delta["confidence"]))
+        return self._with_usage(result, usage, started)
+
+    def check_many(self, receipts: list[dict], batch_size: int = 8) -> list[dict]:
+        """Audit many receipts for bulk jobs, packing receipts that share rules into one prompt.
+
+        Each receipt still gets its own retrieval; receipts whose first-tier
+        verdict needs escalation are re-judged individually by the cascade.
+        """
+        results: list[dict | None] = [None] * len(receipts)
+        pending = []
+        for position, receipt_data in enumerate(receipts):
+            started = time.perf_counter()
+            usage = self._new_usage()
+            if self._breaker.state == "open":
+                results[position] = self._with_usage(self._fallback(receipt_data, "circuit_open"), usage, started)
+                continue
+            try:
+                rules_text = self._retrieval_stage.call(lambda: self._retrieve_rules(receipt_data, usage))
+            except Exception as exc:
+                if self._upstream_failure(exc, "retrieval", usage):
+                    self._breaker.record_failure()
+                results[position] = self._with_usage(self._fallback(receipt_data, self._reason(exc)), usage, started)
+                continue
+            usage["retrieval_ms"] = self._elapsed_ms(started)
+            if not rules_text:
+                results[position] = self._with_usage(self._fallback(receipt_data, "no_rules"), usage, started)
+                continue
+            pending.append((position, receipt_data, rules_text, usage))
+
+        cascade = self._get_cascade()
+        first_tier = cascade.tiers[0]
+        batch_started = time.perf_counter()
+        # Each packed prompt goes through the breaker and the LLM deadline on its own; a failed pack
+        # only sends its own receipts to the rule tier.
+        batch, spent, errors = cascade.agent(first_tier).analyze_many_with_usage(
+            [(receipt_data, rules_text) for _, receipt_data, rules_text, _ in pending],
+            batch_size=batch_size,
+            call=lambda fn: self._guarded(self._packed_llm_stage, fn),
+        )
+        # Packed prompts share calls, so each receipt is charged an equal share of the wall time and a
+        # share of the tokens proportional to its prompt size (see AuditReasoning.analyze_many_with_usage).
+        batch_latency = (time.perf_counter() - batch_started) / max(1, len(pending))
+
+        for (position, receipt_data, rules_text, usage), result, share, error in zip(pending, batch, spent, errors):
+            started = time.perf_counter()
+            first_pass = {
+                "tier": 0,
+                "model": first_tier.model,
+                "latency_ms": round(batch_latency * 1000, 1),
+                **share,
+                "cost": round(first_tier.cost(share["input_tokens"], share["output_tokens"]), 6),
+            }
+            if result is None:
+                fallback = self._fallback(receipt_data, self._reason(error) if error is not None else "error")
+                fallback["cascade"] = [first_pass]
+                results[position] = self._with_usage(fallback, usage, started)
+                continue
+            result.update(model=first_tier.model, tier=0)
+            escalate = len(cascade.tiers) > 1 and first_tier.needs_escalation(result)
+            cascade.record(first_tier, batch_latency, share, escalate)
+            trace = [first_pass]
+            if escalate:
+                try:
+                    result = self._guarded(self._llm_stage, lambda: cascade.analyze(receipt_data, rules_text, start_tier=1))
+                except Exception as exc:
+                    # The first-tier verdict stands when the stronger tier is unavailable.
+                    logger.debug("bulk escalation error", exc_info=exc)
+            result["cascade"] = trace + (result.get("cascade") or [])
+            usage["llm_ms"] = round(batch_latency * 1000 + self._elapsed_ms(started), 1)
+            results[position] = self._with_usage(self._with_defaults(result, usage.get("articles")), usage, started)
+        return results
+
+    def check_stream(self, receipt_data: dict) -> Iterator[tuple[str, dict]]:
+        """Yield ``(event, data)`` pairs while the audit runs.
+
+        ``violation`` events are sent as soon as the streamed JSON contains a
+        complete violation (the next one has started, or the stream ended),
+        followed by exactly one ``decision`` event with the full result. If the
+        first tier escalates, an ``escalation`` stage event tells the client to
+        discard the violations streamed so far.
+        """
+        started = time.perf_counter()
+        usage = self._new_usage()
+        # Only one request at a time may probe a half-open breaker; if this is it, its outcome must be settled below.
+        probe = self._breaker.state == "half_open"
+        if not self._breaker.allow():
+            yield "decision", self._with_usage(self._fallback(receipt_data, "circuit_open"), usage, started)
+            return
+
+        emitted = 0
+        settled = False
+        stage = "retrieval"
+        try:
+            yield "stage", {"stage": "retrieval"}
+            stage_started = time.perf_counter()
+            rules_text = self._retrieval_stage.call(lambda: self._retrieve_rules(receipt_data, usage))
+            usage["retrieval_ms"] = self._elapsed_ms(stage_started)
+            if not rules_text:
+                self._skip_breaker(probe)
+                settled = True
+                yield "decision", self._with_usage(self._fallback(receipt_data, "no_rules"), usage, started)
+                return
+
+            yield "stage", {"stage": "analysis"}
+            stage = "llm"
+            cascade = self._get_cascade()
+            first_tier = cascade.tiers[0]
+            stage_started = time.perf_counter()
+            partial: dict = {}
+            agent = cascade.agent(first_tier)
+            for partial in self._llm_stage.iterate(lambda: agent.stream(receipt_data, rules_text)):
+                violations = partial.get("violations") or []
+                while emitted < len(violations) - 1:
+                    yield "violation", violations[emitted]
+                    emitted += 1
+
+            result = dict(partial or {})
+            for violation in (result.get("violations") or [])[emitted:]:
+                yield "violation", violation
+            escalate = len(cascade.tiers) > 1 and first_tier.needs_escalation(result)
+            latency = time.perf_counter() - stage_started
+            first_pass = self._stream_usage(receipt_data, result, usage["rules_tokens"])
+            cascade.record(first_tier, latency, first_pass, escalate)
+            trace = [{
+                "tier": 0,
+                "model": first_tier.model,
+                "latency_ms": round(latency * 1000, 1),
+                **first_pass,
+                "cost": round(first_tier.cost(first_pass["input_tokens"], first_pass["output_tokens"]), 6),
+            }]
+            result.update(model=first_tier.model, tier=0)
+            if escalate:
+                # Low-confidence or high-risk first pass: the stronger tier decides.
+                yield "stage", {"stage": "escalation", "model": cascade.tiers[1].model}
+                result = self._llm_stage.call(lambda: cascade.analyze(receipt_data, rules_text, start_tier=1))
+            result["cascade"] = trace + (result.get("cascade") or [])
+            usage["llm_ms"] = self._elapsed_ms(stage_started)
+
+            self._breaker.record_success()
+            settled = True
+            yield "decision", self._with_usage(self._with_defaults(result, usage.get("articles")), usage, started)
+        except Exception as exc:
+            reason = self._failure_reason(exc, stage, probe, usage)
+            settled = True
+            yield "decision", self._with_usage(self._fallback(receipt_data, reason), usage, started)
+        finally:
+            # A client that disconnects mid-stream closes this generator with GeneratorExit, which skips
+            # the handlers above; hand the probe back so the breaker does not stay half-open forever.
+            if probe and not settled:
+                self._breaker.release()
+
+    def _stream_usage(self, receipt_data: dict, result: dict, rules_tokens: int) -> dict:
+        # Streamed responses carry no usage metadata, so the first pass is estimated.
+        from core.rag_engine.context_builder import estimate_tokens
+
+        return {
+            "input_tokens": self._prompt_tokens(receipt_data, rules_tokens)["total"],
+            "output_tokens": estimate_tokens(json.dumps(result, ensure_ascii=False)),
+        }
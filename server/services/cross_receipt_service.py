@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from server.config import SPLIT_PURCHASE_CAP, SPLIT_WINDOW_MINUTES
+from server.services.db_service import DBService, receipt_index_values
+
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+DUPLICATE_REFERENCE = "중복 청구 금지"
+SPLIT_REFERENCE = "분할 결제 금지"
+
+
+class CrossReceiptService:
+    """Looks at a receipt together with the other stored receipts.
+
+    Works incrementally: each new receipt is indexed on (store, timestamp,
+    total, fingerprint) and only its own store/time window (receipts under the
+    cap) and fingerprint are queried, never the whole table. A receipt that is
+    already stored unchanged is not written again.
+    """
+
+    def __init__(
+        self,
+        db: DBService | None = None,
+        cap: int = SPLIT_PURCHASE_CAP,
+        window_minutes: int = SPLIT_WINDOW_MINUTES,
+    ):
+        self.db = db or DBService()
+        self.cap = cap
+        self.window = timedelta(minutes=window_minutes)
+
+    def _split_cluster(self, receipt_id: str, index: dict) -> dict | None:
+        if not self.cap or not index["receipt_ts"] or index["total_price"] > self.cap:
+            return None
+
+        ts = datetime.strptime(index["receipt_ts"], TS_FORMAT)
+        neighbours = self.db.find_receipts_in_window(
+            index["store_key"],
+            (ts - self.window).strftime(TS_FORMAT),
+            (ts + self.window).strftime(TS_FORMAT),
+            max_total=self.cap,
+        )
+        # Exact duplicates are reported separately and would double count here.
+        seen = {index["fingerprint"]}
+        rows = [{"receipt_id": receipt_id, "ts": ts, "total_price": index["total_price"]}]
+        for row in neighbours:
+            if row["receipt_id"] == receipt_id or row["fingerprint"] in seen:
+                continue
+            seen.add(row["fingerprint"])
+            rows.append(
+                {
+                    "receipt_id": row["receipt_id"],
+                    "ts": datetime.strptime(row["receipt_ts"], TS_FORMAT),
+                    "total_price": row["total_price"],
+                }
+            )
+        rows.sort(key=lambda r: r["ts"])
+
+        # Slide a window of the configured width over the neighbours and keep
+        # the heaviest one that still contains this receipt.
+        best = None
+        for start in rows:
+            if start["ts"] > ts or ts - start["ts"] > self.window:
+                continue
+            members = [r for r in rows if start["ts"] <= r["ts"] <= start["ts"] + self.window]
+            total = sum(r["total_price"] for r in members)
+            if len(members) > 1 and total > self.cap and (best is None or total > best["total"]):
+                best = {
+                    "receipt_ids": [r["receipt_id"] for r in members],
+                    "total": total,
+                    "cap": self.cap,
+                    "window_minutes": int(self.window.total_seconds() // 60),
+                }
+        return best
+
+    def analyze(self, receipt_data: dict) -> dict:
+        """Index ``receipt_data`` and return its duplicate and split-purchase findings."""
+        receipt_id = receipt_data["receipt_id"]
+        self.db.index_receipt(receipt_id, receipt_data)
+        index = receipt_index_values(receipt_data)
+        return {
+            "duplicates": self.db.find_receipts_by_fingerprint(index["fingerprint"], receipt_id),
+            "split_purchase": self._split_cluster(receipt_id, index),
+        }
+
+    def strip(self, result: dict) -> dict:
+        """Remove previously merged cross-receipt violations, e.g. before re-judging a result."""
+        result = dict(result)
+        result.pop("cross_receipt", None)
+        result["violations"] = [
+            v
+            for v in result.get("violations", [])
+            if not str(v.get("policy_reference", "")).startswith((DUPLICATE_REFERENCE, SPLIT_REFERENCE))
+        ]
+        return result
+
+    def apply(self, receipt_data: dict, result: dict) -> dict:
+        """Merge cross-receipt findings into an audit result as receipt-level violations."""
+        try:
+            findings = self.analyze(receipt_data)
+        except Exception:
+            return result
+
+        violations = []
+        if findings["duplicates"]:
+            violations.append(
+                {
+                    "item_id": 0,
+                    "reason": f"중복 영수증 의심: 동일한 내용의 영수증이 이미 등록됨 ({', '.join(findings['duplicates'])})",
+                    "policy_reference": DUPLICATE_REFERENCE,
+                }
+            )
+        split = findings["split_purchase"]
+        if split:
+            others = [rid for rid in split["receipt_ids"] if rid != receipt_data["receipt_id"]]
+            violations.append(
+                {
+                    "item_id": 0,
+                    "reason": (
+                        f"분할 결제 의심: {split['window_minutes']}분 이내 같은 가게 영수증 {len(split['receipt_ids'])}건 "
+                        f"합계 {split['total']:,}원이 한도 {split['cap']:,}원 초과 ({', '.join(others)})"
+                    ),
+                    "policy_reference": f"{SPLIT_REFERENCE} (건당 한도 {split['cap']:,}원)",
+                }
+            )
+
+        result["cross_receipt"] = findings
+        if violations:
+            result["violations"] = list(result.get("violations", [])) + violations
+            result["audit_decision"] = "Anomaly Detected"
+            result["violation_score"] = max(float(result.get("violation_score", 0.0)), 0.8)
+        return result
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import re
 import sqlite3
 from datetime import datetime
 from pathlib import Path
@@ -8,6 +10,65 @@ from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parents[2]
 DB_PATH = BASE_DIR / "data" / "intermediate" / "transparent_audit.db"
 
+RECEIPT_INDEX_COLUMNS = {
+    "store_key": "TEXT",
+    "receipt_ts": "TEXT",
+    "total_price": "INTEGER",
+    "fingerprint": "TEXT",
+}
+
+
+TS_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d")
+
+
+def _parse_ts(text: str) -> tuple[datetime, str] | None:
+    # Receipts and filters write dates as 2026-01-31, 2026/01/31 or 2026.01.31, with or without a time.
+    dt_text = str(text or "").strip().replace("/", "-").replace(".", "-")
+    for fmt in TS_FORMATS:
+        try:
+            return datetime.strptime(dt_text, fmt), fmt
+        except ValueError:
+            continue
+    return None
+
+
+def ts_bound(text: str, upper: bool = False) -> str:
+    """Normalize a date filter to the ``receipt_ts`` format; an upper bound covers its whole day or minute."""
+    parsed = _parse_ts(text)
+    if parsed is None:
+        raise ValueError(f"unrecognized date: {text!r} (expected YYYY-MM-DD [HH:MM[:SS]])")
+    ts, fmt = parsed
+    if upper and fmt == "%Y-%m-%d":
+        ts = ts.replace(hour=23, minute=59, second=59)
+    elif upper and fmt == "%Y-%m-%d %H:%M":
+        ts = ts.replace(second=59)
+    return ts.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def receipt_index_values(payload: dict) -> dict:
+    """Normalized store, timestamp, total and content fingerprint used by the cross-receipt indexes."""
+    store_key = re.sub(r"\s+", "", str(payload.get("store_name", ""))).lower()
+
+    parsed = _parse_ts(payload.get("date", ""))
+    receipt_ts = parsed[0].strftime("%Y-%m-%d %H:%M:%S") if parsed else None
+    dt_text = str(payload.get("date", "")).strip().replace("/", "-").replace(".", "-")
+
+    items = sorted(
+        (str(item.get("name", "")).strip(), int(item.get("count", 0) or 0), int(item.get("price", 0) or 0))
+        for item in payload.get("items", [])
+    )
+    try:
+        total_price = int(payload.get("total_price", 0) or 0)
+    except (TypeError, ValueError):
+        total_price = 0
+    basis = json.dumps([store_key, receipt_ts or dt_text, total_price, items], ensure_ascii=False)
+    return {
+        "store_key": store_key,
+        "receipt_ts": receipt_ts,
+        "total_price": total_price,
+        "fingerprint": hashlib.sha256(basis.encode("utf-8")).hexdigest(),
+    }
+
 
 class DBService:
     def __init__(self, db_path: Path | None = None):
@@ -42,6 +103,65 @@ class DBService:
                     FOREIGN KEY(receipt_id) REFERENCES receipts(receipt_id)
                 );
 
+                CREATE TABLE IF NOT EXISTS batch_runs (
+                    run_id TEXT PRIMARY KEY,
+                    filters_json TEXT NOT NULL,
+                    total INTEGER NOT NULL,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    finished_at TEXT
+                );
+
+                CREATE TABLE IF NOT EXISTS batch_run_items (
+                    run_id TEXT NOT NULL,
+                    receipt_id TEXT NOT NULL,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (run_id, receipt_id),
+                    FOREIGN KEY(run_id) REFERENCES batch_runs(run_id)
+                );
+
+                CREATE TABLE IF NOT EXISTS audit_metrics (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    receipt_id TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    decision_path TEXT,
+                    fallback_reason TEXT,
+                    model TEXT,
+                    tier INTEGER,
+                    retrieval_ms REAL,
+                    embedding_tokens INTEGER NOT NULL DEFAULT 0,
+                    rules_tokens INTEGER NOT NULL DEFAULT 0,
+                    llm_ms REAL,
+                    input_tokens INTEGER NOT NULL DEFAULT 0,
+                    output_tokens INTEGER NOT NULL DEFAULT 0,
+                    cost REAL NOT NULL DEFAULT 0,
+                    total_ms REAL,
+                    created_at TEXT NOT NULL
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_audit_metrics_day_model ON audit_metrics(day, model);
+
+                CREATE TABLE IF NOT EXISTS audit_chunks (
+                    receipt_id TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    content_hash TEXT,
+                    source TEXT,
+                    article_id TEXT,
+                    tenant_id TEXT NOT NULL DEFAULT '',
+                    policy_version TEXT,
+                    PRIMARY KEY (receipt_id, chunk_id)
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_audit_chunks_chunk ON audit_chunks(tenant_id, chunk_id);
+                CREATE INDEX IF NOT EXISTS idx_audit_chunks_article ON audit_chunks(tenant_id, source, article_id);
+
+                CREATE TABLE IF NOT EXISTS speculative_audits (
+                    receipt_id TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    payload_json TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                );
+
                 CREATE TABLE IF NOT EXISTS reports (
                     receipt_id TEXT PRIMARY KEY,
                     pdf_path TEXT NOT NULL,
@@ -52,26 +172,98 @@ class DBService:
                 );
                 """
             )
+            self._migrate_receipt_index(conn)
+
+    def _migrate_receipt_index(self, conn: sqlite3.Connection) -> None:
+        existing = {row["name"] for row in conn.execute("PRAGMA table_info(receipts)")}
+        missing = [name for name in RECEIPT_INDEX_COLUMNS if name not in existing]
+        for name in missing:
+            conn.execute(f"ALTER TABLE receipts ADD COLUMN {name} {RECEIPT_INDEX_COLUMNS[name]}")
+
+        if missing:
+            rows = conn.execute("SELECT receipt_id, payload_json FROM receipts").fetchall()
+            conn.executemany(
+                """
+                UPDATE receipts SET store_key = :store_key, receipt_ts = :receipt_ts,
+                    total_price = :total_price, fingerprint = :fingerprint
+                WHERE receipt_id = :receipt_id
+                """,
+                [
+                    {"receipt_id": row["receipt_id"], **receipt_index_values(json.loads(row["payload_json"]))}
+                    for row in rows
+                ],
+            )
+
+        conn.executescript(
+            """
+            DROP INDEX IF EXISTS idx_receipts_store_ts;
+            CREATE INDEX IF NOT EXISTS idx_receipts_store_ts_total ON receipts(store_key, receipt_ts, total_price);
+            CREATE INDEX IF NOT EXISTS idx_receipts_ts ON receipts(receipt_ts);
+            CREATE INDEX IF NOT EXISTS idx_receipts_fingerprint ON receipts(fingerprint);
+            """
+        )
 
     def _ensure(self) -> None:
         self.init_db()
 
-    def upsert_receipt(self, receipt_id: str, payload: dict, image_path: str) -> None:
+    def index_receipt(self, receipt_id: str, payload: dict) -> bool:
+        """Store ``payload`` unless the stored receipt is already identical; returns whether it wrote.
+
+        /check re-sends the receipt OCR already stored, so the common case is a
+        single primary-key read instead of a write transaction per audit.
+        """
+        self._ensure()
+        with self._conn() as conn:
+            row = conn.execute("SELECT payload_json FROM receipts WHERE receipt_id = ?", (receipt_id,)).fetchone()
+        if row is not None and json.loads(row["payload_json"]) == payload:
+            return False
+        self.upsert_receipt(receipt_id, payload)
+        return True
+
+    def upsert_receipt(self, receipt_id: str, payload: dict, image_path: str | None = None) -> None:
         self._ensure()
         now = self._now()
         with self._conn() as conn:
             conn.execute(
                 """
-                INSERT INTO receipts (receipt_id, payload_json, image_path, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?)
+                INSERT INTO receipts (
+                    receipt_id, payload_json, image_path, created_at, updated_at,
+                    store_key, receipt_ts, total_price, fingerprint
+                )
+                VALUES (
+                    :receipt_id, :payload_json, :image_path, :now, :now,
+                    :store_key, :receipt_ts, :total_price, :fingerprint
+                )
                 ON CONFLICT(receipt_id) DO UPDATE SET
                     payload_json=excluded.payload_json,
-                    image_path=excluded.image_path,
-                    updated_at=excluded.updated_at
+                    image_path=COALESCE(excluded.image_path, receipts.image_path),
+                    updated_at=excluded.updated_at,
+                    store_key=excluded.store_key,
+                    receipt_ts=excluded.receipt_ts,
+                    total_price=excluded.total_price,
+                    fingerprint=excluded.fingerprint
                 """,
-                (receipt_id, json.dumps(payload, ensure_ascii=False), image_path, now, now),
+                {
+                    "receipt_id": receipt_id,
+                    "payload_json": json.dumps(payload, ensure_ascii=False),
+                    "image_path": image_path,
+                    "now": now,
+                    **receipt_index_values(payload),
+                },
             )
 
+    def get_receipt(self, receipt_id: str) -> dict | None:
+        self._ensure()
+        with self._conn() as conn:
+            row = conn.execute("SELECT payload_json FROM receipts WHERE receipt_id = ?", (receipt_id,)).fetchone()
+        return json.loads(row["payload_json"]) if row else None
+
+    def get_audit(self, receipt_id: str) -> dict | None:
+        self._ensure()
+        with self._conn() as conn:
+            row = conn.execute("SELECT payload_json FROM audits WHERE receipt_id = ?", (receipt_id,)).fetchone()
+        return json.loads(row["payload_json"]) if row else None
+
     def upsert_audit(self, receipt_id: str, payload: dict) -> None:
         self._ensure()
         now = self._now()
@@ -86,6 +278,83 @@ class DBService:
                 """,
                 (receipt_id, json.dumps(payload, ensure_ascii=False), now, now),
             )
+            self._save_audit_chunks(conn, receipt_id, payload)
+
+    def _save_audit_chunks(self, conn: sqlite3.Connection, receipt_id: str, payload: dict) -> None:
+        """Record which policy chunks an audit was judged against (``usage["chunks"]``).
+
+        A full audit replaces the receipt's dependencies; an incremental one only
+        re-retrieved the edited items, so its chunks are added to the existing set.
+        Audits that did no retrieval (circuit open, unchanged incremental) leave them as is.
+        """
+        usage = payload.get("usage") or {}
+        chunks = usage.get("chunks")
+        if chunks is None:
+            return
+        if usage.get("decision_path") != "incremental":
+            conn.execute("DELETE FROM audit_chunks WHERE receipt_id = ?", (receipt_id,))
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO audit_chunks (
+                receipt_id, chunk_id, content_hash, source, article_id, tenant_id, policy_version
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    receipt_id,
+                    chunk["chunk_id"],
+                    chunk.get("content_hash"),
+                    chunk.get("source"),
+                    chunk.get("article_id"),
+                    usage.get("tenant_id") or "",
+                    usage.get("policy_version"),
+                )
+                for chunk in chunks
+            ],
+        )
+
+    def find_audits_affected(
+        self,
+        removed_chunk_ids: list[str],
+        added_articles: list[tuple[str, str]],
+        tenant_id: str | None = None,
+    ) -> list[str]:
+        """Receipts whose last audit used a chunk that is gone, or an article that gained new text."""
+        self._ensure()
+        tenant = tenant_id or ""
+        receipt_ids: set[str] = set()
+        with self._conn() as conn:
+            conn.execute("CREATE TEMP TABLE changed_chunks (chunk_id TEXT PRIMARY KEY)")
+            conn.executemany("INSERT OR IGNORE INTO changed_chunks VALUES (?)", [(c,) for c in removed_chunk_ids])
+            conn.execute("CREATE TEMP TABLE changed_articles (source TEXT, article_id TEXT, PRIMARY KEY (source, article_id))")
+            conn.executemany("INSERT OR IGNORE INTO changed_articles VALUES (?, ?)", [tuple(a) for a in added_articles])
+            rows = conn.execute(
+                """
+                SELECT d.receipt_id FROM audit_chunks d
+                JOIN changed_chunks c ON c.chunk_id = d.chunk_id
+                WHERE d.tenant_id = ?
+                UNION
+                SELECT d.receipt_id FROM audit_chunks d
+                JOIN changed_articles a ON a.source = d.source AND a.article_id = d.article_id
+                WHERE d.tenant_id = ?
+                """,
+                (tenant, tenant),
+            ).fetchall()
+            receipt_ids.update(row["receipt_id"] for row in rows)
+            conn.execute("DROP TABLE changed_chunks")
+            conn.execute("DROP TABLE changed_articles")
+        return sorted(receipt_ids)
+
+    def find_audited_receipts(self, tenant_id: str | None = None) -> list[str]:
+        """Every receipt with recorded dependencies for the tenant (used when the whole store was re-embedded)."""
+        self._ensure()
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT receipt_id FROM audit_chunks WHERE tenant_id = ? ORDER BY receipt_id",
+                (tenant_id or "",),
+            ).fetchall()
+        return [row["receipt_id"] for row in rows]
 
     def upsert_report(self, receipt_id: str, pdf_path: str, payload: dict) -> None:
         self._ensure()
@@ -102,3 +371,269 @@ class DBService:
                 """,
                 (receipt_id, pdf_path, json.dumps(payload, ensure_ascii=False), now, now),
             )
+
+    def find_receipts(self, since: str | None = None, until: str | None = None, status: str = "all") -> list[str]:
+        """Receipt ids filtered by receipt date and audit state.
+
+        Dates are compared on the normalized ``receipt_ts`` column, so 2026/01/31
+        and 2026.01.31 receipts are found; a date-only ``until`` includes that whole
+        day. Receipts whose date could not be parsed never match a date filter.
+        Raises ValueError for a bound that is not a date.
+        """
+        self._ensure()
+        clauses = []
+        params: list = []
+        if since:
+            clauses.append("r.receipt_ts >= ?")
+            params.append(ts_bound(since))
+        if until:
+            clauses.append("r.receipt_ts <= ?")
+            params.append(ts_bound(until, upper=True))
+        if status == "unaudited":
+            clauses.append("a.receipt_id IS NULL")
+        elif status == "audited":
+            clauses.append("a.receipt_id IS NOT NULL")
+        elif status in ("Pass", "Anomaly Detected"):
+            clauses.append("json_extract(a.payload_json, '$.audit_decision') = ?")
+            params.append(status)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._conn() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT r.receipt_id FROM receipts r
+                LEFT JOIN audits a ON a.receipt_id = r.receipt_id
+                {where}
+                ORDER BY r.receipt_id
+                """,
+                params,
+            ).fetchall()
+        return [row["receipt_id"] for row in rows]
+
+    def create_batch_run(self, run_id: str, filters: dict, receipt_ids: list[str]) -> None:
+        self._ensure()
+        now = self._now()
+        with self._conn() as conn:
+            conn.execute(
+                """
+                INSERT INTO batch_runs (run_id, filters_json, total, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (run_id, json.dumps(filters, ensure_ascii=False), len(receipt_ids), now, now),
+            )
+            conn.executemany(
+                "INSERT INTO batch_run_items (run_id, receipt_id) VALUES (?, ?)",
+                [(run_id, receipt_id) for receipt_id in receipt_ids],
+            )
+
+    def get_batch_run(self, run_id: str) -> dict | None:
+        self._ensure()
+        with self._conn() as conn:
+            row = conn.execute(
+                """
+                SELECT b.*, (SELECT COUNT(*) FROM batch_run_items i WHERE i.run_id = b.run_id AND i.done = 1) AS done
+                FROM batch_runs b WHERE b.run_id = ?
+                """,
+                (run_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        run = dict(row)
+        run["filters"] = json.loads(run.pop("filters_json"))
+        return run
+
+    def pending_batch_items(self, run_id: str) -> list[tuple[str, dict]]:
+        self._ensure()
+        with self._conn() as conn:
+            rows = conn.execute(
+                """
+                SELECT i.receipt_id, r.payload_json FROM batch_run_items i
+                JOIN receipts r ON r.receipt_id = i.receipt_id
+                WHERE i.run_id = ? AND i.done = 0
+                ORDER BY i.receipt_id
+                """,
+                (run_id,),
+            ).fetchall()
+        return [(row["receipt_id"], json.loads(row["payload_json"])) for row in rows]
+
+    def save_batch_results(
+        self, run_id: str, results: list[tuple[str, dict]], retry: list[tuple[str, dict]] = ()
+    ) -> None:
+        """Write a batch of audits and mark them done in one transaction (the resume checkpoint).
+
+        ``retry`` holds audits that fell back to the rule tier on a transient failure: they are
+        stored only for receipts without an audit yet and stay pending for ``--resume``.
+        """
+        self._ensure()
+        now = self._now()
+        with self._conn() as conn:
+            conn.executemany(
+                """
+                INSERT INTO audits (receipt_id, payload_json, created_at, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(receipt_id) DO NOTHING
+                """,
+                [(receipt_id, json.dumps(payload, ensure_ascii=False), now, now) for receipt_id, payload in retry],
+            )
+            conn.executemany(
+                """
+                INSERT INTO audits (receipt_id, payload_json, created_at, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(receipt_id) DO UPDATE SET
+                    payload_json=excluded.payload_json,
+                    updated_at=excluded.updated_at
+                """,
+                [(receipt_id, json.dumps(payload, ensure_ascii=False), now, now) for receipt_id, payload in results],
+            )
+            for receipt_id, payload in results:
+                self._save_audit_chunks(conn, receipt_id, payload)
+            conn.executemany(
+                "UPDATE batch_run_items SET done = 1 WHERE run_id = ? AND receipt_id = ?",
+                [(run_id, receipt_id) for receipt_id, _ in results],
+            )
+            conn.execute("UPDATE batch_runs SET updated_at = ? WHERE run_id = ?", (now, run_id))
+
+    def finish_batch_run(self, run_id: str) -> None:
+        self._ensure()
+        now = self._now()
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE batch_runs SET finished_at = ?, updated_at = ? WHERE run_id = ?",
+                (now, now, run_id),
+            )
+
+    def record_audit_metrics(self, receipt_id: str, usage: dict) -> None:
+        """Append one audit's accounting record (see ``AuditService._with_usage``)."""
+        self._ensure()
+        now = self._now()
+        with self._conn() as conn:
+            conn.execute(
+                """
+                INSERT INTO audit_metrics (
+                    receipt_id, day, decision_path, fallback_reason, model, tier,
+                    retrieval_ms, embedding_tokens, rules_tokens, llm_ms,
+                    input_tokens, output_tokens, cost, total_ms, created_at
+                )
+                VALUES (
+                    :receipt_id, :day, :decision_path, :fallback_reason, :model, :tier,
+                    :retrieval_ms, :embedding_tokens, :rules_tokens, :llm_ms,
+                    :input_tokens, :output_tokens, :cost, :total_ms, :created_at
+                )
+                """,
+                {
+                    "decision_path": None,
+                    "fallback_reason": None,
+                    "model": None,
+                    "tier": None,
+                    "retrieval_ms": None,
+                    "embedding_tokens": 0,
+                    "rules_tokens": 0,
+                    "llm_ms": None,
+                    "input_tokens": 0,
+                    "output_tokens": 0,
+                    "cost": 0.0,
+                    "total_ms": None,
+                    **{key: value for key, value in usage.items() if key != "receipt_id"},
+                    "receipt_id": receipt_id,
+                    "day": now[:10],
+                    "created_at": now,
+                },
+            )
+
+    def summarize_audit_metrics(self, since: str | None = None, until: str | None = None) -> list[dict]:
+        """Audit counts, tokens, latency and cost per day, model and decision path."""
+        self._ensure()
+        clauses = []
+        params: list = []
+        if since:
+            clauses.append("day >= ?")
+            params.append(since)
+        if until:
+            clauses.append("day <= ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._conn() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT
+                    day,
+                    COALESCE(model, '-') AS model,
+                    decision_path,
+                    COUNT(*) AS audits,
+                    SUM(embedding_tokens) AS embedding_tokens,
+                    SUM(input_tokens) AS input_tokens,
+                    SUM(output_tokens) AS output_tokens,
+                    ROUND(SUM(cost), 6) AS cost,
+                    ROUND(AVG(retrieval_ms), 1) AS avg_retrieval_ms,
+                    ROUND(AVG(llm_ms), 1) AS avg_llm_ms,
+                    ROUND(AVG(total_ms), 1) AS avg_total_ms,
+                    ROUND(MAX(total_ms), 1) AS max_total_ms
+                FROM audit_metrics
+                {where}
+                GROUP BY day, model, decision_path
+                ORDER BY day DESC, model, decision_path
+                """,
+                params,
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def save_speculative_audit(self, receipt_id: str, content_hash: str, payload: dict) -> None:
+        self._ensure()
+        with self._conn() as conn:
+            conn.execute(
+                """
+                INSERT INTO speculative_audits (receipt_id, content_hash, payload_json, created_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(receipt_id) DO UPDATE SET
+                    content_hash=excluded.content_hash,
+                    payload_json=excluded.payload_json,
+                    created_at=excluded.created_at
+                """,
+                (receipt_id, content_hash, json.dumps(payload, ensure_ascii=False), self._now()),
+            )
+
+    def get_speculative_audit(self, receipt_id: str) -> dict | None:
+        self._ensure()
+        with self._conn() as conn:
+            row = conn.execute(
+                "SELECT content_hash, payload_json, created_at FROM speculative_audits WHERE receipt_id = ?",
+                (receipt_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "content_hash": row["content_hash"],
+            "payload": json.loads(row["payload_json"]),
+            "created_at": row["created_at"],
+        }
+
+    def delete_speculative_audit(self, receipt_id: str) -> None:
+        self._ensure()
+        with self._conn() as conn:
+            conn.execute("DELETE FROM speculative_audits WHERE receipt_id = ?", (receipt_id,))
+
+    def find_receipts_by_fingerprint(self, fingerprint: str, exclude_receipt_id: str) -> list[str]:
+        self._ensure()
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT receipt_id FROM receipts WHERE fingerprint = ? AND receipt_id != ? ORDER BY receipt_id",
+                (fingerprint, exclude_receipt_id),
+            ).fetchall()
+        return [row["receipt_id"] for row in rows]
+
+    def find_receipts_in_window(
+        self, store_key: str, start_ts: str, end_ts: str, max_total: int | None = None
+    ) -> list[dict]:
+        """Receipts of one store within [start_ts, end_ts], optionally only those totalling at most ``max_total``."""
+        self._ensure()
+        query = """
+            SELECT receipt_id, receipt_ts, total_price, fingerprint FROM receipts
+            WHERE store_key = ? AND receipt_ts BETWEEN ? AND ?
+        """
+        params: list = [store_key, start_ts, end_ts]
+        if max_total is not None:
+            query += " AND total_price <= ?"
+            params.append(max_total)
+        with self._conn() as conn:
+            rows = conn.execute(query + " ORDER BY receipt_ts", params).fetchall()
+        return [dict(row) for row in rows]
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import math
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, TypeVar
+
+from server.config import STAGE_WORKERS
+
+T = TypeVar("T")
+
+# Work that misses its deadline cannot be cancelled once it is running, so it
+# keeps its worker until it returns and its result is discarded. Attempts that
+# have not started yet are cancelled, and deadlines count from when an attempt
+# starts, so a busy pool does not eat into a request's time budget.
+_executor = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix="audit-stage")
+
+
+class StageTimeout(Exception):
+    def __init__(self, stage: str, deadline: float):
+        super().__init__(f"{stage} stage exceeded its {deadline:.1f}s deadline")
+        self.stage = stage
+        self.deadline = deadline
+
+
+class CircuitOpen(Exception):
+    """A guarded call was rejected because the breaker is open (or another request holds its probe)."""
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float) -> float | None:
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return None
+        idx = min(len(samples) - 1, max(0, math.ceil(p / 100 * len(samples)) - 1))
+        return samples[idx]
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` consecutive failures.
+
+    While open every call is rejected; after ``reset_seconds`` a single probe
+    call is let through (half-open) and its outcome closes or re-opens it.
+    A probe whose caller goes away must be handed back with ``release``; a
+    probe that is never settled expires after another ``reset_seconds``.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_seconds:
+                return False
+            if self._probing and now - self._probe_started < self.reset_seconds:
+                return False
+            self._probing = True
+            self._probe_started = now
+            return True
+
+    def release(self) -> None:
+        """Give back a probe whose outcome is unknown (e.g. the client disconnected)."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class Stage:
+    """Runs one pipeline stage under a deadline, optionally hedged.
+
+    When ``hedge_percentile`` is set and enough latencies have been observed,
+    a second identical attempt is started once the first has been running
+    longer than that percentile; whichever finishes first wins.
+    """
+
+    def __init__(self, name: str, deadline: float, hedge_percentile: float = 0.0, min_samples: int = 20):
+        self.name = name
+        self.deadline = deadline
+        self.hedge_percentile = hedge_percentile
+        self.latency = LatencyTracker(min_samples=min_samples)
+
+    def _hedge_after(self) -> float | None:
+        if not self.hedge_percentile:
+            return None
+        threshold = self.latency.percentile(self.hedge_percentile)
+        if threshold is None or threshold >= self.deadline:
+            return None
+        return threshold
+
+    def _start(self, fn: Callable[[], T]) -> tuple[Future, threading.Event, dict]:
+        # The event fires when a worker picks the attempt up; box["at"] is its start time.
+        started = threading.Event()
+        box: dict = {}
+
+        def run() -> T:
+            box["at"] = time.monotonic()
+            started.set()
+            return fn()
+
+        return _executor.submit(run), started, box
+
+    def _wait_started(self, future: Future, started: threading.Event, box: dict) -> float:
+        # Waiting for a free worker gets its own deadline-sized budget and does not count against the stage.
+        if not started.wait(self.deadline):
+            if future.cancel() or not started.is_set():
+                raise StageTimeout(self.name, self.deadline)
+        return box["at"]
+
+    def call(self, fn: Callable[[], T]) -> T:
+        first, first_started, box = self._start(fn)
+        started = self._wait_started(first, first_started, box)
+        end = started + self.deadline
+        pending: set[Future] = {first}
+        hedge_after = self._hedge_after()
+        hedged = False
+        error: BaseException | None = None
+
+        while pending:
+            now = time.monotonic()
+            if now >= end:
+                break
+            timeout = end - now
+            if hedge_after is not None and not hedged:
+                timeout = min(timeout, max(0.0, started + hedge_after - now))
+
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self.latency.record(time.monotonic() - started)
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+
+            if hedge_after is not None and not hedged and time.monotonic() - started >= hedge_after:
+                hedged = True
+                pending.add(self._start(fn)[0])
+
+        for future in pending:
+            future.cancel()
+        if error is not None and not pending:
+            raise error
+        raise StageTimeout(self.name, self.deadline)
+
+    def iterate(self, make_iterable: Callable[[], Iterable[T]]) -> Iterator[T]:
+        """Consume a streaming call; the whole stream must finish within the deadline."""
+        items: queue.Queue = queue.Queue()
+        done = object()
+
+        def pump() -> None:
+            try:
+                for item in make_iterable():
+                    items.put((item, None))
+            except BaseException as exc:
+                items.put((done, exc))
+                return
+            items.put((done, None))
+
+        future, pump_started, box = self._start(pump)
+        started = self._wait_started(future, pump_started, box)
+        end = started + self.deadline
+        while True:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                raise StageTimeout(self.name, self.deadline)
+            try:
+                item, exc = items.get(timeout=remaining)
+            except queue.Empty:
+                raise StageTimeout(self.name, self.deadline) from None
+            if item is done:
+                if exc is not None:
+                    raise exc
+                self.latency.record(time.monotonic() - started)
+                return
+            yield item
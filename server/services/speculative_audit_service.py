@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+
+from server.config import SPECULATIVE_TTL_SECONDS, SPECULATIVE_WAIT_SECONDS
+from server.services.audit_service import AuditService
+from server.services.db_service import DBService
+
+logger = logging.getLogger(__name__)
+
+RECEIPT_FIELDS = ("receipt_id", "tenant_id", "store_name", "date", "total_price")
+ITEM_FIELDS = ("id", "name", "unit_price", "count", "price")
+
+
+class SpeculativeAuditService:
+    """Audits an OCR result in the background while the user is still reviewing it.
+
+    The result is stored under the receipt's content hash. ``take`` returns it
+    only if the receipt sent to ``/audit/check`` is unchanged; an edited
+    receipt discards it and is audited normally.
+    """
+
+    def __init__(
+        self,
+        audit_service: AuditService,
+        db: DBService | None = None,
+        wait_seconds: float = SPECULATIVE_WAIT_SECONDS,
+        ttl_seconds: float = SPECULATIVE_TTL_SECONDS,
+    ):
+        self.audit_service = audit_service
+        self.db = db or DBService()
+        self.wait_seconds = wait_seconds
+        self.ttl_seconds = ttl_seconds
+        self._inflight: dict[str, tuple[str, threading.Event]] = {}
+        self._lock = threading.Lock()
+
+    def content_hash(self, receipt_data: dict) -> str:
+        basis = {key: receipt_data.get(key) for key in RECEIPT_FIELDS}
+        # A new policy snapshot invalidates audits computed against the previous one.
+        basis["policy_version"] = self.audit_service.policy_version(receipt_data.get("tenant_id"))
+        basis["items"] = [{key: item.get(key) for key in ITEM_FIELDS} for item in receipt_data.get("items", [])]
+        return hashlib.sha256(json.dumps(basis, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def schedule(self, receipt_data: dict) -> None:
+        """Mark the receipt as in flight; call before handing ``run`` to a background task."""
+        with self._lock:
+            self._inflight[receipt_data["receipt_id"]] = (self.content_hash(receipt_data), threading.Event())
+
+    def run(self, receipt_data: dict) -> None:
+        receipt_id = receipt_data["receipt_id"]
+        content_hash = self.content_hash(receipt_data)
+        with self._lock:
+            entry = self._inflight.setdefault(receipt_id, (content_hash, threading.Event()))
+
+        try:
+            result = self.audit_service.check(receipt_data)
+            # Speculative spend is booked even if the result is never used.
+            self.db.record_audit_metrics(receipt_id, {**(result.get("usage") or {}), "decision_path": "speculative"})
+            # Rule-tier answers are cheap to recompute and may hide a transient outage.
+            if result.get("decision_path") == "llm":
+                self.db.save_speculative_audit(receipt_id, content_hash, result)
+        except Exception as exc:
+            logger.debug("speculative audit failed receipt_id=%s", receipt_id, exc_info=exc)
+        finally:
+            entry[1].set()
+            with self._lock:
+                if self._inflight.get(receipt_id) is entry:
+                    del self._inflight[receipt_id]
+
+    def _expired(self, created_at: str) -> bool:
+        created = datetime.fromisoformat(created_at.rstrip("Z"))
+        return (datetime.utcnow() - created).total_seconds() > self.ttl_seconds
+
+    def take(self, receipt_data: dict) -> dict | None:
+        """Return the stored audit for an unchanged receipt, or ``None`` to audit normally."""
+        started = time.perf_counter()
+        receipt_id = receipt_data["receipt_id"]
+        content_hash = self.content_hash(receipt_data)
+
+        with self._lock:
+            entry = self._inflight.get(receipt_id)
+        if entry is not None and entry[0] == content_hash:
+            entry[1].wait(self.wait_seconds)
+
+        stored = self.db.get_speculative_audit(receipt_id)
+        if stored is None:
+            return None
+        if stored["content_hash"] != content_hash or self._expired(stored["created_at"]):
+            self.db.delete_speculative_audit(receipt_id)
+            return None
+
+        result = stored["payload"]
+        result["decision_path"] = "cache"
+        speculative_usage = result.get("usage") or {}
+        result["usage"] = {
+            "decision_path": "cache",
+            "model": result.get("model"),
+            "tier": result.get("tier"),
+            "total_ms": round((time.perf_counter() - started) * 1000, 1),
+            # The cached verdict still depends on the chunks the speculative audit retrieved.
+            "tenant_id": speculative_usage.get("tenant_id"),
+            "policy_version": speculative_usage.get("policy_version"),
+            "chunks": speculative_usage.get("chunks"),
+        }
+        return result
@@ -0,0 +1,3 @@
+from .upstage import app
+
+__all__ = ["app"]
@@ -0,0 +1,236 @@
+"""Local stand-in for the Upstage chat and embedding APIs.
+
+Point the real ``ChatUpstage`` / ``UpstageEmbeddings`` clients at this server
+to exercise the full audit pipeline without spending Upstage quota::
+
+    uvicorn server.stubs.upstage:app --port 8100
+    UPSTAGE_API_BASE=http://localhost:8100/v1/solar UPSTAGE_API_KEY=stub \\
+        uvicorn server.routes.app:app
+
+Latency, error rate and embedding size are configured with ``STUB_*``
+environment variables. Responses are deterministic for a given input.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import time
+from uuid import uuid4
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Latency is log-normal: the median is STUB_*_LATENCY_MS and STUB_LATENCY_SIGMA
+# controls the tail (0 = constant latency, 0.5 ~ p99 at 3.2x the median).
+CHAT_LATENCY_MS = float(os.getenv("STUB_CHAT_LATENCY_MS", "800"))
+EMBED_LATENCY_MS = float(os.getenv("STUB_EMBED_LATENCY_MS", "80"))
+LATENCY_SIGMA = float(os.getenv("STUB_LATENCY_SIGMA", "0.5"))
+STREAM_CHUNK_CHARS = int(os.getenv("STUB_STREAM_CHUNK_CHARS", "16"))
+ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+ERROR_STATUS = int(os.getenv("STUB_ERROR_STATUS", "503"))
+EMBED_DIM = int(os.getenv("STUB_EMBED_DIM", "4096"))
+SEED = os.getenv("STUB_SEED")
+
+BANNED_KEYWORDS = ["참이슬", "소주", "맥주", "와인", "카스", "담배", "주류", "soju", "beer", "wine"]
+
+_rng = random.Random(int(SEED) if SEED is not None else None)
+
+app = FastAPI(title="Upstage API stub", version="0.1.0")
+
+
+def _latency(median_ms: float) -> float:
+    if median_ms <= 0:
+        return 0.0
+    return median_ms / 1000 * math.exp(_rng.gauss(0.0, LATENCY_SIGMA))
+
+
+def _should_fail() -> bool:
+    return ERROR_RATE > 0 and _rng.random() < ERROR_RATE
+
+
+def _error_response() -> JSONResponse:
+    return JSONResponse(
+        status_code=ERROR_STATUS,
+        content={"error": {"message": "stub injected failure", "type": "server_error"}},
+    )
+
+
+def _count_tokens(text: str) -> int:
+    return sum(1 for ch in text if ord(ch) > 127) + math.ceil(sum(1 for ch in text if ord(ch) <= 127) / 4)
+
+
+def _extract(messages: list[dict], pattern: str):
+    for message in reversed(messages):
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        match = re.search(pattern, content, re.S)
+        if match:
+            try:
+                return json.loads(match.group(1))
+            except ValueError:
+                continue
+    return None
+
+
+def _answer(messages: list[dict], model: str) -> dict:
+    # Batch prompts (analyze_many) send "영수증 목록: [{index, receipt}, ...]".
+    batch = _extract(messages, r"영수증 목록:\s*(\[.*\])\s*$")
+    if isinstance(batch, list):
+        results = []
+        for entry in batch:
+            result = audit_answer(entry.get("receipt", {}), model)
+            results.append({"index": entry.get("index"), **result})
+        return {"results": results}
+    return audit_answer(_extract(messages, r"영수증:\s*(\{.*\})\s*$") or {}, model)
+
+
+def _confidence(receipt: dict, model: str) -> float:
+    # Larger models are always sure; smaller ones get a stable per-receipt
+    # confidence in [0.55, 0.95) so the cascade escalates a fixed share.
+    if "pro" in model:
+        return 0.95
+    digest = hashlib.md5(json.dumps(receipt, sort_keys=True, ensure_ascii=False).encode("utf-8")).digest()
+    return round(0.55 + digest[0] % 40 / 100, 2)
+
+
+def audit_answer(receipt: dict, model: str = "solar-1-mini-chat") -> dict:
+    """Deterministic audit verdict for ``receipt`` (keyword and time rules)."""
+    confidence = _confidence(receipt, model)
+    violations = []
+    for item in receipt.get("items", []):
+        name = str(item.get("name", ""))
+        if any(k in name.lower() for k in BANNED_KEYWORDS):
+            violations.append(
+                {
+                    "item_id": item.get("id", 0),
+                    "reason": f"주류/담배 구매 금지 위반: {name}",
+                    "policy_reference": "제3조 (금지 품목)",
+                }
+            )
+
+    match = re.search(r"(\d{1,2}):\d{2}", str(receipt.get("date", "")))
+    if match and not 8 <= int(match.group(1)) < 22:
+        violations.append(
+            {"item_id": 0, "reason": "허용 시간 외 결제", "policy_reference": "제4조 (허용 시간)"}
+        )
+
+    if violations:
+        return {
+            "audit_decision": "Anomaly Detected",
+            "violation_score": min(1.0, 0.7 + 0.1 * len(violations)),
+            "violations": violations,
+            "reasoning": f"규정 위반 의심 항목 {len(violations)}건이 확인되었습니다.",
+            "confidence": confidence,
+        }
+    return {
+        "audit_decision": "Pass",
+        "violation_score": 0.05,
+        "violations": [],
+        "reasoning": "규정 위반 항목이 확인되지 않았습니다.",
+        "confidence": confidence,
+    }
+
+
+def embed_text(text: str, dim: int = EMBED_DIM) -> list[float]:
+    """Deterministic unit vector built from hashed character bigrams of ``text``."""
+    vector = [0.0] * dim
+    padded = f" {text.strip()} "
+    for i in range(len(padded) - 1):
+        digest = hashlib.md5(padded[i:i + 2].encode("utf-8")).digest()
+        idx = int.from_bytes(digest[:4], "little") % dim
+        vector[idx] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def _chunk_payload(completion_id: str, model: str, created: int, delta: dict, finish_reason: str | None) -> str:
+    chunk = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+
+
+@app.get("/health")
+def health() -> dict:
+    return {"status": "ok", "chat_latency_ms": CHAT_LATENCY_MS, "error_rate": ERROR_RATE}
+
+
+@app.post("/v1/chat/completions")
+@app.post("/v1/solar/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if _should_fail():
+        await asyncio.sleep(_latency(CHAT_LATENCY_MS) / 2)
+        return _error_response()
+
+    model = body.get("model", "solar-1-mini-chat")
+    messages = body.get("messages", [])
+    content = json.dumps(_answer(messages, model), ensure_ascii=False)
+    prompt_tokens = sum(_count_tokens(str(m.get("content", ""))) for m in messages)
+    completion_tokens = _count_tokens(content)
+    completion_id = f"chatcmpl-stub-{uuid4().hex[:12]}"
+    created = int(time.time())
+    total_latency = _latency(CHAT_LATENCY_MS)
+
+    if not body.get("stream"):
+        await asyncio.sleep(total_latency)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+
+    async def events():
+        # Spend ~30% of the latency before the first token, the rest spread over the chunks.
+        await asyncio.sleep(total_latency * 0.3)
+        per_chunk = total_latency * 0.7 / max(1, len(pieces))
+        yield _chunk_payload(completion_id, model, created, {"role": "assistant", "content": ""}, None)
+        for piece in pieces:
+            await asyncio.sleep(per_chunk)
+            yield _chunk_payload(completion_id, model, created, {"content": piece}, None)
+        yield _chunk_payload(completion_id, model, created, {}, "stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/v1/embeddings")
+@app.post("/v1/solar/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    await asyncio.sleep(_latency(EMBED_LATENCY_MS))
+    if _should_fail():
+        return _error_response()
+
+    texts = body.get("input", [])
+    if isinstance(texts, str):
+        texts = [texts]
+    tokens = sum(_count_tokens(t) for t in texts)
+    return {
+        "object": "list",
+        "model": body.get("model", "solar-embedding-1-large"),
+        "data": [{"object": "embedding", "index": i, "embedding": embed_text(t)} for i, t in enumerate(texts)],
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    }
@@ -0,0 +1,27 @@
+from core.rag_engine.article_splitter import ArticleTextSplitter
+
+ARTICLES = "제1장 총칙\n제1조(목적) 이 규정은 업무추진비 집행 기준을 정한다.\n제2조(식비) 식비는 1인 1만원까지 집행한다.\n"
+
+
+def test_short_preamble_is_kept_on_the_first_article():
+    text = "학생회 예산 집행 규정\n시행 2026. 3. 1.\n" + ARTICLES
+    chunks = ArticleTextSplitter().split_text_with_metadata(text)
+
+    assert [metadata["article_id"] for _, metadata in chunks] == ["제1조", "제2조"]
+    first, metadata = chunks[0]
+    assert first.startswith("학생회 예산 집행 규정\n시행 2026. 3. 1.\n제1조(목적)")
+    assert "제1장 총칙" not in first and metadata["chapter"] == "제1장 총칙"
+    assert metadata["start_index"] == 0
+
+
+def test_long_preamble_is_its_own_chunk():
+    preamble = "이 규정집은 " + "학생회 예산 집행의 원칙을 설명한다. " * 6 + "\n"
+    chunks = ArticleTextSplitter().split_text_with_metadata(preamble + ARTICLES)
+
+    assert "article_id" not in chunks[0][1]
+    assert chunks[1][0].startswith("제1조(목적)")
+
+
+def test_chapter_header_alone_is_not_a_preamble():
+    chunks = ArticleTextSplitter().split_text_with_metadata(ARTICLES)
+    assert chunks[0][0].startswith("제1조(목적)")
@@ -0,0 +1,145 @@
+import json
+
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.runnables import RunnableLambda
+
+from core.audit_agent.cascade import AuditCascade
+from core.audit_agent.reasoning import AuditReasoning
+from server.routes.audit import AuditCheckResponse
+from server.services.audit_service import AuditService
+
+
+def fake_agent(input_tokens=1000, output_tokens=100):
+    """Answers every receipt in a packed prompt with a confident Pass."""
+    agent = AuditReasoning.__new__(AuditReasoning)
+    agent.model = "small"
+    agent.parser = JsonOutputParser()
+
+    def llm(prompt):
+        text = prompt.to_string()
+        receipts = json.loads(text.split("영수증 목록: ", 1)[1])
+        results = [{"index": r["index"], "audit_decision": "Pass", "violation_score": 0.1, "confidence": 0.9} for r in receipts]
+        usage = {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+        return AIMessage(content=json.dumps({"results": results}), usage_metadata=usage)
+
+    agent.llm = RunnableLambda(llm)
+    return agent
+
+
+class BulkService(AuditService):
+    def __init__(self, cascade):
+        super().__init__()
+        self._cascade = cascade
+
+    def _retrieve_rules(self, receipt_data, usage=None):
+        usage["chunks"] = [{"chunk_id": "c1"}]
+        return "제1조 식비는 1인 1만원까지."
+
+
+def receipt(receipt_id, items):
+    return {"receipt_id": receipt_id, "store_name": "cafe", "items": [{"id": i, "name": f"item {i}"} for i in range(items)]}
+
+
+def test_packed_usage_is_split_by_prompt_size_and_recorded():
+    cascade = AuditCascade([{"model": "small", "min_confidence": 0.5, "cost_per_1k_input": 1.0, "cost_per_1k_output": 2.0}])
+    cascade._agents["small"] = fake_agent()
+    service = BulkService(cascade)
+
+    results = service.check_many([receipt("r1", 1), receipt("r2", 6)], batch_size=2)
+
+    usages = [r["usage"] for r in results]
+    assert sum(u["input_tokens"] for u in usages) == 1000
+    assert sum(u["output_tokens"] for u in usages) == 100
+    # The bigger receipt took more of the prompt, so it is charged more.
+    assert usages[1]["input_tokens"] > usages[0]["input_tokens"] > 0
+    assert usages[1]["cost"] > usages[0]["cost"] > 0
+    assert all(r["decision_path"] == "llm" and r["cascade"][0]["tier"] == 0 for r in results)
+
+    metrics = cascade.metrics()[0]
+    assert metrics["calls"] == 2
+    assert (metrics["input_tokens"], metrics["output_tokens"]) == (1000, 100)
+
+
+def test_response_usage_exposes_only_cost_and_latency():
+    result = {
+        "audit_decision": "Pass",
+        "violation_score": 0.1,
+        "violations": [],
+        "reasoning": "ok",
+        "usage": {
+            "retrieval_ms": 3.0,
+            "llm_ms": 10.0,
+            "total_ms": 14.0,
+            "input_tokens": 10,
+            "output_tokens": 2,
+            "cost": 0.01,
+            "chunks": [{"chunk_id": "c1"}],
+            "tenant_id": "acme",
+            "policy_version": "v1",
+            "articles": ["제1조"],
+        },
+    }
+    usage = AuditCheckResponse(**result).model_dump()["usage"]
+    assert set(usage) == {"retrieval_ms", "llm_ms", "total_ms", "embedding_tokens", "input_tokens", "output_tokens", "cost"}
+    assert usage["cost"] == 0.01
+
+
+class TransportError(Exception):
+    pass
+
+
+def failing_agent(fail_when):
+    """Like fake_agent, but raises for any packed prompt that contains a receipt matching ``fail_when``."""
+    agent = fake_agent()
+    answer = agent.llm.func
+
+    def llm(prompt):
+        receipts = json.loads(prompt.to_string().split("영수증 목록: ", 1)[1])
+        if any(fail_when(r["receipt"]) for r in receipts):
+            raise TransportError("upstream down")
+        return answer(prompt)
+
+    agent.llm = RunnableLambda(llm)
+    return agent
+
+
+def bulk_service(agent):
+    cascade = AuditCascade([{"model": "small", "min_confidence": 0.5}])
+    cascade._agents["small"] = agent
+    return BulkService(cascade)
+
+
+def test_failed_pack_only_drops_its_own_receipts():
+    service = bulk_service(failing_agent(lambda r: r["receipt_id"] == "r3"))
+    results = service.check_many([receipt(f"r{i}", 1) for i in range(6)], batch_size=2)
+
+    assert [r["decision_path"] for r in results] == ["llm", "llm", "rule", "rule", "llm", "llm"]
+    assert results[2]["fallback_reason"] == "error"
+    assert service._breaker.state == "closed"
+
+
+def test_pack_failures_open_the_breaker():
+    service = bulk_service(failing_agent(lambda r: True))
+    service._breaker.failure_threshold = 2
+    results = service.check_many([receipt(f"r{i}", 1) for i in range(8)], batch_size=2)
+
+    assert [r["fallback_reason"] for r in results] == ["error"] * 4 + ["circuit_open"] * 4
+    assert service._breaker.state == "open"
+
+    # While open, the next bulk call skips retrieval and the LLM altogether.
+    skipped = service.check_many([receipt("r9", 1)])
+    assert skipped[0]["fallback_reason"] == "circuit_open" and "chunks" not in skipped[0]["usage"]
+
+
+def test_pack_that_misses_the_deadline_falls_back():
+    import time
+
+    agent = fake_agent()
+    answer = agent.llm.func
+    agent.llm = RunnableLambda(lambda prompt: time.sleep(0.3) or answer(prompt))
+    service = bulk_service(agent)
+    service._packed_llm_stage.deadline = 0.05
+
+    results = service.check_many([receipt("r1", 1), receipt("r2", 1)], batch_size=2)
+    assert [r["fallback_reason"] for r in results] == ["llm_deadline", "llm_deadline"]
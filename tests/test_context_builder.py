@@ -0,0 +1,88 @@
+from langchain_core.documents import Document
+
+from core.rag_engine.context_builder import RuleContextBuilder, estimate_tokens
+
+
+def doc(text, source="rules.pdf", start=None, article_id=None):
+    metadata = {"source": source}
+    if start is not None:
+        metadata["start_index"] = start
+    if article_id is not None:
+        metadata["article_id"] = article_id
+    return Document(page_content=text, metadata=metadata)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("식비") == 2
+    assert estimate_tokens("abcd efgh") == 2
+
+
+def test_overlapping_chunks_are_merged_once():
+    builder = RuleContextBuilder(min_overlap=5)
+    left = "제3조 금지 품목: 주류와 담배는 구매할 수 없다."
+    right = "담배는 구매할 수 없다. 위반 시 환수한다."
+    text, tokens = builder.build([doc(left, start=0), doc(right, start=17)])
+    assert text == "제3조 금지 품목: 주류와 담배는 구매할 수 없다. 위반 시 환수한다."
+    assert tokens == estimate_tokens(text)
+
+
+def test_prepended_overlap_moves_segment_start():
+    builder = RuleContextBuilder(min_overlap=5)
+    later = doc("담배는 구매할 수 없다. 위반 시 환수한다.", start=17, article_id="제3조")
+    earlier = doc("제3조 금지 품목: 주류와 담배는 구매할 수 없다.", start=0, article_id="제3조")
+    between = doc("제3조 부칙", start=5, article_id="제3조")
+
+    segments = builder._merge([later, earlier])
+    assert segments[0]["start"] == 0
+
+    # A later chunk of the same article without overlap goes after the merged text, not before it.
+    segments = builder._merge([later, earlier, between])
+    assert segments[0]["text"].endswith("\n제3조 부칙")
+
+
+def test_same_article_chunks_are_joined_in_document_order():
+    builder = RuleContextBuilder()
+    second = doc("2. 영수증을 첨부한다.", start=50, article_id="제7조")
+    first = doc("1. 식비는 1인 1만원까지.", start=10, article_id="제7조")
+    text, _ = builder.build([second, first])
+    assert text == "1. 식비는 1인 1만원까지.\n2. 영수증을 첨부한다."
+
+
+def test_budget_cuts_by_line():
+    builder = RuleContextBuilder(max_tokens=10)
+    text, tokens = builder.build([doc("가나다라마\n바사아자차\n카타파하")])
+    assert text == "가나다라마\n바사아자차"
+    assert tokens == 10
+
+
+def test_oversized_first_line_is_hard_cut():
+    builder = RuleContextBuilder(max_tokens=5)
+    text, tokens = builder.build([doc("가나다라마바사아자차")])
+    assert text == "가나다라마"
+    assert tokens == 5
+
+
+def test_segment_that_does_not_fit_does_not_stop_the_rest():
+    builder = RuleContextBuilder(max_tokens=12)
+    text, tokens = builder.build([
+        doc("가나다라마바사아자차", source="a.pdf"),
+        doc("타파하거너", source="b.pdf"),
+        doc("짧은 규정", source="c.pdf"),
+    ])
+    # The second segment is cut to the two tokens left; nothing is dropped just because it follows a cut.
+    assert text == "가나다라마바사아자차\n\n타파"
+    assert tokens == 12
+
+    builder = RuleContextBuilder(max_tokens=3)
+    text, tokens = builder.build([doc("abcdefghijklmnopqrstuvwxyz", source="a.pdf"), doc("식비", source="b.pdf")])
+    assert text == "abcdefghijkl"
+    assert tokens == 3
+
+
+def test_nothing_exceeds_budget():
+    builder = RuleContextBuilder(max_tokens=40)
+    docs = [doc(f"제{i}조 " + "규정 내용 " * 20, source=f"{i}.pdf") for i in range(5)]
+    text, tokens = builder.build(docs)
+    assert 0 < tokens <= 40
+    assert estimate_tokens(text) == tokens
@@ -0,0 +1,113 @@
+import pytest
+
+from server.services.cross_receipt_service import DUPLICATE_REFERENCE, SPLIT_REFERENCE, CrossReceiptService
+from server.services.db_service import DBService
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DBService(tmp_path / "audit.db")
+    db.init_db()
+    return db
+
+
+def receipt(receipt_id, date, total, store="Cafe A", item="coffee"):
+    return {
+        "receipt_id": receipt_id,
+        "store_name": store,
+        "date": date,
+        "items": [{"id": 1, "name": item, "unit_price": total, "count": 1, "price": total}],
+        "total_price": total,
+    }
+
+
+def passed():
+    return {"audit_decision": "Pass", "violation_score": 0.1, "violations": [], "reasoning": "ok"}
+
+
+def references(result):
+    return [v["policy_reference"] for v in result["violations"]]
+
+
+def test_split_purchase_within_window_is_flagged(db):
+    service = CrossReceiptService(db, cap=100000, window_minutes=60)
+    assert service.apply(receipt("r1", "2026-01-05 12:00", 60000), passed())["audit_decision"] == "Pass"
+
+    result = service.apply(receipt("r2", "2026-01-05 12:40", 50000, item="cake"), passed())
+    assert result["audit_decision"] == "Anomaly Detected"
+    assert result["violation_score"] >= 0.8
+    assert references(result) == [f"{SPLIT_REFERENCE} (건당 한도 100,000원)"]
+    split = result["cross_receipt"]["split_purchase"]
+    assert split["receipt_ids"] == ["r1", "r2"] and split["total"] == 110000
+
+
+def test_split_ignores_other_stores_outside_window_and_over_cap(db):
+    service = CrossReceiptService(db, cap=100000, window_minutes=60)
+    service.apply(receipt("r1", "2026-01-05 10:00", 60000), passed())
+    service.apply(receipt("r2", "2026-01-05 12:30", 60000, store="Cafe B"), passed())
+    # Over the cap on its own: an ordinary (non-split) purchase that the LLM audit judges.
+    service.apply(receipt("r3", "2026-01-05 12:10", 150000, item="catering"), passed())
+
+    result = service.apply(receipt("r4", "2026-01-05 12:30", 50000, item="cake"), passed())
+    assert result["cross_receipt"]["split_purchase"] is None
+    assert result["audit_decision"] == "Pass"
+
+
+def test_store_name_is_normalized(db):
+    service = CrossReceiptService(db, cap=100000, window_minutes=60)
+    service.apply(receipt("r1", "2026.01.05 12:00", 60000, store="Cafe  A"), passed())
+    result = service.apply(receipt("r2", "2026/01/05 12:30", 60000, store="cafe a", item="cake"), passed())
+    assert result["cross_receipt"]["split_purchase"]["receipt_ids"] == ["r1", "r2"]
+
+
+def test_duplicate_receipt_is_flagged_and_not_counted_as_split(db):
+    service = CrossReceiptService(db, cap=100000, window_minutes=60)
+    service.apply(receipt("r1", "2026-01-05 12:00", 60000), passed())
+
+    result = service.apply(receipt("r2", "2026-01-05 12:00", 60000), passed())
+    assert result["cross_receipt"]["duplicates"] == ["r1"]
+    assert result["cross_receipt"]["split_purchase"] is None
+    assert references(result) == [DUPLICATE_REFERENCE]
+
+
+def test_split_check_can_be_disabled(db):
+    service = CrossReceiptService(db, cap=0)
+    service.apply(receipt("r1", "2026-01-05 12:00", 60000), passed())
+    result = service.apply(receipt("r2", "2026-01-05 12:10", 60000, item="cake"), passed())
+    assert result["cross_receipt"]["split_purchase"] is None
+
+
+def test_strip_removes_merged_findings(db):
+    service = CrossReceiptService(db, cap=100000, window_minutes=60)
+    service.apply(receipt("r1", "2026-01-05 12:00", 60000), passed())
+    result = service.apply(receipt("r2", "2026-01-05 12:00", 60000), passed())
+    stripped = service.strip(result)
+    assert stripped["violations"] == [] and "cross_receipt" not in stripped
+
+
+def test_unchanged_receipt_is_not_rewritten(db):
+    service = CrossReceiptService(db)
+    assert db.index_receipt("r1", receipt("r1", "2026-01-05 12:00", 60000))
+    assert not db.index_receipt("r1", receipt("r1", "2026-01-05 12:00", 60000))
+    assert db.index_receipt("r1", receipt("r1", "2026-01-05 12:00", 70000))
+
+    with db._conn() as conn:
+        before = conn.execute("SELECT updated_at FROM receipts WHERE receipt_id = 'r1'").fetchone()[0]
+        conn.execute("UPDATE receipts SET updated_at = 'sentinel' WHERE receipt_id = 'r1'")
+    service.apply(receipt("r1", "2026-01-05 12:00", 70000), passed())
+    with db._conn() as conn:
+        assert conn.execute("SELECT updated_at FROM receipts WHERE receipt_id = 'r1'").fetchone()[0] == "sentinel"
+    assert before != "sentinel"
+
+
+def test_window_query_uses_total_index(db):
+    with db._conn() as conn:
+        plan = " ".join(
+            row[-1]
+            for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT receipt_id FROM receipts "
+                "WHERE store_key = ? AND receipt_ts BETWEEN ? AND ? AND total_price <= ?",
+                ("cafea", "2026-01-05 11:00:00", "2026-01-05 13:00:00", 100000),
+            )
+        )
+    assert "idx_receipts_store_ts_total" in plan
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from server import batch_audit
+from server.services.db_service import DBService, ts_bound
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DBService(tmp_path / "audit.db")
+    db.init_db()
+    return db
+
+
+def add(db, receipt_id, date, decision=None):
+    db.upsert_receipt(receipt_id, {"receipt_id": receipt_id, "store_name": "cafe", "date": date, "items": [], "total_price": 1000})
+    if decision:
+        db.upsert_audit(receipt_id, {"audit_decision": decision})
+
+
+def test_ts_bound():
+    assert ts_bound("2026.01.31") == "2026-01-31 00:00:00"
+    assert ts_bound("2026/01/31", upper=True) == "2026-01-31 23:59:59"
+    assert ts_bound("2026-01-31 18:30", upper=True) == "2026-01-31 18:30:59"
+    with pytest.raises(ValueError):
+        ts_bound("last week")
+
+
+def test_find_receipts_filters_on_normalized_date(db):
+    add(db, "r1", "2026.01.05 09:00")
+    add(db, "r2", "2026/01/31 21:15", "Pass")
+    add(db, "r3", "2026-02-01", "Anomaly Detected")
+    add(db, "r4", "unreadable")
+
+    # A date-only upper bound includes the evening of that day; mixed separators compare correctly.
+    assert db.find_receipts("2026-01-01", "2026-01-31") == ["r1", "r2"]
+    assert db.find_receipts("2026/01/31") == ["r2", "r3"]
+    assert db.find_receipts(until="2026-01-31 21:00") == ["r1"]
+    assert db.find_receipts() == ["r1", "r2", "r3", "r4"]
+
+
+def test_find_receipts_combines_date_and_status(db):
+    add(db, "r1", "2026-01-05")
+    add(db, "r2", "2026-01-06", "Pass")
+    add(db, "r3", "2026-01-07", "Anomaly Detected")
+
+    assert db.find_receipts(since="2026-01-06", status="audited") == ["r2", "r3"]
+    assert db.find_receipts(until="2026-01-06", status="unaudited") == ["r1"]
+    assert db.find_receipts(status="Anomaly Detected") == ["r3"]
+
+
+class FlakyAudit:
+    """Audits r1 with the LLM and falls r2 back to the rule tier until ``healthy`` is set."""
+
+    def __init__(self):
+        self.healthy = False
+
+    def check(self, payload):
+        if payload["receipt_id"] == "r1" or self.healthy:
+            return {"audit_decision": "Pass", "decision_path": "llm", "fallback_reason": None}
+        return {"audit_decision": "Anomaly Detected", "decision_path": "rule", "fallback_reason": "circuit_open"}
+
+
+def stored_audit(db, receipt_id):
+    with db._conn() as conn:
+        row = conn.execute("SELECT payload_json FROM audits WHERE receipt_id = ?", (receipt_id,)).fetchone()
+    return row and json.loads(row["payload_json"])
+
+
+def test_batch_run_leaves_fallbacks_pending(db):
+    add(db, "r1", "2026-01-05")
+    add(db, "r2", "2026-01-06")
+    add(db, "r3", "2026-01-07", "Pass")
+    db.create_batch_run("run", {}, ["r1", "r2", "r3"])
+    audit = FlakyAudit()
+
+    summary = batch_audit.run(db, audit, "run", workers=1)
+    assert summary["retry"] == 2
+    assert db.get_batch_run("run")["done"] == 1
+    assert [receipt_id for receipt_id, _ in db.pending_batch_items("run")] == ["r2", "r3"]
+    # A fallback is kept for a receipt that had no audit but never replaces an earlier one.
+    assert stored_audit(db, "r2")["decision_path"] == "rule"
+    assert stored_audit(db, "r3") == {"audit_decision": "Pass"}
+
+    audit.healthy = True
+    summary = batch_audit.run(db, audit, "run", workers=1)
+    assert summary["retry"] == 0
+    assert db.pending_batch_items("run") == []
+    assert stored_audit(db, "r2")["decision_path"] == "llm"
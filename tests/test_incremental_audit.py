@@ -0,0 +1,64 @@
+from server.services.audit_service import AuditService
+
+
+class RecordingService(AuditService):
+    """Records which items each full ``check`` was asked to judge and passes them."""
+
+    def __init__(self):
+        super().__init__()
+        self.checked = []
+
+    def check(self, receipt_data):
+        self.checked.append([item["id"] for item in receipt_data["items"]])
+        return {
+            "audit_decision": "Pass",
+            "violation_score": 0.0,
+            "violations": [],
+            "reasoning": "ok",
+            "decision_path": "llm",
+            "fallback_reason": None,
+            "usage": self._new_usage(),
+        }
+
+
+def receipt(store="cafe", prices=(1000, 2000)):
+    items = [{"id": i, "name": f"item {i}", "unit_price": p, "count": 1, "price": p} for i, p in enumerate(prices, 1)]
+    return {"receipt_id": "r1", "store_name": store, "date": "2026-01-05", "items": items, "total_price": sum(prices)}
+
+
+PREVIOUS = {
+    "audit_decision": "Anomaly Detected",
+    "violation_score": 0.9,
+    "violations": [{"item_id": 1, "reason": "주류", "policy_reference": "제3조"}],
+    "reasoning": "item 1 위반",
+    "decision_path": "llm",
+}
+
+
+def test_without_a_stored_audit_the_receipt_is_fully_audited():
+    service = RecordingService()
+    result = service.check_incremental(receipt(), None, None, [])
+    assert service.checked == [[1, 2]]
+    assert result["decision_path"] == "llm"
+
+
+def test_edits_are_found_from_the_stored_receipt_not_the_client():
+    service = RecordingService()
+    # The client claims nothing changed, but item 1 (the violation) was edited since the stored audit.
+    result = service.check_incremental(receipt(prices=(500, 2000)), PREVIOUS, receipt(), [])
+    assert service.checked == [[1]]
+    assert result["audit_decision"] == "Pass" and result["violations"] == []
+
+
+def test_unchanged_receipt_keeps_the_stored_verdicts():
+    service = RecordingService()
+    result = service.check_incremental(receipt(), PREVIOUS, receipt(), [])
+    assert service.checked == []
+    assert result["audit_decision"] == "Anomaly Detected"
+    assert result["violations"] == PREVIOUS["violations"]
+
+
+def test_receipt_level_change_needs_a_full_audit():
+    service = RecordingService()
+    service.check_incremental(receipt(store="bar"), PREVIOUS, receipt(), [2])
+    assert service.checked == [[1, 2]]
@@ -0,0 +1,15 @@
+import os
+
+from core.rag_engine.ingest import _stale_sources
+
+
+def test_stale_sources_ignore_sibling_directories():
+    sources = [
+        os.path.normpath("data/raw/a.pdf"),
+        os.path.normpath("data/raw/sub/b.pdf"),
+        os.path.normpath("data/raw2/c.pdf"),
+        os.path.normpath("data/raw_old.pdf"),
+        os.path.abspath("data/raw/d.pdf"),
+    ]
+    current = {os.path.normpath("data/raw/a.pdf")}
+    assert _stale_sources(sources, "data/raw/", current) == [sources[1], sources[4]]
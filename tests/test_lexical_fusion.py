@@ -0,0 +1,96 @@
+from langchain_core.documents import Document
+
+from core.rag_engine.lexical_index import LexicalIndex, tokenize
+from core.rag_engine.local_embeddings import HashingEmbeddings
+from core.rag_engine.retriever import ItemRuleRetriever
+from core.rag_engine.vector_db import VectorDBManager
+
+RULES = [
+    "제3조 주류와 담배는 업무추진비로 구매할 수 없다.",
+    "제4조 식비는 1인 1만원까지 집행한다.",
+    "제5조 사무용품은 A4 용지와 필기구를 포함한다.",
+]
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self, dim=128):
+        super().__init__(dim)
+        self.queries = []
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return super().embed_query(text)
+
+
+def doc(text):
+    return Document(page_content=text, metadata={"source": "rules"})
+
+
+def build_store(tmp_path, embedding):
+    manager = VectorDBManager(str(tmp_path), watch=False)
+    manager.create_db([Document(page_content=t, metadata={"source": "rules"}, id=f"c{i}") for i, t in enumerate(RULES)], embedding)
+    manager.export_lexical_index(embedding)
+    return manager
+
+
+def test_tokenize_uses_character_ngrams():
+    assert tokenize("주류를") == ["주류", "류를", "주류를"]
+    # Words shorter than the smallest n-gram are kept whole.
+    assert tokenize("술 A4") == ["술", "a4"]
+
+
+def test_bm25_ranks_literal_match_first_with_coverage(tmp_path):
+    index = LexicalIndex(tmp_path)
+    index.build([f"c{i}" for i in range(len(RULES))], RULES, [{"source": "rules"}] * len(RULES))
+
+    hits, coverage = index.search("담배", k=3)
+    assert hits[0][0].id == "c0" and len(hits) == 1
+    assert coverage == 1.0
+
+    # Words the rules never mention pull coverage down.
+    _, partial = index.search("담배 라이터", k=3)
+    assert 0 < partial < 1
+    assert index.search("zzz", k=3) == ([], 0.0)
+
+
+def test_rrf_rewards_documents_found_by_both_lists():
+    retriever = ItemRuleRetriever(db_manager=None, embedding_model=None, mode="hybrid", rrf_k=60)
+    a, b, c = doc("a"), doc("b"), doc("c")
+    fused = retriever._fuse([[(a, 12.0), (b, 3.0)], [(b, 0.9), (c, 0.8)]])
+
+    assert [d.page_content for d, _ in fused] == ["b", "a", "c"]
+    scores = dict((d.page_content, s) for d, s in fused)
+    assert scores["b"] == (1 / 62 + 1 / 61) / 2
+    assert scores["a"] == 1 / 61 / 2
+
+
+def test_rrf_scores_are_comparable_across_item_list_counts():
+    retriever = ItemRuleRetriever(db_manager=None, embedding_model=None, mode="hybrid", rrf_k=60)
+    top = doc("top")
+    # An item answered by BM25 alone scores its top hit like a hybrid item found on top of both lists.
+    single = retriever._fuse([[(top, 1.0)]])[0][1]
+    both = retriever._fuse([[(top, 1.0)], [(top, 0.5)]])[0][1]
+    assert single == both == 1 / 61
+
+
+def test_lexical_mode_skips_embedding_when_bm25_covers_the_item(tmp_path):
+    embedding = CountingEmbeddings()
+    manager = build_store(tmp_path, embedding)
+    retriever = ItemRuleRetriever(manager, embedding, cache_size=0, mode="lexical", min_coverage=0.6)
+
+    docs = retriever.retrieve({"items": [{"name": "담배"}, {"name": "노트북 거치대"}]}, k=2)
+
+    assert docs[0].page_content == RULES[0]
+    assert retriever.lexical_only == 1
+    assert embedding.queries == ["노트북 거치대"]
+
+
+def test_hybrid_mode_fuses_vector_and_bm25_hits(tmp_path):
+    embedding = CountingEmbeddings()
+    manager = build_store(tmp_path, embedding)
+    retriever = ItemRuleRetriever(manager, embedding, cache_size=0, mode="hybrid")
+
+    docs = retriever.retrieve({"items": [{"name": "A4 용지"}]}, k=1)
+
+    assert [d.page_content for d in docs] == [RULES[2]]
+    assert embedding.queries == ["A4 용지"] and retriever.lexical_only == 0
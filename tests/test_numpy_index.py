@@ -0,0 +1,86 @@
+import numpy as np
+
+from core.rag_engine.numpy_index import NumpyVectorIndex
+
+
+def build(path, vectors, dtype):
+    index = NumpyVectorIndex(path, dtype=dtype, rerank=4)
+    ids = [f"c{i}" for i in range(len(vectors))]
+    index.build(ids, vectors, [f"chunk {i}" for i in range(len(vectors))], [{"chunk_id": i} for i in ids])
+    return index, dict(zip(ids, vectors))
+
+
+def test_quantized_index_keeps_no_float32_copy(tmp_path):
+    (tmp_path / NumpyVectorIndex.LEGACY_FULL_VECTORS_FILE).write_bytes(b"old")
+    vectors = np.random.default_rng(0).standard_normal((50, 64))
+    index, _ = build(tmp_path, vectors, "int8")
+
+    assert not (tmp_path / NumpyVectorIndex.LEGACY_FULL_VECTORS_FILE).exists()
+    stats = index.stats()
+    assert stats["dtype"] == "int8" and stats["bytes"] == 50 * 64 + 50 * 4
+
+
+def test_rerank_scores_candidates_from_fetched_vectors(tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((200, 64))
+    queries = rng.standard_normal((5, 64))
+    index, stored = build(tmp_path, vectors, "int8")
+    fetched = []
+
+    def fetch(ids):
+        fetched.append(list(ids))
+        return [stored[i] for i in ids]
+
+    results = index.search(queries.tolist(), k=3, fetch_vectors=fetch)
+
+    # All queries' candidates are fetched in one call, at most k * rerank per query.
+    assert len(fetched) == 1 and len(fetched[0]) <= 5 * 3 * 4
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    for query, hits in zip(queries, results):
+        exact = normalized @ (query / np.linalg.norm(query))
+        assert [doc.id for doc, _ in hits] == [f"c{i}" for i in np.argsort(-exact)[:3]]
+        assert np.allclose([score for _, score in hits], sorted(exact, reverse=True)[:3], atol=1e-6)
+
+
+def test_rerank_is_opt_in(tmp_path):
+    vectors = np.random.default_rng(3).standard_normal((20, 16))
+    index = NumpyVectorIndex(tmp_path, dtype="int8")
+    index.build([f"c{i}" for i in range(20)], vectors, [f"chunk {i}" for i in range(20)], [{}] * 20)
+
+    def fetch(ids):
+        raise AssertionError("reading stored float32 vectors is opt-in")
+
+    assert len(index.search(vectors[:2].tolist(), k=2, fetch_vectors=fetch)[0]) == 2
+    assert index.stats()["rerank"] == 0
+
+
+def test_float32_index_does_not_fetch(tmp_path):
+    vectors = np.random.default_rng(2).standard_normal((20, 16))
+    index, _ = build(tmp_path, vectors, "float32")
+
+    def fetch(ids):
+        raise AssertionError("float32 scores are already exact")
+
+    assert len(index.search(vectors[:2].tolist(), k=2, fetch_vectors=fetch)[0]) == 2
+
+
+def test_chroma_and_numpy_backends_return_the_same_similarity(tmp_path):
+    from langchain_core.documents import Document
+
+    from core.rag_engine.local_embeddings import HashingEmbeddings
+    from core.rag_engine.vector_db import VectorDBManager
+
+    embedding = HashingEmbeddings(128)
+    texts = ["주류와 담배는 구매할 수 없다.", "식비는 1인 1만원까지.", "사무용품은 A4 용지를 포함한다."]
+    manager = VectorDBManager(str(tmp_path), watch=False)
+    manager.create_db([Document(page_content=t, metadata={"source": "rules"}, id=f"c{i}") for i, t in enumerate(texts)], embedding)
+    manager.export_numpy_index(embedding)
+    query = [embedding.embed_query("소주 담배")]
+
+    chroma = manager.search_rules_by_vectors(query, embedding, k=3)[0]
+    manager.backend = "numpy"
+    numpy = manager.search_rules_by_vectors(query, embedding, k=3)[0]
+
+    assert [doc.page_content for doc, _ in chroma] == [doc.page_content for doc, _ in numpy]
+    assert np.allclose([s for _, s in chroma], [s for _, s in numpy], atol=1e-4)
+    assert chroma[0][1] >= chroma[-1][1]
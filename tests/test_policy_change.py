@@ -0,0 +1,152 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from core.rag_engine import ingest
+from core.rag_engine.article_splitter import ArticleTextSplitter
+from core.rag_engine.embedder import RegulationEmbedder
+from core.rag_engine.snapshots import SnapshotStore
+from server import batch_audit
+from server.services.db_service import DBService
+
+POLICY = {
+    "제1조": "제1조(목적) 이 규정은 업무추진비 집행 기준을 정한다.",
+    "제2조": "제2조(식비) 식비는 1인 1만원까지 집행한다.",
+    "제3조": "제3조(금지 품목) 주류와 담배는 구매할 수 없다.",
+}
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DBService(tmp_path / "audit.db")
+    db.init_db()
+    return db
+
+
+def chunk(chunk_id, article_id=None, source="rules.pdf"):
+    return {"chunk_id": chunk_id, "content_hash": f"h-{chunk_id}", "source": source, "article_id": article_id}
+
+
+def audit(db, receipt_id, chunks, decision_path="llm", tenant_id=None):
+    usage = {"decision_path": decision_path, "tenant_id": tenant_id, "policy_version": "v1", "chunks": chunks}
+    db.upsert_audit(receipt_id, {"audit_decision": "Pass", "usage": usage})
+
+
+def chunks_of(db, receipt_id):
+    with db._conn() as conn:
+        rows = conn.execute("SELECT chunk_id FROM audit_chunks WHERE receipt_id = ? ORDER BY chunk_id", (receipt_id,))
+        return [row["chunk_id"] for row in rows]
+
+
+def test_full_audit_replaces_and_incremental_audit_adds_chunks(db):
+    audit(db, "r1", [chunk("a"), chunk("b")])
+    audit(db, "r1", [chunk("c")])
+    assert chunks_of(db, "r1") == ["c"]
+
+    audit(db, "r1", [chunk("d")], decision_path="incremental")
+    assert chunks_of(db, "r1") == ["c", "d"]
+
+    # No retrieval (circuit open): the last known dependencies stay.
+    db.upsert_audit("r1", {"audit_decision": "Pass", "usage": {"decision_path": "circuit_open"}})
+    assert chunks_of(db, "r1") == ["c", "d"]
+
+
+def test_affected_audits_join_on_removed_chunks_and_added_articles(db):
+    audit(db, "r1", [chunk("a", "제2조")])
+    audit(db, "r2", [chunk("b", "제3조")])
+    audit(db, "r3", [chunk("c", "제3조", source="other.pdf")])
+    audit(db, "r4", [chunk("d", "제1조")])
+
+    assert db.find_audits_affected(["a"], []) == ["r1"]
+    # A new paragraph in 제3조 of rules.pdf affects audits that used any chunk of that article, and only that source.
+    assert db.find_audits_affected([], [("rules.pdf", "제3조")]) == ["r2"]
+    assert db.find_audits_affected(["a", "missing"], [["rules.pdf", "제3조"]]) == ["r1", "r2"]
+    assert db.find_audits_affected([], []) == []
+
+
+def test_affected_audits_are_scoped_to_the_tenant(db):
+    audit(db, "r1", [chunk("a")])
+    audit(db, "r2", [chunk("a")], tenant_id="acme")
+
+    assert db.find_audits_affected(["a"], []) == ["r1"]
+    assert db.find_audits_affected(["a"], [], tenant_id="acme") == ["r2"]
+    assert db.find_audited_receipts("acme") == ["r2"]
+
+
+def split(policy, source):
+    chunks = ArticleTextSplitter(chunk_size=600, chunk_overlap=0).create_documents(["\n".join(policy.values())])
+    return RegulationEmbedder.assign_chunk_ids(chunks, source)
+
+
+def fake_split(policies):
+    """Stands in for PDF parsing: splits the current text of each path like ingest does."""
+    return lambda pdf_path: (pdf_path, 1, split(policies[pdf_path], pdf_path), None)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    root = tmp_path / "vector_store"
+    policies = {"rules.pdf": dict(POLICY)}
+    monkeypatch.setattr(ingest, "_split_pdf", fake_split(policies))
+    monkeypatch.setattr(ingest, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(ingest, "RegulationEmbedder", lambda: RegulationEmbedder(backend="hashing"))
+    monkeypatch.setattr(ingest, "tenant_store_path", lambda tenant_id=None: str(root))
+    monkeypatch.setattr(batch_audit, "tenant_store_path", lambda tenant_id=None: str(root))
+    return SnapshotStore(str(root)), policies["rules.pdf"]
+
+
+def test_ingest_records_changed_chunks_per_snapshot(store):
+    snapshots, policy = store
+    first = ingest._ingest(["rules.pdf"], workers=1)
+    assert snapshots.changes_of(first["version"])["previous_version"] is None
+
+    policy["제3조"] += "\n다만, 기념품으로 받은 주류는 예외로 한다."
+    del policy["제1조"]
+    second = ingest._ingest(["rules.pdf"], workers=1)
+
+    changes = snapshots.changes_of(second["version"])
+    assert changes["previous_version"] == first["version"]
+    assert changes["reembedded"] is False
+    assert sorted(changes["removed"]) == sorted(second["removed"]) and len(changes["removed"]) == 2
+    assert changes["added_articles"] == [["rules.pdf", "제3조"]]
+
+    # Nothing changed: no new snapshot, the current change record stays.
+    third = ingest._ingest(["rules.pdf"], workers=1)
+    assert third["version"] == second["version"]
+
+
+def test_policy_change_selects_only_audits_that_used_changed_rules(store, db):
+    snapshots, policy = store
+    first = ingest._ingest(["rules.pdf"], workers=1)
+    chunk_ids = {doc.metadata["article_id"]: doc.metadata["chunk_id"] for doc in split(policy, "rules.pdf")}
+    audit(db, "meal", [chunk(chunk_ids["제2조"], "제2조")])
+    audit(db, "liquor", [chunk(chunk_ids["제3조"], "제3조")])
+    audit(db, "other-tenant", [chunk(chunk_ids["제3조"], "제3조")], tenant_id="acme")
+
+    policy["제3조"] = "제3조(금지 품목) 주류, 담배, 복권은 구매할 수 없다."
+    second = ingest._ingest(["rules.pdf"], workers=1)
+
+    assert batch_audit.affected_receipts(db) == (second["version"], ["liquor"])
+    # The first snapshot added every article, so every audit that used one depends on it.
+    assert batch_audit.affected_receipts(db, first["version"]) == (first["version"], ["liquor", "meal"])
+    assert batch_audit.affected_receipts(db, tenant_id="acme")[1] == ["other-tenant"]
+
+
+def test_reembedded_snapshot_selects_every_audited_receipt(store, db):
+    snapshots, _ = store
+    version, path = snapshots.prepare(copy=False)
+    snapshots.record_changes(path, {"previous_version": None, "reembedded": True, "removed": [], "added_articles": []})
+    snapshots.publish(version)
+    audit(db, "r1", [chunk("a")])
+    audit(db, "r2", [chunk("b")])
+
+    assert batch_audit.affected_receipts(db) == (version, ["r1", "r2"])
+
+
+def test_snapshot_without_change_record_is_rejected(store, db):
+    snapshots, _ = store
+    version, _ = snapshots.prepare(copy=False)
+    snapshots.publish(version)
+    with pytest.raises(SystemExit):
+        batch_audit.affected_receipts(db)
+
@@ -0,0 +1,84 @@
+from langchain_core.documents import Document
+
+from core.rag_engine.embedding_cache import CachedEmbeddings, embed_query_batch
+from core.rag_engine.local_embeddings import HashingEmbeddings
+from core.rag_engine.retriever import ItemRuleRetriever
+from core.rag_engine.vector_db import VectorDBManager, relevance_score_fn
+
+
+class QueryAwareEmbeddings:
+    """Returns different vectors for queries and documents, like Upstage."""
+
+    def __init__(self):
+        self.query_calls = []
+        self.document_calls = []
+
+    def embed_query(self, text):
+        self.query_calls.append(text)
+        return [1.0, float(len(text))]
+
+    def embed_documents(self, texts):
+        self.document_calls.append(list(texts))
+        return [[0.0, float(len(t))] for t in texts]
+
+
+class BatchQueryEmbeddings(QueryAwareEmbeddings):
+    def embed_queries(self, texts):
+        return [[2.0, float(len(t))] for t in texts]
+
+
+def test_embed_query_batch_uses_query_model():
+    model = QueryAwareEmbeddings()
+    vectors = embed_query_batch(model, ["coffee", "taxi", "hotel"], concurrency=3)
+    assert vectors == [[1.0, 6.0], [1.0, 4.0], [1.0, 5.0]]
+    assert sorted(model.query_calls) == ["coffee", "hotel", "taxi"]
+    assert model.document_calls == []
+
+
+def test_embed_query_batch_prefers_batch_call():
+    assert embed_query_batch(BatchQueryEmbeddings(), ["a", "bb"]) == [[2.0, 1.0], [2.0, 2.0]]
+
+
+def test_cached_queries_share_embed_query_key_space(tmp_path):
+    model = QueryAwareEmbeddings()
+    cached = CachedEmbeddings(model, "m", tmp_path / "cache.db")
+    assert cached.embed_queries(["coffee", "taxi", "coffee"]) == [[1.0, 6.0], [1.0, 4.0], [1.0, 6.0]]
+    assert model.document_calls == []
+    assert sorted(model.query_calls) == ["coffee", "taxi"]
+
+    # embed_query hits the vector stored by the batch call; documents stay in their own key space.
+    assert cached.embed_query("taxi") == [1.0, 4.0]
+    assert cached.embed_documents(["taxi"]) == [[0.0, 4.0]]
+    assert sorted(model.query_calls) == ["coffee", "taxi"]
+
+
+def test_retriever_embeds_misses_with_query_model():
+    model = QueryAwareEmbeddings()
+    retriever = ItemRuleRetriever(db_manager=None, embedding_model=model, mode="vector")
+    usage = {}
+    assert retriever.embed_queries(["coffee", "taxi"], usage) == [[1.0, 6.0], [1.0, 4.0]]
+    assert retriever.embed_queries(["taxi"]) == [[1.0, 4.0]]
+    assert model.document_calls == []
+    assert (retriever.hits, retriever.misses) == (1, 2)
+    assert usage["embedding_tokens"] > 0
+
+
+def test_relevance_score_fn_turns_distances_into_similarity():
+    # Unit vectors 60 degrees apart: cosine similarity 0.5 in every space.
+    assert relevance_score_fn("cosine")(0.5) == 0.5
+    assert relevance_score_fn("ip")(0.5) == 0.5
+    assert relevance_score_fn("l2")(1.0) == 0.5
+
+
+def test_chroma_hits_are_ranked_nearest_first(tmp_path):
+    embedding = HashingEmbeddings(128)
+    rules = ["주류와 담배는 구매할 수 없다.", "식비는 1인 1만원까지.", "사무용품은 A4 용지를 포함한다."]
+    manager = VectorDBManager(str(tmp_path), backend="chroma", watch=False)
+    manager.create_db([Document(page_content=t, metadata={"source": "rules"}) for t in rules], embedding)
+
+    hits = manager.search_rules_by_vectors([embedding.embed_query("A4 용지")], embedding, k=3)[0]
+    assert hits[0][0].page_content == rules[2]
+    assert [score for _, score in hits] == sorted((score for _, score in hits), reverse=True)
+
+    retriever = ItemRuleRetriever(manager, embedding, cache_size=0, mode="vector")
+    assert [doc.page_content for doc in retriever.retrieve({"items": [{"name": "A4 용지"}]}, k=1)] == [rules[2]]
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.runnables import RunnableLambda
+
+from core.audit_agent.reasoning import AuditReasoning
+
+
+class TransportError(Exception):
+    pass
+
+
+def make_agent(respond):
+    """AuditReasoning whose LLM answers with ``respond(prompt_text)``."""
+    agent = AuditReasoning.__new__(AuditReasoning)
+    agent.model = "fake"
+    agent.parser = JsonOutputParser()
+    agent.calls = []
+
+    def llm(prompt):
+        text = prompt.to_string()
+        agent.calls.append(text)
+        return AIMessage(content=respond(text))
+
+    agent.llm = RunnableLambda(llm)
+    return agent
+
+
+def receipts_in(prompt_text):
+    return json.loads(prompt_text.split("영수증 목록: ", 1)[1])
+
+
+def test_unparseable_batch_is_split_and_retried():
+    def respond(text):
+        if "영수증 목록" not in text:
+            return json.dumps({"audit_decision": "Pass"})
+        if len(receipts_in(text)) > 2:
+            return "not json"
+        return json.dumps({"results": [{"index": r["index"], "audit_decision": "Pass"} for r in receipts_in(text)]})
+
+    agent = make_agent(respond)
+    results = agent.analyze_many([({"receipt_id": f"r{i}"}, "rules") for i in range(4)], batch_size=4)
+    assert [r["audit_decision"] for r in results] == ["Pass"] * 4
+    assert len(agent.calls) == 3
+
+
+def test_unparseable_single_receipt_yields_none():
+    agent = make_agent(lambda text: "not json")
+    assert agent.analyze_many([({"receipt_id": "r1"}, "rules")]) == [None]
+
+
+def test_transport_errors_are_not_retried_as_parse_failures():
+    def respond(text):
+        raise TransportError("connection reset")
+
+    agent = make_agent(respond)
+    with pytest.raises(TransportError):
+        agent.analyze_many([({"receipt_id": f"r{i}"}, "rules") for i in range(8)], batch_size=8)
+    assert len(agent.calls) == 1
+
+
+def test_failed_group_does_not_drop_other_groups():
+    def respond(text):
+        if "rules-b" in text:
+            raise TransportError("connection reset")
+        return json.dumps({"results": [{"index": r["index"], "audit_decision": "Pass"} for r in receipts_in(text)]})
+
+    agent = make_agent(respond)
+    requests = [({"receipt_id": "a1"}, "rules-a"), ({"receipt_id": "b1"}, "rules-b"), ({"receipt_id": "a2"}, "rules-a")]
+    results, _, errors = agent.analyze_many_with_usage(requests, batch_size=4)
+
+    assert [r and r["audit_decision"] for r in results] == ["Pass", None, "Pass"]
+    assert errors[0] is None and isinstance(errors[1], TransportError) and errors[2] is None
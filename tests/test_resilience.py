@@ -0,0 +1,175 @@
+import threading
+import time
+
+import pytest
+
+from server.services import resilience
+from server.services.resilience import CircuitBreaker, Stage, StageTimeout
+
+
+def open_breaker(reset_seconds=0.05):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=reset_seconds)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_probe_success_closes_and_failure_reopens():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+
+def test_released_probe_can_be_retried():
+    breaker = open_breaker(reset_seconds=60)
+    breaker._opened_at -= 61
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_unsettled_probe_expires():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+
+
+def test_stage_deadline_counts_from_start_not_queue(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(resilience, "_executor", pool)
+    gate = threading.Event()
+    pool.submit(gate.wait)  # occupy the only worker
+    threading.Timer(0.15, gate.set).start()
+
+    stage = Stage("test", deadline=0.2)
+    # Queued for ~0.15s, then runs for 0.1s: over the deadline if queue wait counted, within it otherwise.
+    assert stage.call(lambda: time.sleep(0.1) or "ok") == "ok"
+    pool.shutdown()
+
+
+def test_stage_times_out_and_cancels_queued_work(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(resilience, "_executor", pool)
+    gate = threading.Event()
+    pool.submit(gate.wait)
+    ran = []
+
+    stage = Stage("test", deadline=0.05)
+    with pytest.raises(StageTimeout):
+        stage.call(lambda: ran.append(1))
+    gate.set()
+    pool.shutdown(wait=True)
+    assert ran == []
+
+
+def test_stage_raises_work_error():
+    stage = Stage("test", deadline=1)
+    with pytest.raises(ValueError):
+        stage.call(lambda: (_ for _ in ()).throw(ValueError("boom")))
+
+
+def test_disconnected_stream_releases_probe():
+    from server.services.audit_service import AuditService
+
+    service = AuditService()
+    service._breaker = open_breaker(reset_seconds=60)
+    service._breaker._opened_at -= 61
+
+    stream = service.check_stream({"receipt_id": "r1", "items": []})
+    assert next(stream) == ("stage", {"stage": "retrieval"})
+    stream.close()  # what Starlette does when the SSE client goes away
+    assert service._breaker.allow()
+
+
+class FakeEmbeddings:
+    def __init__(self, error=None, delay=0.0):
+        self.error = error
+        self.delay = delay
+
+    def embed_queries(self, texts):
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return [[1.0] for _ in texts]
+
+
+def retrieval_service(embeddings=None, store_error=None, store_delay=0.0, deadline=1.0):
+    """An AuditService whose retrieval embeds the item names, then hits a (possibly broken) tenant store."""
+    from core.rag_engine.retriever import ItemRuleRetriever
+    from server.services.audit_service import AuditService
+
+    class Service(AuditService):
+        def _retrieve_rules(self, receipt_data, usage=None):
+            if embeddings is not None:
+                ItemRuleRetriever(None, embeddings, mode="vector").embed_queries(["coffee"], usage)
+            time.sleep(store_delay)
+            if store_error:
+                raise store_error
+            return ""
+
+    service = Service()
+    service._breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+    service._retrieval_stage = Stage("retrieval", deadline)
+    return service
+
+
+RECEIPT = {"receipt_id": "r1", "items": [{"id": 1, "name": "coffee"}]}
+
+
+def test_embedding_failures_open_the_breaker():
+    service = retrieval_service(FakeEmbeddings(error=ConnectionError("upstream down")))
+    assert [service.check(RECEIPT)["fallback_reason"] for _ in range(3)] == ["error", "error", "circuit_open"]
+
+
+def test_tenant_store_failures_do_not_open_the_breaker():
+    service = retrieval_service(FakeEmbeddings(), store_error=RuntimeError("store corrupt"))
+    assert [service.check(RECEIPT)["fallback_reason"] for _ in range(3)] == ["error"] * 3
+    assert service._breaker.state == "closed"
+
+
+def test_retrieval_deadline_counts_only_while_embedding():
+    service = retrieval_service(FakeEmbeddings(delay=0.3), deadline=0.05)
+    results = [service.check(RECEIPT) for _ in range(2)]
+    assert [r["fallback_reason"] for r in results] == ["retrieval_deadline"] * 2
+    assert "embedding_pending" not in results[0]["usage"]
+    assert service._breaker.state == "open"
+
+    service = retrieval_service(FakeEmbeddings(), store_delay=0.3, deadline=0.05)
+    assert [service.check(RECEIPT)["fallback_reason"] for _ in range(2)] == ["retrieval_deadline"] * 2
+    assert service._breaker.state == "closed"
@@ -0,0 +1,89 @@
+import threading
+
+from core.rag_engine import vector_db
+from core.rag_engine.snapshots import SnapshotStore
+from core.rag_engine.vector_db import VectorDBManager
+
+
+def publish(store, version):
+    # Real version names start with a timestamp, so name order is publish order.
+    (store.snapshot_dir / version).mkdir(parents=True)
+    store.activate(version)
+    return version
+
+
+def test_activate_records_previous_version(tmp_path):
+    store = SnapshotStore(tmp_path, keep=1)
+    first = publish(store, "v1")
+    assert store.previous_version() is None
+    second = publish(store, "v2")
+    assert (store.active_version(), store.previous_version()) == (second, first)
+
+
+def test_prune_keeps_active_and_previous_versions(tmp_path):
+    store = SnapshotStore(tmp_path, keep=1)
+    v1, v2, v3 = publish(store, "v1"), publish(store, "v2"), publish(store, "v3")
+
+    assert store.prune() == [v1]
+    assert store.versions() == [v2, v3]
+
+    # After a rollback to v2 the newest snapshot may still be open on servers that have not switched.
+    store.activate(v2)
+    assert store.prune() == []
+    assert store.versions() == [v2, v3]
+
+
+class FakeChroma:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_close_waits_for_in_flight_search(tmp_path):
+    manager = VectorDBManager(str(tmp_path), watch=False)
+    model = object()
+    db = FakeChroma()
+    manager._db, manager._db_embedding_model = db, model
+
+    with manager._using(model) as used:
+        assert used is db
+        manager.close()
+        assert not db.closed
+    assert db.closed
+    assert manager._in_use == {} and manager._retired == {}
+
+
+def test_idle_client_is_closed_immediately(tmp_path):
+    manager = VectorDBManager(str(tmp_path), watch=False)
+    db = FakeChroma()
+    manager._db, manager._db_embedding_model = db, object()
+    manager.close()
+    assert db.closed
+
+
+def test_only_one_thread_starts_a_switch(tmp_path, monkeypatch):
+    store = SnapshotStore(tmp_path)
+    publish(store, "v1")
+    manager = VectorDBManager(str(tmp_path))
+    publish(store, "v2")
+    monkeypatch.setattr(vector_db, "VECTOR_STORE_POLL_SECONDS", 0.0)
+
+    switches = []
+    finished = threading.Event()
+
+    def switch(version):
+        switches.append(version)
+        finished.wait(1)
+        with manager._lock:
+            manager._switching = False
+
+    manager._switch = switch
+    threads = [threading.Thread(target=manager._refresh) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    finished.set()
+    assert switches == [store.active_version()]
@@ -0,0 +1,209 @@
+import threading
+
+import pytest
+
+from core.rag_engine.tenants import TenantRetrieverPool, validate_tenant_id
+from server.services.audit_service import AuditService
+from server.services.db_service import DBService
+from server.services.speculative_audit_service import SpeculativeAuditService
+
+
+class FakeDBManager:
+    def __init__(self):
+        self.closed = 0
+
+    def close(self):
+        self.closed += 1
+
+
+class FakeRetriever:
+    def __init__(self, tenant_id):
+        self.tenant_id = tenant_id
+        self.db_manager = FakeDBManager()
+
+
+def test_validate_tenant_id():
+    assert validate_tenant_id(None) is None
+    assert validate_tenant_id("") is None
+    assert validate_tenant_id("acme_1") == "acme_1"
+    with pytest.raises(ValueError):
+        validate_tenant_id("../etc")
+
+
+def test_pool_evicts_least_recently_used_idle_tenant():
+    pool = TenantRetrieverPool(FakeRetriever, max_warm=2)
+    with pool.lease("a") as a:
+        pass
+    with pool.lease("b"):
+        pass
+    with pool.lease("a"):
+        pass
+    with pool.lease("c"):
+        pass
+
+    assert pool.stats()["warm"] == ["a", "c"]
+    assert pool.peek("b") is None
+    assert a.db_manager.closed == 0
+    assert pool.stats()["evictions"] == 1
+
+
+def test_pool_defers_close_until_lease_is_returned():
+    pool = TenantRetrieverPool(FakeRetriever, max_warm=1)
+    with pool.lease("a") as a:
+        # Another request evicts "a" while it is still searching.
+        with pool.lease("b"):
+            pass
+        assert a.db_manager.closed == 0
+        assert pool.stats()["retiring"] == 1
+    assert a.db_manager.closed == 1
+    assert pool.stats()["retiring"] == 0
+    assert pool.stats()["leased"] == 0
+
+
+def test_pool_reloads_evicted_tenant_as_new_retriever():
+    pool = TenantRetrieverPool(FakeRetriever, max_warm=1)
+    with pool.lease("a") as first:
+        with pool.lease("b"):
+            pass
+        with pool.lease("a") as second:
+            assert second is not first
+    assert first.db_manager.closed == 1
+    assert second.db_manager.closed == 0
+    assert pool.stats()["loads"] == 3
+
+
+def test_slow_tenant_load_does_not_block_other_tenants():
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def factory(tenant_id):
+        calls.append(tenant_id)
+        if tenant_id == "slow":
+            started.set()
+            release.wait(5)
+            calls.append("slow built")
+        return FakeRetriever(tenant_id)
+
+    pool = TenantRetrieverPool(factory, max_warm=4)
+    leased = []
+
+    def lease_slow():
+        with pool.lease("slow") as retriever:
+            leased.append(retriever)
+
+    threads = [threading.Thread(target=lease_slow) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    assert started.wait(5)
+    # While "slow" is still being built, another tenant is served.
+    with pool.lease("fast") as fast:
+        assert fast.tenant_id == "fast"
+        assert "slow built" not in calls
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    # Concurrent requests for the same tenant wait for the one in-flight build.
+    assert calls.count("slow") == 1
+    assert len({id(r) for r in leased}) == 1
+    assert pool.stats()["loads"] == 2
+
+
+def test_failed_tenant_load_is_retried():
+    attempts = []
+
+    def factory(tenant_id):
+        attempts.append(tenant_id)
+        if len(attempts) == 1:
+            raise OSError("store missing")
+        return FakeRetriever(tenant_id)
+
+    pool = TenantRetrieverPool(factory)
+    with pytest.raises(OSError):
+        with pool.lease("a"):
+            pass
+    with pool.lease("a") as retriever:
+        assert retriever.tenant_id == "a"
+    assert pool.stats()["loads"] == 1
+
+
+class BrokenRetrievalService(AuditService):
+    def _retrieve_rules(self, receipt_data, usage=None):
+        raise RuntimeError(f"store for {receipt_data.get('tenant_id')} is broken")
+
+
+def test_retrieval_errors_do_not_open_the_breaker():
+    service = BrokenRetrievalService()
+    for _ in range(service._breaker.failure_threshold + 1):
+        result = service.check({"receipt_id": "r1", "tenant_id": "churn", "items": []})
+        assert result["fallback_reason"] == "error"
+    assert service._breaker.state == "closed"
+
+
+def test_retrieval_error_hands_back_half_open_probe():
+    service = BrokenRetrievalService()
+    service._breaker.reset_seconds = 0.0
+    for _ in range(service._breaker.failure_threshold):
+        service._breaker.record_failure()
+    assert service._breaker.state == "half_open"
+
+    service.check({"receipt_id": "r1", "items": []})
+    # The probe never reached the LLM, so the next request may probe.
+    assert service._breaker.allow()
+
+
+class VersionedAuditService:
+    def __init__(self, versions):
+        self.versions = versions
+
+    def policy_version(self, tenant_id=None):
+        return self.versions.get(tenant_id)
+
+
+def receipt(**overrides):
+    data = {
+        "receipt_id": "r1",
+        "store_name": "cafe",
+        "date": "2026-01-02 10:00",
+        "total_price": 9000,
+        "items": [{"id": 1, "name": "coffee", "unit_price": 4500, "count": 2, "price": 9000}],
+    }
+    data.update(overrides)
+    return data
+
+
+def test_speculative_hash_keys_on_tenant_and_policy_version(tmp_path):
+    versions = {None: "v1", "acme": "v1"}
+    service = SpeculativeAuditService(VersionedAuditService(versions), db=DBService(tmp_path / "db.sqlite"))
+    base = service.content_hash(receipt())
+
+    # Fields outside the hash basis do not matter; receipt content, tenant and policy version do.
+    assert service.content_hash({**receipt(), "image_path": "x.png"}) == base
+    assert service.content_hash(receipt(total_price=9001)) != base
+    assert service.content_hash(receipt(tenant_id="acme")) != base
+
+    versions[None] = "v2"
+    assert service.content_hash(receipt()) != base
+
+
+def test_speculative_take_discards_result_for_other_tenant(tmp_path):
+    db = DBService(tmp_path / "db.sqlite")
+    db.init_db()
+    service = SpeculativeAuditService(VersionedAuditService({None: "v1", "acme": "v1"}), db=db)
+    db.save_speculative_audit("r1", service.content_hash(receipt()), {"audit_decision": "Pass", "usage": {}})
+
+    assert service.take(receipt(tenant_id="acme")) is None
+    assert db.get_speculative_audit("r1") is None
+
+
+def test_speculative_take_returns_unchanged_receipt(tmp_path):
+    db = DBService(tmp_path / "db.sqlite")
+    db.init_db()
+    service = SpeculativeAuditService(VersionedAuditService({None: "v1"}), db=db)
+    usage = {"tenant_id": None, "policy_version": "v1", "chunks": [{"chunk_id": "c1"}]}
+    db.save_speculative_audit("r1", service.content_hash(receipt()), {"audit_decision": "Pass", "usage": usage})
+
+    result = service.take(receipt())
+    assert result["decision_path"] == "cache"
+    assert result["usage"]["chunks"] == [{"chunk_id": "c1"}]
+    assert result["usage"]["policy_version"] == "v1"
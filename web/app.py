@@ -3,6 +3,7 @@ Transparent-Audit: 영수증 자동 감사 시스템
 Frontend Main Application (Streamlit)
 """
 
+import copy
 import streamlit as st
 from pathlib import Path
 import sys
@@ -14,8 +15,8 @@ sys.path.append(str(Path(__file__).parent / "src"))
 
 from components.upload_component import render_upload_section
 from components.data_editor_component import render_data_editor
-from components.audit_result_component import render_audit_results
-from utils.api_client import MockOCRClient as OCRClient, MockAuditClient as AuditClient, MOCK_RECEIPTS
+from components.audit_result_component import render_audit_results, render_partial_violations
+from utils.api_client import MockOCRClient as OCRClient, MockAuditClient as AuditClient, MOCK_RECEIPTS, diff_receipt_items
 
 def init_session_state():
     if 'receipt_data' not in st.session_state:
@@ -28,6 +29,8 @@ def init_session_state():
         st.session_state.demo_image = None
     if 'generated_pdf' not in st.session_state:
         st.session_state.generated_pdf = None
+    if 'audited_receipt' not in st.session_state:
+        st.session_state.audited_receipt = None
 
 def main():
     st.set_page_config(page_title="Transparent-Audit", page_icon="🧾", layout="wide")
@@ -47,6 +50,7 @@ def main():
             if st.button(scenario, use_container_width=True):
                 st.session_state.receipt_data = OCRClient().extract(scenario)
                 st.session_state.audit_result = None
+                st.session_state.audited_receipt = None
                 st.session_state.generated_pdf = None
                 st.session_state.current_step = 2
                 
@@ -60,6 +64,7 @@ def main():
         if st.button("🔄 Reset App", type="secondary", use_container_width=True):
             st.session_state.receipt_data = None
             st.session_state.audit_result = None
+            st.session_state.audited_receipt = None
             st.session_state.generated_pdf = None
             st.session_state.current_step = 1
             st.rerun()
@@ -73,6 +78,8 @@ def main():
             uploaded_file = render_upload_section()
             if uploaded_file:
                 st.session_state.receipt_data = OCRClient().extract(list(MOCK_RECEIPTS.keys())[0])
+                st.session_state.audit_result = None
+                st.session_state.audited_receipt = None
                 st.session_state.current_step = 2
                 st.rerun()
         with col2:
@@ -86,9 +93,37 @@ def main():
             st.session_state.receipt_data = render_data_editor(st.session_state.receipt_data)
             
             if st.button("🚀 Run AI Audit", type="primary"):
-                with st.spinner("AI Analysis..."):
-                    st.session_state.audit_result = AuditClient().check(st.session_state.receipt_data)
-                    st.session_state.generated_pdf = None # Clear old PDF if data changed
+                previous_result = st.session_state.audit_result
+                changed = None
+                if previous_result and st.session_state.audited_receipt:
+                    changed = diff_receipt_items(st.session_state.audited_receipt, st.session_state.receipt_data)
+                st.session_state.audit_result = None
+                st.session_state.generated_pdf = None # Clear old PDF if data changed
+                st.session_state.audited_receipt = copy.deepcopy(st.session_state.receipt_data)
+                progress = st.empty()
+                partial_violations, stage = [], "retrieval"
+                if changed is not None and 0 not in changed:
+                    # Only some items were edited: re-judge just those and keep the other verdicts
+                    with st.spinner("AI Analysis (edited items only)..."):
+                        st.session_state.audit_result = AuditClient().check_incremental(
+                            st.session_state.receipt_data, changed
+                        )
+                else:
+                    with st.spinner("AI Analysis..."):
+                        # Render violations as soon as the backend streams them
+                        for event, data in AuditClient().check_stream(st.session_state.receipt_data):
+                            if event == "stage":
+                                stage = data.get("stage", stage)
+                                if stage == "escalation":
+                                    partial_violations = [] # A stronger model re-judges the receipt
+                            elif event == "violation":
+                                partial_violations.append(data)
+                            elif event == "decision":
+                                st.session_state.audit_result = data
+                                break
+                            with progress.container():
+                                render_partial_violations(partial_violations, stage)
+                progress.empty()
             
             if st.session_state.audit_result:
                 render_audit_results(st.session_state.audit_result)
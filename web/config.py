@@ -16,6 +16,8 @@ API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
 API_ENDPOINTS = {
     "ocr_extract": f"{API_BASE_URL}/api/v1/ocr/extract",
     "audit_check": f"{API_BASE_URL}/api/v1/audit/check",
+    "audit_check_stream": f"{API_BASE_URL}/api/v1/audit/check/stream",
+    "audit_check_incremental": f"{API_BASE_URL}/api/v1/audit/check/incremental",
     "audit_confirm": f"{API_BASE_URL}/api/v1/audit/confirm",
 }
 
@@ -6,6 +6,7 @@ from .upload_component import render_upload_section, render_upload_history
 from .data_editor_component import render_data_editor, render_summary_card
 from .audit_result_component import (
     render_audit_results,
+    render_partial_violations,
     render_violation_table,
     render_policy_reference,
     render_audit_summary_card,
@@ -18,6 +19,7 @@ __all__ = [
     'render_data_editor',
     'render_summary_card',
     'render_audit_results',
+    'render_partial_violations',
     'render_violation_table',
     'render_policy_reference',
     'render_audit_summary_card',
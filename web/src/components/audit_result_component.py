@@ -57,6 +57,9 @@ def render_audit_results(audit_result: Dict[str, Any], compact: bool = False):
             st.markdown("### 📋 판단 근거")
             st.info(reasoning)
 
+        if audit_result.get('decision_path') == 'rule':
+            st.caption("⚙️ AI 분석을 사용할 수 없어 규칙 기반 점검 결과를 표시합니다.")
+
         # Violations detail
         if violations:
             st.markdown("### 🚨 위반 항목 상세")
@@ -102,6 +105,31 @@ def render_audit_results(audit_result: Dict[str, Any], compact: bool = False):
                 st.markdown(f"- {violation.get('reason', 'N/A')}")
 
 
+def render_partial_violations(violations: List[Dict[str, Any]], stage: str = "analysis"):
+    """
+    Render violations received so far while the audit is still streaming
+
+    Args:
+        violations: Violations received so far
+        stage: Current backend stage ("retrieval" or "analysis")
+    """
+
+    stage_labels = {
+        'retrieval': "📚 관련 규정 검색 중...",
+        'analysis': "🤖 AI 감사 진행 중...",
+        'escalation': "🔎 상위 모델로 정밀 감사 중...",
+    }
+    st.markdown(f"**{stage_labels.get(stage, stage)}**")
+
+    if not violations:
+        st.caption("아직 발견된 위반 항목이 없습니다.")
+        return
+
+    st.markdown(f"### 🚨 발견된 위반 항목 ({len(violations)}개)")
+    for idx, violation in enumerate(violations, 1):
+        st.error(f"#{idx} 품목 ID {violation.get('item_id', 'N/A')}: {violation.get('reason', 'N/A')}")
+
+
 def render_violation_table(violations: List[Dict[str, Any]]):
     """
     Render violations in a table format
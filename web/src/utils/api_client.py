@@ -3,9 +3,10 @@ API Client for communicating with FastAPI backend
 """
 
 import base64
+import json
 import requests
 import streamlit as st
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from pathlib import Path
 import sys
 
@@ -15,6 +16,14 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 from config import API_ENDPOINTS, API_TIMEOUT
 
 
+def diff_receipt_items(previous: Dict[str, Any], current: Dict[str, Any]) -> List[int]:
+    """Ids of items edited or added since ``previous`` was audited ([0] if the store or date changed)"""
+    if any(previous.get(key) != current.get(key) for key in ("receipt_id", "store_name", "date")):
+        return [0]
+    before = {item.get("id"): item for item in previous.get("items", [])}
+    return [item.get("id") for item in current.get("items", []) if before.get(item.get("id")) != item]
+
+
 # ──────────────────────────────────────────────
 # Real API Clients (for backend integration)
 # ──────────────────────────────────────────────
@@ -61,6 +70,56 @@ class AuditClient:
             st.error(f"❌ 감사 처리 중 오류: {e}")
             return None
 
+    def check_incremental(
+        self, receipt_data: Dict[str, Any], changed_item_ids: List[int]
+    ) -> Optional[Dict[str, Any]]:
+        """Re-audit only the edited items via POST /api/v1/audit/check/incremental"""
+        try:
+            response = requests.post(
+                API_ENDPOINTS['audit_check_incremental'],
+                json={
+                    "receipt_data": receipt_data,
+                    "changed_item_ids": changed_item_ids
+                },
+                timeout=API_TIMEOUT
+            )
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.ConnectionError:
+            st.error("❌ 서버에 연결할 수 없습니다.")
+            return None
+        except Exception as e:
+            st.error(f"❌ 감사 처리 중 오류: {e}")
+            return None
+
+    def check_stream(self, receipt_data: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Stream audit events from POST /api/v1/audit/check/stream as (event, data) pairs"""
+        try:
+            with requests.post(
+                API_ENDPOINTS['audit_check_stream'],
+                json=receipt_data,
+                stream=True,
+                timeout=API_TIMEOUT
+            ) as response:
+                response.raise_for_status()
+                event, data_lines = "message", []
+                for line in response.iter_lines(decode_unicode=True):
+                    if line is None:
+                        continue
+                    if line == "":
+                        # Blank line terminates one SSE event
+                        if data_lines:
+                            yield event, json.loads("\n".join(data_lines))
+                        event, data_lines = "message", []
+                    elif line.startswith("event:"):
+                        event = line[len("event:"):].strip()
+                    elif line.startswith("data:"):
+                        data_lines.append(line[len("data:"):].strip())
+        except requests.exceptions.ConnectionError:
+            st.error("❌ 서버에 연결할 수 없습니다.")
+        except Exception as e:
+            st.error(f"❌ 감사 처리 중 오류: {e}")
+
     def confirm(self, receipt_data: Dict[str, Any], audit_result: Dict[str, Any]) -> Dict[str, Any]:
         try:
             payload = {
@@ -124,7 +183,28 @@ class MockAuditClient:
         """Dynamically check for violations in edited data"""
         import time
         time.sleep(1)
-        
+        return self._evaluate(receipt_data)
+
+    def check_incremental(
+        self, receipt_data: Dict[str, Any], changed_item_ids: List[int]
+    ) -> Dict[str, Any]:
+        """The mock audit is instant, so an incremental check simply re-evaluates everything"""
+        result = self._evaluate(receipt_data)
+        result["decision_path"] = "incremental"
+        return result
+
+    def check_stream(self, receipt_data: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Mimic the streaming endpoint: violations one by one, then the final decision"""
+        import time
+        result = self._evaluate(receipt_data)
+        yield "stage", {"stage": "analysis"}
+        for violation in result["violations"]:
+            time.sleep(0.4)
+            yield "violation", violation
+        time.sleep(0.4)
+        yield "decision", result
+
+    def _evaluate(self, receipt_data: Dict[str, Any]) -> Dict[str, Any]:
         violations = []
         items = receipt_data.get("items", [])
         